@@ -6,9 +6,15 @@
 from playwright.sync_api import sync_playwright
 import time
 
+from session_cache import SessionCache
+from screenshot_sink import ScreenshotSink
+
 def form_handling_example():
     """表单处理示例"""
     
+    # 截图在后台线程写盘，不阻塞表单操作
+    sink = ScreenshotSink()
+    
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False, slow_mo=800)
         page = browser.new_page()
@@ -149,7 +155,7 @@ def form_handling_example():
             print("✓ 已同意用户协议")
             
             # 截图显示填写完成的表单
-            page.screenshot(path='filled_form.png', full_page=True)
+            sink.capture(page, 'filled_form.png', full_page=True)
             print("✓ 已保存表单截图: filled_form.png")
             
             # 提交表单
@@ -164,58 +170,93 @@ def form_handling_example():
             print(f"✓ 提交结果: {result_text}")
             
             # 截图显示提交结果
-            page.screenshot(path='form_submitted.png')
+            sink.capture(page, 'form_submitted.png')
             print("✓ 已保存提交结果截图: form_submitted.png")
             
             time.sleep(2)
             
         except Exception as e:
             print(f"表单处理过程中出现错误: {e}")
-            page.screenshot(path='form_error.png')
+            sink.capture(page, 'form_error.png')
             
         finally:
             browser.close()
+            sink.close()
+            stats = sink.summary()
+            print(f"📸 截图 {stats['written']} 张, 后台编码写盘 {stats['background_seconds']}秒")
             
             # 清理临时文件
             import os
             if os.path.exists('temp_form.html'):
                 os.remove('temp_form.html')
 
-def login_form_example():
-    """登录表单示例 - 使用真实网站"""
+def demo_github_login(context):
+    """登录步骤：演示填写GitHub登录表单（不真正提交）"""
+    
+    page = context.new_page()
+    
+    # 访问GitHub登录页面作为示例
+    print("正在访问GitHub登录页面...")
+    page.goto('https://github.com/login')
+    
+    # 等待页面加载
+    page.wait_for_selector('#login_field')
+    
+    print("页面加载完成，开始演示表单操作...")
+    
+    # 找到用户名输入框并输入（但不真正登录）
+    username_field = page.locator('#login_field')
+    username_field.fill('demo_user')  # 使用演示用户名
+    print("✓ 已填写用户名字段")
+    
+    # 找到密码输入框
+    password_field = page.locator('#password')
+    password_field.fill('demo_password')  # 使用演示密码
+    print("✓ 已填写密码字段")
+    
+    # 截图显示填写的登录表单
+    page.screenshot(path='github_login_form.png')
+    print("✓ 已保存登录表单截图: github_login_form.png")
+    
+    # 清空表单（不实际提交）
+    username_field.fill('')
+    password_field.fill('')
+    print("✓ 已清空表单内容（演示用途）")
+    
+    page.close()
+
+def is_github_logged_in(context):
+    """会话有效性检查：GitHub 登录后会设置 logged_in=yes"""
+    return any(
+        cookie['name'] == 'logged_in' and cookie['value'] == 'yes'
+        for cookie in context.cookies('https://github.com')
+    )
+
+def login_form_example(session_cache=None):
+    """登录表单示例 - 使用真实网站
+    
+    会话缓存有效时直接复用已保存的 Cookie，跳过登录步骤；
+    只有通过有效性检查的会话才会被缓存
+    """
+    
+    session_cache = session_cache or SessionCache(ttl=3600)
     
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False, slow_mo=1000)
-        page = browser.new_page()
         
         try:
-            # 访问GitHub登录页面作为示例
-            print("正在访问GitHub登录页面...")
-            page.goto('https://github.com/login')
-            
-            # 等待页面加载
-            page.wait_for_selector('#login_field')
-            
-            print("页面加载完成，开始演示表单操作...")
-            
-            # 找到用户名输入框并输入（但不真正登录）
-            username_field = page.locator('#login_field')
-            username_field.fill('demo_user')  # 使用演示用户名
-            print("✓ 已填写用户名字段")
-            
-            # 找到密码输入框
-            password_field = page.locator('#password')
-            password_field.fill('demo_password')  # 使用演示密码
-            print("✓ 已填写密码字段")
-            
-            # 截图显示填写的登录表单
-            page.screenshot(path='github_login_form.png')
-            print("✓ 已保存登录表单截图: github_login_form.png")
+            context = session_cache.new_context(
+                browser, 'github.com', 'demo_user',
+                login=demo_github_login,
+                validate=is_github_logged_in
+            )
             
-            # 清空表单（不实际提交）
-            username_field.fill('')
-            password_field.fill('')
-            print("✓ 已清空表单内容（演示用途）")
+            if session_cache.hits:
+                print("✓ 使用缓存的登录会话，已跳过登录步骤")
+            elif is_github_logged_in(context):
+                print("✓ 登录成功，会话已缓存")
+            else:
+                print("演示未真正登录，会话未缓存")
             
             time.sleep(2)
             
@@ -4,9 +4,18 @@
 """
 
 import asyncio
+import functools
 import time
 from playwright.async_api import async_playwright
 
+from browser_pool import BrowserPool, check_url
+from url_scheduler import schedule_urls, stream_to_jsonl
+from sharded_runner import run_sharded
+from engine_matrix import print_engine_matrix, run_engine_matrix
+from network_recorder import NetworkRecorder
+from resource_blocker import ResourceBlocker
+from perf_observer import PerfTimeline
+
 async def basic_async_example():
     """基础异步示例"""
     
@@ -29,100 +38,110 @@ async def basic_async_example():
         finally:
             await browser.close()
 
-async def test_single_url(url, browser_type='chromium'):
-    """测试单个URL"""
+async def test_single_url(url, browser_type='chromium', pool=None):
+    """测试单个URL
+    
+    传入 pool 时复用池中的浏览器，否则临时启动一个浏览器
+    """
+    
+    if pool is not None:
+        return await check_url(pool, url, browser_type)
     
     async with async_playwright() as p:
-        browser_instance = getattr(p, browser_type)
-        browser = await browser_instance.launch(headless=True)
-        page = await browser.new_page()
-        
-        try:
-            start_time = time.time()
-            await page.goto(url, timeout=10000)
-            
-            title = await page.title()
-            load_time = time.time() - start_time
-            
-            result = {
-                'url': url,
-                'title': title,
-                'load_time': round(load_time, 2),
-                'browser': browser_type,
-                'status': 'success'
-            }
-            
-        except Exception as e:
-            result = {
-                'url': url,
-                'title': 'Error',
-                'load_time': 0,
-                'browser': browser_type,
-                'status': f'error: {str(e)}'
-            }
-            
-        finally:
-            await browser.close()
-            
-        return result
+        async with BrowserPool(p, engines=[browser_type], browsers_per_engine=1,
+                               blocker=ResourceBlocker.from_env()) as pool:
+            return await check_url(pool, url, browser_type)
 
-async def concurrent_url_testing():
-    """并发测试多个URL"""
+def print_pool_stats(pool):
+    """分别打印启动、上下文创建和导航耗时"""
     
-    urls = [
-        'https://httpbin.org',
-        'https://jsonplaceholder.typicode.com',
-        'https://reqres.in',
-        'https://httpbin.org/delay/1',
-        'https://httpbin.org/delay/2',
-    ]
+    labels = {'launch': '浏览器启动', 'context': '上下文创建', 'navigation': '页面导航'}
+    for kind, stats in pool.stats.summary().items():
+        print(f"{labels[kind]}: {stats['count']} 次, "
+              f"合计 {stats['total']}秒, 平均 {stats['avg']}秒, 最大 {stats['max']}秒")
+
+async def concurrent_url_testing(urls=None, workers=4, per_host=2,
+                                 output_path='url_results.jsonl', fast_mode=None,
+                                 observe=False):
+    """并发测试多个URL
     
-    print(f"开始并发测试 {len(urls)} 个URL...")
-    start_time = time.time()
+    URL 按需从迭代器读取，最多 workers 个同时进行，同一主机最多 per_host 个；
+    结果按完成顺序打印并逐行写入 JSON Lines 文件。
+    fast_mode 为 True 时拦截图片、字体和媒体；为 None 时由 PLAYWRIGHT_FAST_MODE 环境变量决定。
+    observe 为 True 时在结果中附带页面内性能时间线摘要
+    """
     
-    # 创建并发任务
-    tasks = [test_single_url(url) for url in urls]
+    if fast_mode is None:
+        blocker = ResourceBlocker.from_env()
+    else:
+        blocker = ResourceBlocker() if fast_mode else None
     
-    # 等待所有任务完成
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    if urls is None:
+        urls = [
+            'https://httpbin.org',
+            'https://jsonplaceholder.typicode.com',
+            'https://reqres.in',
+            'https://httpbin.org/delay/1',
+            'https://httpbin.org/delay/2',
+        ]
+    
+    print(f"开始并发测试 (workers={workers}, 每主机上限={per_host})...")
+    start_time = time.time()
+    count = 0
+    
+    async with async_playwright() as p:
+        # 少量长期存活的浏览器，每个任务使用独立上下文
+        async with BrowserPool(p, engines=['chromium'], browsers_per_engine=2,
+                               blocker=blocker,
+                               observer=PerfTimeline() if observe else None) as pool:
+            results = schedule_urls(
+                urls,
+                lambda url: test_single_url(url, pool=pool),
+                workers=workers,
+                per_host=per_host
+            )
+            
+            # 结果一完成就输出，不等待最慢的URL
+            async for result in stream_to_jsonl(results, output_path):
+                count += 1
+                print(f"[{count}] {result.get('status')} "
+                      f"{result.get('load_time', 0)}秒 {result['url']}")
     
     total_time = time.time() - start_time
     
-    print(f"\n并发测试完成，总耗时: {total_time:.2f} 秒")
+    print(f"\n并发测试完成，共 {count} 个URL，总耗时: {total_time:.2f} 秒")
+    print(f"结果已写入 {output_path}")
     print("=" * 80)
     
-    for result in results:
-        if isinstance(result, dict):
-            print(f"URL: {result['url']}")
-            print(f"标题: {result['title']}")
-            print(f"加载时间: {result['load_time']}秒")
-            print(f"状态: {result['status']}")
-            print("-" * 40)
-        else:
-            print(f"错误: {result}")
+    print_pool_stats(pool)
+    if blocker is not None:
+        summary = blocker.summary()
+        print(f"快速模式: 拦截 {summary['requests_avoided']} 个请求, "
+              f"约节省 {summary['estimated_bytes_avoided'] / 1024:.0f}KB")
 
-async def multi_browser_testing():
-    """多浏览器并发测试"""
+async def multi_browser_testing(urls=None, workers=2):
+    """多浏览器并发测试
     
-    url = 'https://example.com'
-    browsers = ['chromium', 'firefox', 'webkit']
+    每个引擎只启动一个浏览器并在整个运行期间复用，三个引擎并行处理同一份URL列表
+    """
     
-    print(f"在 {len(browsers)} 个浏览器中测试 {url}...")
+    urls = urls or [
+        'https://example.com',
+        'https://httpbin.org',
+        'https://httpbin.org/html',
+        'https://jsonplaceholder.typicode.com'
+    ]
+    browsers = ['chromium', 'firefox', 'webkit']
     
-    # 创建多浏览器测试任务
-    tasks = [test_single_url(url, browser) for browser in browsers]
+    print(f"在 {len(browsers)} 个浏览器中测试 {len(urls)} 个URL...")
     
-    results = await asyncio.gather(*tasks)
+    report = await run_engine_matrix(urls, engines=browsers, workers=workers)
     
     print("\n多浏览器测试结果:")
     print("=" * 60)
+    print_engine_matrix(report)
     
-    for result in results:
-        print(f"浏览器: {result['browser']}")
-        print(f"标题: {result['title']}")
-        print(f"加载时间: {result['load_time']}秒")
-        print(f"状态: {result['status']}")
-        print("-" * 30)
+    return report
 
 async def form_automation_async():
     """异步表单自动化"""
@@ -225,21 +244,8 @@ async def network_monitoring_async():
         browser = await p.chromium.launch(headless=False)
         page = await browser.new_page()
         
-        requests = []
-        responses = []
-        
-        # 监听请求和响应
-        page.on('request', lambda request: requests.append({
-            'url': request.url,
-            'method': request.method,
-            'headers': dict(request.headers)
-        }))
-        
-        page.on('response', lambda response: responses.append({
-            'url': response.url,
-            'status': response.status,
-            'headers': dict(response.headers)
-        }))
+        # 有界缓冲区记录网络事件，默认不复制请求头
+        recorder = NetworkRecorder(max_entries=200).attach(page)
         
         try:
             print("开始监控网络请求...")
@@ -250,16 +256,18 @@ async def network_monitoring_async():
             # 等待页面完全加载
             await page.wait_for_load_state('networkidle')
             
-            print(f"捕获到 {len(requests)} 个请求")
-            print(f"捕获到 {len(responses)} 个响应")
+            print(f"捕获到 {recorder.total_requests} 个请求")
+            print(f"捕获到 {recorder.total_responses} 个响应")
             
             # 打印请求详情
-            for i, req in enumerate(requests[:3], 1):
+            for i, req in enumerate(recorder.entries('request')[:3], 1):
                 print(f"请求 {i}: {req['method']} {req['url']}")
             
             # 打印响应详情
-            for i, resp in enumerate(responses[:3], 1):
+            for i, resp in enumerate(recorder.entries('response')[:3], 1):
                 print(f"响应 {i}: {resp['status']} {resp['url']}")
+            
+            print(f"按域名统计: {dict(recorder.by_domain)}")
                 
         except Exception as e:
             print(f"网络监控错误: {e}")
@@ -267,6 +275,32 @@ async def network_monitoring_async():
         finally:
             await browser.close()
 
+async def sharded_url_testing(urls=None, shards=2, workers=4):
+    """多进程分片测试：每个进程一个事件循环和浏览器池"""
+    
+    if urls is None:
+        urls = [
+            'https://example.com',
+            'https://httpbin.org',
+            'https://httpbin.org/html',
+            'https://httpbin.org/json',
+            'https://jsonplaceholder.typicode.com',
+            'https://reqres.in',
+        ]
+    
+    print(f"在 {shards} 个进程中测试 {len(urls)} 个URL...")
+    
+    # 进程池是阻塞调用，放到线程中执行以免阻塞事件循环
+    loop = asyncio.get_running_loop()
+    report = await loop.run_in_executor(
+        None, functools.partial(run_sharded, urls, shards=shards, workers=workers)
+    )
+    
+    print(f"成功 {report['success']} 个, 失败 {report['errors']} 个")
+    print(f"总耗时 {report['total_time']}秒, 吞吐量 {report['pages_per_second']} 页/秒")
+    for shard in report['shard_summary']:
+        print(f"  分片 {shard['shard']}: {shard['urls']} 个URL, 耗时 {shard['elapsed']}秒")
+
 async def main():
     """主函数 - 运行所有异步示例"""
     
@@ -296,6 +330,10 @@ async def main():
     print("\n6. 异步网络监控")
     await network_monitoring_async()
     
+    # 多进程分片
+    print("\n7. 多进程分片测试")
+    await sharded_url_testing()
+    
     print("\n✅ 所有异步示例执行完成！")
 
 if __name__ == "__main__":
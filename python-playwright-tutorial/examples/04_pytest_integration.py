@@ -2,53 +2,274 @@
 Pytest 集成示例
 演示如何在 pytest 测试框架中使用 Playwright
 运行方式: pytest 04_pytest_integration.py -v
+并行运行: pytest 04_pytest_integration.py -n 4（需要 pytest-xdist）
+均衡调度: python -m pytest 04_pytest_integration.py -n 4 --dist loadgroup -p duration_scheduler（按历史耗时从长到短分发）
+数据驱动: USER_DATA_FILE=users.csv pytest 04_pytest_integration.py -n 4 -k test_users_from_file（CSV / XLSX 按分片流式读取）
+失败 trace: 默认只为失败和重试的测试写出 traces/*.zip，PLAYWRIGHT_TRACE_SAMPLE=0.05 时另抽样 5% 通过的测试
+HAR 回放: PLAYWRIGHT_HAR=auto 时首次运行录制到 .har/，之后从 HAR 回放，不再访问服务
 """
 
+import os
 import pytest
 import json
 from playwright.sync_api import sync_playwright, Page, Browser
-from dataclasses import dataclass
 from typing import List
+from collections import Counter
 
-# 测试数据类
-@dataclass
-class UserData:
-    username: str
-    email: str
-    password: str
-    expected_result: str
+from network_recorder import NetworkRecorder
+from session_cache import SessionCache
+from resource_blocker import ResourceBlocker
+from local_httpbin import LocalHttpbin
+from run_profiles import get_profile
+from screenshot_sink import ScreenshotSink
+from visual_diff import VisualBaseline
+from trace_capture import FailureTracer
+from har_replay import HarIndex
+from virtual_clock import ClockStats, VirtualClock
+from page_reuse import ReusablePage
+from user_data import UserData, UserDataSource
 
 # 测试配置
 class TestConfig:
+    # 默认由 httpbin_server fixture 替换为本地服务地址
     BASE_URL = "https://httpbin.org"
-    TIMEOUT = 30000
-    SLOW_MO = 500
+    # 设置 HTTPBIN_URL 时改用远程 httpbin
+    REMOTE_URL = os.environ.get("HTTPBIN_URL")
+    # 本地 /delay 等待时间的缩放比例
+    DELAY_SCALE = float(os.environ.get("HTTPBIN_DELAY_SCALE", "0.1"))
+    AUTH_DIR = ".auth"
+    HAR_DIR = ".har"
+    SESSION_TTL = 3600
+    # 失败截图格式：png、jpeg 或 webp（webp 需要 Pillow）
+    SCREENSHOT_FORMAT = os.environ.get("SCREENSHOT_FORMAT", "png")
+    # 由 screenshot_sink fixture 设置，供失败钩子使用
+    SCREENSHOT_SINK = None
+    # 视觉回归基线；UPDATE_BASELINES=1 时重新生成；缺少基线时跳过，VISUAL_STRICT=1 时判为失败
+    VISUAL_BASELINE_DIR = "visual_baselines"
+    VISUAL_STRICT = os.environ.get("VISUAL_STRICT", "").lower() in ("1", "true", "yes")
+    VISUAL_DIFF_DIR = "screenshots/visual_diffs"
+    # 数据驱动测试的 CSV / XLSX 文件，未设置时跳过；按 USER_DATA_SHARDS 个分片分给各 worker
+    USER_DATA_FILE = os.environ.get("USER_DATA_FILE")
+    USER_DATA_SHEET = os.environ.get("USER_DATA_SHEET")
+    USER_DATA_SHARDS = int(os.environ.get("USER_DATA_SHARDS", os.environ.get("PYTEST_XDIST_WORKER_COUNT", "1")))
+    USER_DATA_BATCH = int(os.environ.get("USER_DATA_BATCH", "500"))
 
 # Fixtures - 测试前置设置
+@pytest.fixture(scope="session", autouse=True)
+def httpbin_server():
+    """会话级别的本地 httpbin，测试结果不受网络延迟影响"""
+    if TestConfig.REMOTE_URL:
+        TestConfig.BASE_URL = TestConfig.REMOTE_URL.rstrip('/')
+        yield None
+        return
+    
+    with LocalHttpbin(delay_scale=TestConfig.DELAY_SCALE) as server:
+        TestConfig.BASE_URL = server.url
+        yield server
+        print(f"\n本地 httpbin 共处理 {server.request_count} 个请求")
+
+@pytest.fixture(scope="session", autouse=True)
+def screenshot_sink():
+    """失败截图的后台写入器，会话结束时等待写盘完成"""
+    sink = ScreenshotSink(output_dir="screenshots", image_format=TestConfig.SCREENSHOT_FORMAT)
+    TestConfig.SCREENSHOT_SINK = sink
+    yield sink
+    TestConfig.SCREENSHOT_SINK = None
+    sink.close()
+    if sink.captured:
+        print(f"\n失败截图统计: {sink.summary()}")
+
+@pytest.fixture(scope="session")
+def run_profile():
+    """运行配置：PLAYWRIGHT_PROFILE=debug 时显示浏览器并放慢操作"""
+    return get_profile()
+
 @pytest.fixture(scope="session")
-def browser_context():
-    """会话级别的浏览器上下文"""
+def browser(run_profile):
+    """每个 worker 一个浏览器（xdist 下 session 作用域按 worker 划分）"""
     with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=False,
-            slow_mo=TestConfig.SLOW_MO
-        )
-        context = browser.new_context(
-            viewport={'width': 1280, 'height': 720},
-            user_agent='Playwright Test Bot'
-        )
-        yield context
-        context.close()
+        browser = p.chromium.launch(**run_profile.launch_options())
+        yield browser
         browser.close()
 
+@pytest.fixture(scope="session")
+def resource_blocker():
+    """快速模式：PLAYWRIGHT_FAST_MODE=1 时拦截图片、字体和媒体"""
+    blocker = ResourceBlocker.from_env()
+    yield blocker
+    if blocker is not None:
+        print(f"\n快速模式统计: {blocker.summary()}")
+
+@pytest.fixture(scope="session")
+def failure_tracer(run_profile):
+    """trace 录制：默认只保存失败和重试的测试，PLAYWRIGHT_TRACE / PLAYWRIGHT_TRACE_SAMPLE 可覆盖"""
+    tracer = FailureTracer.from_env(default_mode=run_profile.trace)
+    yield tracer
+    if tracer.recorded:
+        print(f"\ntrace 统计: {tracer.summary()}")
+
+@pytest.fixture(scope="session")
+def har_index(httpbin_server):
+    """HAR 录制/回放，由 PLAYWRIGHT_HAR 控制，默认关闭"""
+    har = HarIndex.from_env(har_dir=TestConfig.HAR_DIR, base_url=TestConfig.BASE_URL)
+    yield har
+    if har.enabled:
+        print(f"\nHAR 统计: {har.summary()}")
+
+def _test_failed(node):
+    """根据钩子记录的报告判断测试是否失败，以及是否为重试（pytest-rerunfailures）"""
+    reports = [getattr(node, f"rep_{when}", None) for when in ("setup", "call")]
+    failed = any(rep is not None and rep.failed for rep in reports)
+    retried = getattr(node, "execution_count", 1) > 1
+    return failed, retried
+
+def _finish_trace(request, tracer, context):
+    failed, retried = _test_failed(request.node)
+    tracer.stop(context, request.node.nodeid, failed=failed, retried=retried)
+
 @pytest.fixture
-def page(browser_context):
+def browser_context(request, browser, run_profile, resource_blocker, failure_tracer, har_index):
+    """每个测试独立的浏览器上下文，创建开销远小于启动浏览器"""
+    context = browser.new_context(**run_profile.context_options())
+    # 后注册的路由先执行：拦截器放在 HAR 之后注册，被拦截的资源不进入录制或回放
+    har_index.attach(context, request.node.nodeid)
+    if resource_blocker is not None:
+        resource_blocker.attach(context)
+    failure_tracer.start(context, request.node.nodeid)
+    yield context
+    _finish_trace(request, failure_tracer, context)
+    context.close()
+
+@pytest.fixture
+def page(browser_context, run_profile):
     """每个测试函数的独立页面"""
     page = browser_context.new_page()
-    page.set_default_timeout(TestConfig.TIMEOUT)
+    page.set_default_timeout(run_profile.timeout)
     yield page
     page.close()
 
+@pytest.fixture(scope="session")
+def page_reuse_stats():
+    """汇总各测试类复用页面节省的导航次数"""
+    stats = Counter()
+    yield stats
+    if stats['navigations']:
+        print(f"\n页面复用统计: 导航 {stats['navigations']} 次, 节省 {stats['navigations_saved']} 次, "
+              f"快照还原 {stats['snapshot_restores']} 次, 回退导航 {stats['fallback_navigations']} 次")
+
+@pytest.fixture(scope="class")
+def reusable_pages(request, browser, run_profile, resource_blocker, har_index, page_reuse_stats):
+    """测试类内共享的已加载页面：参数化用例只导航一次，用例之间还原表单和 DOM"""
+    context = browser.new_context(**run_profile.context_options())
+    # 后注册的路由先执行：拦截器放在 HAR 之后注册，被拦截的资源不进入录制或回放
+    har_index.attach(context, request.node.nodeid)
+    if resource_blocker is not None:
+        resource_blocker.attach(context)
+    pages = ReusablePage(context, timeout=run_profile.timeout, stats=page_reuse_stats)
+    yield pages
+    pages.close()
+    context.close()
+
+@pytest.fixture(autouse=True)
+def _reusable_pages_trace(request, failure_tracer):
+    """使用共享页面的测试：在共享上下文上按测试录制 trace chunk"""
+    if "reusable_pages" not in request.fixturenames:
+        yield
+        return
+    pages = request.getfixturevalue("reusable_pages")
+    pages.current = None
+    failure_tracer.start(pages.context, request.node.nodeid)
+    yield
+    _finish_trace(request, failure_tracer, pages.context)
+
+@pytest.fixture(scope="session")
+def session_cache():
+    """会话状态缓存：登录只在缓存缺失或过期时执行"""
+    return SessionCache(cache_dir=TestConfig.AUTH_DIR, ttl=TestConfig.SESSION_TTL)
+
+def _login(context, role):
+    """登录步骤：设置会话Cookie（演示用）"""
+    page = context.new_page()
+    page.goto(f"{TestConfig.BASE_URL}/cookies/set/session_role/{role}")
+    page.close()
+
+def _has_session(context, role):
+    return any(
+        cookie['name'] == 'session_role' and cookie['value'] == role
+        for cookie in context.cookies(TestConfig.BASE_URL)
+    )
+
+@pytest.fixture
+def authenticated_page(request, browser, run_profile, session_cache, resource_blocker, failure_tracer,
+                       har_index):
+    """已登录的页面，角色可通过 @pytest.mark.role("admin") 指定"""
+    marker = request.node.get_closest_marker("role")
+    role = marker.args[0] if marker else "user"
+    
+    context = session_cache.new_context(
+        browser, "httpbin", role,
+        login=lambda ctx: _login(ctx, role),
+        validate=lambda ctx: _has_session(ctx, role),
+        **run_profile.context_options()
+    )
+    # 后注册的路由先执行：拦截器放在 HAR 之后注册，被拦截的资源不进入录制或回放
+    har_index.attach(context, request.node.nodeid)
+    if resource_blocker is not None:
+        resource_blocker.attach(context)
+    failure_tracer.start(context, request.node.nodeid)
+    page = context.new_page()
+    page.set_default_timeout(run_profile.timeout)
+    yield page
+    _finish_trace(request, failure_tracer, context)
+    context.close()
+
+@pytest.fixture(scope="session")
+def clock_stats():
+    """汇总各测试虚拟时钟推进的时间，会话结束时打印节省的等待"""
+    stats = ClockStats()
+    yield stats
+    if stats.clocks:
+        summary = stats.summary()
+        print(f"\n虚拟时钟: 推进 {summary['virtual_seconds']}秒, 实际耗时 {summary['wall_seconds']}秒, "
+              f"节省 {summary['saved_seconds']}秒")
+
+@pytest.fixture
+def clock(browser_context, clock_stats):
+    """在测试上下文中安装可控时钟，页面计时器由测试推进"""
+    return VirtualClock(browser_context, clock_stats).install()
+
+@pytest.fixture(scope="session")
+def visual_baseline():
+    """视觉回归基线目录，会话结束时打印比对统计"""
+    visual = VisualBaseline(TestConfig.VISUAL_BASELINE_DIR, diff_dir=TestConfig.VISUAL_DIFF_DIR)
+    yield visual
+    if visual.checked:
+        print(f"\n视觉回归统计: {visual.summary()}")
+
+@pytest.fixture
+def assert_screenshot(request, page, visual_baseline):
+    """与基线比对当前页面截图，不一致时断言失败；结果记录在测试项上供失败钩子报告"""
+    request.node.visual_results = []
+    
+    def check(name=None, masks=None, **options):
+        name = name or request.node.name.replace("[", "_").replace("]", "_")
+        result = visual_baseline.check(name, page.screenshot(**options), masks=masks)
+        request.node.visual_results.append((name, result))
+        if result.missing_baseline:
+            message = (f"缺少基线: {name}，实际截图已保存到 {TestConfig.VISUAL_DIFF_DIR}，"
+                       f"确认无误后以 UPDATE_BASELINES=1 运行生成基线")
+            # 基线不随仓库提交，默认跳过；CI 中设置 VISUAL_STRICT=1，缺少基线即失败
+            if TestConfig.VISUAL_STRICT:
+                pytest.fail(message)
+            pytest.skip(message)
+        assert result.match, (
+            f"截图与基线不一致: {name}，差异像素 {result.diff_pixels}"
+            + (f"，差异图 {result.diff_path}" if result.diff_path else "，尺寸不同")
+        )
+        return result
+    
+    return check
+
 @pytest.fixture
 def test_data():
     """测试数据fixture"""
@@ -146,9 +367,9 @@ class TestFormOperations:
         ("custemail", "zhangsan@test.com"),
         ("comments", "测试评论内容")
     ])
-    def test_individual_form_fields(self, page: Page, field_name, test_value):
-        """参数化测试各个表单字段"""
-        page.goto(f"{TestConfig.BASE_URL}/forms/post")
+    def test_individual_form_fields(self, reusable_pages, field_name, test_value):
+        """参数化测试各个表单字段（复用同一已加载页面）"""
+        page = reusable_pages.get(f"{TestConfig.BASE_URL}/forms/post")
         
         # 填写指定字段
         if field_name == "comments":
@@ -226,25 +447,28 @@ class TestScreenshotAndRecording:
         
         # 全页面截图
         page.screenshot(path='full_page.png', full_page=True)
+    
+    def test_visual_regression(self, page: Page, assert_screenshot):
+        """视觉回归：以 UPDATE_BASELINES=1 运行保存基线，之后与基线比对；没有基线时跳过（VISUAL_STRICT=1 时失败）"""
+        page.goto(f"{TestConfig.BASE_URL}/html")
+        
+        # 遮罩掉可能变化的区域（这里演示遮罩页面顶部 20 像素）
+        assert_screenshot("httpbin_html", masks=[{'x': 0, 'y': 0, 'width': 1280, 'height': 20}],
+                          full_page=True)
 
 class TestNetworkInterception:
     """网络拦截测试"""
     
     def test_request_interception(self, page: Page):
         """测试请求拦截"""
-        requests = []
-        
         # 监听所有请求
-        page.on('request', lambda request: requests.append({
-            'url': request.url,
-            'method': request.method
-        }))
+        recorder = NetworkRecorder(max_entries=100).attach(page)
         
         page.goto(f"{TestConfig.BASE_URL}/html")
         
         # 验证捕获到请求
-        assert len(requests) > 0
-        assert any(TestConfig.BASE_URL in req['url'] for req in requests)
+        assert recorder.total_requests > 0
+        assert any(TestConfig.BASE_URL in req['url'] for req in recorder.entries('request'))
     
     def test_response_modification(self, page: Page):
         """测试响应修改"""
@@ -268,9 +492,9 @@ class TestDataDriven:
         UserData("user1", "user1@test.com", "pass123", "success"),
         UserData("user2", "user2@test.com", "pass456", "success"),
     ], ids=['user1', 'user2'])
-    def test_parameterized_users(self, page: Page, user_data: UserData):
-        """参数化用户测试"""
-        page.goto(f"{TestConfig.BASE_URL}/forms/post")
+    def test_parameterized_users(self, reusable_pages, user_data: UserData):
+        """参数化用户测试（复用同一已加载页面）"""
+        page = reusable_pages.get(f"{TestConfig.BASE_URL}/forms/post")
         
         # 使用测试数据填写表单
         page.fill('input[name="custname"]', user_data.username)
@@ -281,13 +505,107 @@ class TestDataDriven:
         assert page.locator('input[name="custname"]').input_value() == user_data.username
         assert page.locator('input[name="custemail"]').input_value() == user_data.email
 
+    @pytest.mark.parametrize("shard", range(TestConfig.USER_DATA_SHARDS),
+                             ids=lambda shard: f"shard{shard}")
+    def test_users_from_file(self, browser_context, page_reuse_stats, run_profile, shard):
+        """从数据文件读取用户：每个分片一个测试，分片内按批次处理，测试数量不随行数增长"""
+        if not TestConfig.USER_DATA_FILE:
+            pytest.skip("未设置 USER_DATA_FILE")
+        
+        source = UserDataSource(TestConfig.USER_DATA_FILE, sheet=TestConfig.USER_DATA_SHEET)
+        source = source.shard(shard, TestConfig.USER_DATA_SHARDS)
+        pages = ReusablePage(browser_context, timeout=run_profile.timeout, stats=page_reuse_stats)
+        mismatches = []
+        
+        for batch in source.batches(TestConfig.USER_DATA_BATCH):
+            for user_data in batch:
+                page = pages.get(f"{TestConfig.BASE_URL}/forms/post")
+                page.fill('input[name="custname"]', user_data.username)
+                page.fill('input[name="custemail"]', user_data.email)
+                page.fill('textarea[name="comments"]', f"Password: {user_data.password}")
+                
+                # success 行应通过表单校验，error 行应被拦截
+                valid = page.locator("form").evaluate("form => form.checkValidity()")
+                if valid != (user_data.expected_result == "success"):
+                    mismatches.append(user_data.username or user_data.email)
+        
+        summary = source.summary()
+        print(f"\n数据分片 {shard}: {summary}")
+        if not source.read:
+            pytest.skip(f"数据分片 {shard} 没有数据行（共 {source.count()} 行）")
+        if not source.valid:
+            pytest.fail(f"数据分片 {shard} 的 {source.read} 行全部无效: {summary['errors']}")
+        if source.invalid:
+            pytest.fail(f"数据分片 {shard} 有 {source.invalid} 行无效数据: {summary['errors']}")
+        assert not mismatches, f"{len(mismatches)} 个用户的校验结果与预期不符: {mismatches[:10]}"
+
+class TestAuthenticatedSession:
+    """已登录会话测试（会话状态来自缓存）"""
+    
+    def test_session_cookie_present(self, authenticated_page: Page):
+        """测试缓存的会话Cookie随上下文恢复"""
+        authenticated_page.goto(f"{TestConfig.BASE_URL}/cookies")
+        assert 'session_role' in authenticated_page.content()
+    
+    @pytest.mark.role("admin")
+    def test_admin_session(self, authenticated_page: Page):
+        """测试按角色区分的会话"""
+        authenticated_page.goto(f"{TestConfig.BASE_URL}/cookies")
+        assert 'admin' in authenticated_page.content()
+
+class TestVirtualClock:
+    """虚拟时钟测试：计时器驱动的界面在毫秒内完成，不做真实等待"""
+    
+    TIMER_PAGE = """
+    <div id="status">倒计时中</div>
+    <div id="countdown">10</div>
+    <script>
+        let left = 10;
+        const timer = setInterval(() => {
+            left -= 1;
+            document.getElementById('countdown').textContent = left;
+            if (left === 0) {
+                clearInterval(timer);
+                document.getElementById('status').textContent = '完成';
+            }
+        }, 1000);
+        // 5 分钟无操作后提示会话即将过期
+        setTimeout(() => {
+            document.body.insertAdjacentHTML('beforeend', '<p id="expiry">会话即将过期</p>');
+        }, 5 * 60 * 1000);
+    </script>
+    """
+    
+    def test_countdown(self, clock, page: Page):
+        """推进 10 秒，倒计时结束"""
+        page.set_content(self.TIMER_PAGE)
+        clock.run_for(10000)
+        assert page.locator('#status').inner_text() == '完成'
+    
+    def test_session_expiry_banner(self, clock, page: Page):
+        """跳过 5 分钟，过期提示出现"""
+        page.set_content(self.TIMER_PAGE)
+        assert page.locator('#expiry').count() == 0
+        clock.fast_forward("05:00")
+        assert page.locator('#expiry').is_visible()
+    
+    def test_wait_for_condition(self, clock, page: Page):
+        """按条件推进时钟，替代固定时长的 sleep"""
+        page.set_content(self.TIMER_PAGE)
+        advanced = clock.run_until(page, "() => document.getElementById('countdown').textContent === '3'",
+                                   step=500)
+        assert 7000 <= advanced <= 7500
+
 # 自定义标记的测试
 @pytest.mark.slow
 class TestSlowOperations:
     """慢速操作测试（标记为slow）"""
     
     def test_delayed_response(self, page: Page):
-        """测试延迟响应"""
+        """测试延迟响应
+
+        /delay 是服务端等待，虚拟时钟无法跳过；本地 httpbin 按 HTTPBIN_DELAY_SCALE 缩短等待
+        """
         page.goto(f"{TestConfig.BASE_URL}/delay/3")
         
         # 验证页面最终加载成功
@@ -300,30 +618,54 @@ def test_skipped_example(page: Page):
     """被跳过的测试示例"""
     pass
 
+def pytest_configure(config):
+    """注册自定义标记，--strict-markers 下也能运行"""
+    config.addinivalue_line("markers", "role(name): authenticated_page 使用的会话角色，默认 user")
+    config.addinivalue_line("markers", "slow: 慢速测试")
+
 # 测试失败时的自动截图
 @pytest.hookimpl(tryfirst=True, hookwrapper=True)
 def pytest_runtest_makereport(item, call):
-    """pytest钩子：测试失败时自动截图"""
+    """pytest钩子：测试失败时自动截图，附上视觉回归的差异图，并记录结果供 trace 取舍"""
     outcome = yield
     rep = outcome.get_result()
+    # 记录各阶段的报告，fixture 清理时据此决定是否保存 trace
+    setattr(item, f"rep_{rep.when}", rep)
     
     if rep.when == "call" and rep.failed:
-        # 获取page fixture
-        if "page" in item.fixturenames:
-            page = item.funcargs["page"]
+        # 获取page fixture，使用共享页面的测试取当前页面
+        page = item.funcargs.get("page")
+        if page is None and "reusable_pages" in item.funcargs:
+            page = item.funcargs["reusable_pages"].current
+        if page is not None:
             # 生成截图文件名
             test_name = item.name.replace("[", "_").replace("]", "_")
-            screenshot_path = f"screenshots/failed_{test_name}.png"
+            sink = TestConfig.SCREENSHOT_SINK
             
             try:
-                page.screenshot(path=screenshot_path)
-                print(f"\n截图已保存: {screenshot_path}")
+                if sink is not None:
+                    # 只在此处抓取画面，编码和写盘在后台完成
+                    sink.capture(page, f"failed_{test_name}.png")
+                    print(f"\n截图已提交: screenshots/failed_{test_name}")
+                else:
+                    screenshot_path = f"screenshots/failed_{test_name}.png"
+                    page.screenshot(path=screenshot_path)
+                    print(f"\n截图已保存: {screenshot_path}")
             except Exception as e:
                 print(f"\n保存截图失败: {e}")
+        
+        # 视觉回归失败时把差异图路径附加到报告中
+        mismatches = [(name, result) for name, result in getattr(item, "visual_results", [])
+                      if not result.match]
+        if mismatches:
+            lines = [f"{name}: 缺少基线" if result.missing_baseline else
+                     f"{name}: 差异像素 {result.diff_pixels} ({result.diff_ratio:.4%}), "
+                     f"差异图 {result.diff_path or '尺寸不同，未生成'}"
+                     for name, result in mismatches]
+            rep.sections.append(("visual regression", "\n".join(lines)))
 
 if __name__ == "__main__":
     # 创建截图目录
-    import os
     os.makedirs("screenshots", exist_ok=True)
     
     # 运行测试
@@ -3,11 +3,24 @@ Playwright 高级技巧示例
 演示网络拦截、移动端模拟、Cookie管理、性能监控等高级功能
 """
 
+import asyncio
 import json
 import time
 from playwright.sync_api import sync_playwright
 from datetime import datetime
 
+from network_recorder import NetworkRecorder
+from session_cache import SessionCache
+from resource_blocker import ResourceBlocker
+from perf_sampler import PerfSampler, flatten_samples
+from perf_history import PerfHistory
+from cdp_metrics import CDPMetricsCollector
+from perf_observer import PerfTimeline
+from web_vitals import measure_vitals
+from network_profiles import apply_profile, get_profiles
+from device_matrix import print_matrix, run_device_matrix
+from screenshot_sink import ScreenshotSink
+
 def network_interception_example():
     """网络拦截和修改示例"""
     
@@ -16,42 +29,8 @@ def network_interception_example():
         context = browser.new_context()
         page = context.new_page()
         
-        # 存储网络请求和响应
-        requests = []
-        responses = []
-        failed_requests = []
-        
-        # 监听网络事件
-        def handle_request(request):
-            requests.append({
-                'url': request.url,
-                'method': request.method,
-                'headers': dict(request.headers),
-                'timestamp': datetime.now().isoformat()
-            })
-            print(f"🔄 请求: {request.method} {request.url}")
-        
-        def handle_response(response):
-            responses.append({
-                'url': response.url,
-                'status': response.status,
-                'headers': dict(response.headers),
-                'timestamp': datetime.now().isoformat()
-            })
-            print(f"✅ 响应: {response.status} {response.url}")
-        
-        def handle_request_failed(request):
-            failed_requests.append({
-                'url': request.url,
-                'failure': request.failure,
-                'timestamp': datetime.now().isoformat()
-            })
-            print(f"❌ 请求失败: {request.url}")
-        
-        # 绑定事件监听器
-        page.on('request', handle_request)
-        page.on('response', handle_response)
-        page.on('requestfailed', handle_request_failed)
+        # 记录网络事件：有界缓冲区 + 按域名/状态码计数，不逐条打印
+        recorder = NetworkRecorder(max_entries=500, capture_headers=True).attach(context)
         
         # 拦截并修改API响应
         def mock_api_response(route):
@@ -90,27 +69,27 @@ def network_interception_example():
                 print("✅ API响应拦截成功")
             
             # 保存网络日志
-            network_log = {
-                'requests': requests,
-                'responses': responses,
-                'failed_requests': failed_requests,
-                'summary': {
-                    'total_requests': len(requests),
-                    'total_responses': len(responses),
-                    'failed_requests': len(failed_requests)
-                }
-            }
+            network_log = recorder.to_dict()
             
             with open('network_log.json', 'w', encoding='utf-8') as f:
                 json.dump(network_log, f, indent=2, ensure_ascii=False)
             
-            print(f"✅ 网络日志已保存: {len(requests)} 请求, {len(responses)} 响应")
+            print(f"✅ 网络日志已保存: {recorder.total_requests} 请求, "
+                  f"{recorder.total_responses} 响应, {recorder.total_failed} 失败")
+            print(f"📊 状态码分布: {network_log['summary']['by_status']}")
             
         finally:
             browser.close()
 
-def mobile_simulation_example():
-    """移动端设备模拟示例"""
+def mobile_simulation_example(profiles=None):
+    """移动端设备模拟示例
+    
+    profiles 为网络配置名称列表（如 ['4g', '3g-slow-cpu-4x']），每个设备在每种网络下各加载一次
+    """
+    
+    profiles = get_profiles(profiles)
+    # 截图在后台线程编码写盘，相同画面只保存一次
+    sink = ScreenshotSink()
     
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False)
@@ -123,80 +102,153 @@ def mobile_simulation_example():
             p.devices['Samsung Galaxy S21']
         ]
         
+        load_times = {}
+        
         for i, device in enumerate(device_configs):
             print(f"\n📱 测试设备 {i+1}: {device.get('user_agent', '').split(')')[-1]}")
             
-            # 创建移动设备上下文
-            context = browser.new_context(**device)
-            page = context.new_page()
-            
-            try:
-                # 访问响应式网站
-                page.goto('https://whatismyviewport.com')
-                page.wait_for_load_state('networkidle')
-                
-                # 获取视口信息
-                viewport_info = page.evaluate('''() => {
-                    return {
-                        width: window.innerWidth,
-                        height: window.innerHeight,
-                        userAgent: navigator.userAgent,
-                        devicePixelRatio: window.devicePixelRatio
-                    }
-                }''')
-                
-                print(f"  视口尺寸: {viewport_info['width']}x{viewport_info['height']}")
-                print(f"  设备像素比: {viewport_info['devicePixelRatio']}")
+            for profile in profiles:
+                # 创建移动设备上下文
+                context = browser.new_context(**device)
+                page = context.new_page()
+                # CDP 会话需保持引用直到页面关闭
+                cdp_session = apply_profile(page, profile)
                 
-                # 测试触摸事件
-                if device.get('has_touch', False):
-                    print("  📱 支持触摸操作")
-                    # 模拟触摸滑动
-                    page.touch_screen.tap(viewport_info['width']//2, viewport_info['height']//2)
-                
-                # 截图保存
-                page.screenshot(path=f'mobile_screenshot_device_{i+1}.png')
-                print(f"  📸 截图已保存: mobile_screenshot_device_{i+1}.png")
-                
-                time.sleep(1)
-                
-            finally:
-                context.close()
+                try:
+                    # 访问响应式网站
+                    start_time = time.perf_counter()
+                    page.goto('https://whatismyviewport.com')
+                    page.wait_for_load_state('networkidle')
+                    load_time = time.perf_counter() - start_time
+                    load_times[(i + 1, profile.name)] = load_time
+                    print(f"  🌐 网络配置 {profile.name}: 加载耗时 {load_time:.2f}秒")
+                    
+                    # 视口、触摸和截图与网络配置无关，每个设备只做一次
+                    if profile is not profiles[0]:
+                        continue
+                    
+                    # 获取视口信息
+                    viewport_info = page.evaluate('''() => {
+                        return {
+                            width: window.innerWidth,
+                            height: window.innerHeight,
+                            userAgent: navigator.userAgent,
+                            devicePixelRatio: window.devicePixelRatio
+                        }
+                    }''')
+                    
+                    print(f"  视口尺寸: {viewport_info['width']}x{viewport_info['height']}")
+                    print(f"  设备像素比: {viewport_info['devicePixelRatio']}")
+                    
+                    # 测试触摸事件
+                    if device.get('has_touch', False):
+                        print("  📱 支持触摸操作")
+                        # 模拟触摸滑动
+                        page.touch_screen.tap(viewport_info['width']//2, viewport_info['height']//2)
+                    
+                    # 截图保存
+                    sink.capture(page, f'mobile_screenshot_device_{i+1}.png')
+                    print(f"  📸 截图已提交: mobile_screenshot_device_{i+1}.png")
+                    
+                    time.sleep(1)
+                    
+                finally:
+                    if cdp_session is not None:
+                        cdp_session.detach()
+                    context.close()
         
         browser.close()
+    
+    sink.close()
+    stats = sink.summary()
+    print(f"\n📸 截图 {stats['captured']} 张, 写入 {stats['written']} 张, 重复 {stats['duplicates']} 张, "
+          f"后台编码写盘 {stats['background_seconds']}秒")
+    
+    if len(profiles) > 1:
+        print("\n📊 各网络配置下的加载耗时（秒）:")
+        for profile in profiles:
+            times = [t for (_, name), t in load_times.items() if name == profile.name]
+            if times:
+                print(f"  {profile.name}: 平均 {sum(times) / len(times):.2f}, 最慢 {max(times):.2f}")
+    
+    return load_times
+
+def device_matrix_example(devices=None, urls=None, concurrency=8):
+    """设备矩阵并发测试示例
+    
+    与 mobile_simulation_example 逐个设备运行不同，所有设备 × URL 组合在共享浏览器上并发运行，
+    devices 为空时使用所有竖屏移动设备
+    """
+    
+    urls = urls or ['https://example.com', 'https://httpbin.org']
+    
+    report = asyncio.run(run_device_matrix(urls, devices, concurrency=concurrency,
+                                           screenshot_dir='device_screenshots'))
+    print_matrix(report)
+    
+    with open('device_matrix.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print("✅ 设备矩阵结果已保存到 device_matrix.json")
+    
+    return report
+
+def setup_demo_cookies(context):
+    """Cookie 初始化：只在会话缓存缺失或失效时执行"""
+    
+    page = context.new_page()
+    
+    # 访问测试页面
+    page.goto('https://httpbin.org/cookies/set/test-cookie/test-value')
+    page.wait_for_load_state('networkidle')
+    
+    # 设置自定义Cookie
+    context.add_cookies([
+        {
+            'name': 'custom_session',
+            'value': 'abc123def456',
+            'domain': 'httpbin.org',
+            'path': '/'
+        },
+        {
+            'name': 'user_preference',
+            'value': 'dark_mode',
+            'domain': 'httpbin.org',
+            'path': '/'
+        }
+    ])
+    
+    # 设置本地存储
+    page.evaluate('''() => {
+        localStorage.setItem('app_version', '1.2.3');
+        localStorage.setItem('last_visit', new Date().toISOString());
+    }''')
+    
+    page.close()
+    print("✅ 已设置自定义Cookie和本地存储")
+
+def has_demo_session(context):
+    """会话有效性检查：自定义会话Cookie仍然存在"""
+    return any(cookie['name'] == 'custom_session' for cookie in context.cookies())
 
-def cookie_and_storage_example():
+def cookie_and_storage_example(session_cache=None):
     """Cookie和本地存储管理示例"""
     
+    session_cache = session_cache or SessionCache(ttl=3600)
+    
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False, slow_mo=800)
-        context = browser.new_context()
+        
+        # 缓存有效时直接带上已保存的 Cookie 和 localStorage，跳过初始化
+        context = session_cache.new_context(
+            browser, 'httpbin.org', 'demo',
+            login=setup_demo_cookies,
+            validate=has_demo_session
+        )
         page = context.new_page()
         
         try:
             print("开始Cookie和存储管理演示...")
-            
-            # 访问测试页面
-            page.goto('https://httpbin.org/cookies/set/test-cookie/test-value')
-            page.wait_for_load_state('networkidle')
-            
-            # 设置自定义Cookie
-            context.add_cookies([
-                {
-                    'name': 'custom_session',
-                    'value': 'abc123def456',
-                    'domain': 'httpbin.org',
-                    'path': '/'
-                },
-                {
-                    'name': 'user_preference',
-                    'value': 'dark_mode',
-                    'domain': 'httpbin.org',
-                    'path': '/'
-                }
-            ])
-            
-            print("✅ 已设置自定义Cookie")
+            print(f"会话缓存: 命中 {session_cache.hits} 次, 未命中 {session_cache.misses} 次")
             
             # 访问Cookie查看页面
             page.goto('https://httpbin.org/cookies')
@@ -208,10 +260,8 @@ def cookie_and_storage_example():
             for cookie in cookies:
                 print(f"  {cookie['name']}: {cookie['value']}")
             
-            # 设置本地存储
+            # sessionStorage 不在 storage_state 中，每次单独设置
             page.evaluate('''() => {
-                localStorage.setItem('app_version', '1.2.3');
-                localStorage.setItem('last_visit', new Date().toISOString());
                 sessionStorage.setItem('session_id', 'session_' + Math.random());
             }''')
             
@@ -246,26 +296,49 @@ def cookie_and_storage_example():
         finally:
             browser.close()
 
-def performance_monitoring_example():
-    """性能监控示例"""
+def performance_monitoring_example(fast_mode=None, samples=5, warmup=1,
+                                   history_path='perf_history.db', profiles=None):
+    """性能监控示例
+    
+    每个URL冷启动和热启动各采样 samples 次（另有 warmup 次预热不计入），
+    输出 min/p50/p95/p99/标准差；单次快照仅用于资源数和内存。
+    原始样本追加到 history_path 指向的 SQLite 历史库，可用 perf_history.py compare 检测回归。
+    fast_mode 为 True 时拦截图片、字体和媒体，为 None 时由 PLAYWRIGHT_FAST_MODE 环境变量决定。
+    profiles 为网络配置名称列表（如 ['none', '3g', 'slow-cpu-4x']），采样按配置分别进行
+    """
+    
+    profiles = get_profiles(profiles)
+    
+    if fast_mode is None:
+        blocker = ResourceBlocker.from_env()
+    else:
+        blocker = ResourceBlocker() if fast_mode else None
     
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False)
         context = browser.new_context()
+        if blocker is not None:
+            blocker.attach(context)
+        # 页面运行期间持续接收资源、长任务、绘制和布局偏移条目
+        timeline = PerfTimeline()
+        timeline.attach(context)
         page = context.new_page()
         
+        # Chromium 下按步骤采集布局、样式重算和脚本耗时
+        cdp_collector = CDPMetricsCollector.create(page)
+        
+        sampler = PerfSampler(
+            browser, samples=samples, warmup=warmup,
+            on_context=blocker.attach if blocker is not None else None
+        )
+        
         # 性能指标收集
         performance_metrics = []
-        load_times = []
+        history_samples = []
         
         def collect_metrics():
             metrics = page.evaluate('''() => {
-                const navigation = performance.getEntriesByType('navigation')[0];
                 return {
-                    domContentLoaded: navigation.domContentLoadedEventEnd - navigation.domContentLoadedEventStart,
-                    loadComplete: navigation.loadEventEnd - navigation.loadEventStart,
-                    firstPaint: performance.getEntriesByName('first-paint')[0]?.startTime || 0,
-                    firstContentfulPaint: performance.getEntriesByName('first-contentful-paint')[0]?.startTime || 0,
                     networkRequests: performance.getEntriesByType('resource').length,
                     memoryInfo: performance.memory ? {
                         usedJSHeapSize: performance.memory.usedJSHeapSize,
@@ -286,23 +359,61 @@ def performance_monitoring_example():
             ]
             
             for url in test_urls:
-                print(f"\n🔍 测试网站: {url}")
+                print(f"\n🔍 测试网站: {url} (冷/热各 {samples} 次)")
                 
-                start_time = time.time()
-                page.goto(url, wait_until='networkidle')
-                load_time = time.time() - start_time
+                # 多次采样，单次结果噪声太大；每个网络配置分别采样
+                by_profile = {}
+                for profile in profiles:
+                    # CDP 会话需保持引用直到采样结束
+                    cdp_sessions = []
+                    sampler.on_page = lambda new_page, profile=profile: cdp_sessions.append(
+                        apply_profile(new_page, profile))
+                    sampled = sampler.sample(url)
+                    by_profile[profile.name] = {'cold': sampled['cold'], 'warm': sampled['warm']}
+                    prefix = profile.name if profile.name != 'none' else None
+                    history_samples.extend(flatten_samples(sampled, prefix))
                 
-                # 收集性能指标
+                # 单次快照：资源数、内存和各步骤的 CDP 指标增量
+                if cdp_collector is not None:
+                    cdp_collector.measure('navigate', page.goto, url, wait_until='networkidle')
+                    cdp_collector.measure('scroll', page.evaluate,
+                                          'window.scrollTo(0, document.body.scrollHeight)')
+                else:
+                    page.goto(url, wait_until='networkidle')
                 metrics = collect_metrics()
                 metrics['url'] = url
-                metrics['totalLoadTime'] = load_time
+                metrics['cdp'] = cdp_collector.take_steps() if cdp_collector is not None else None
+                
+                # 推送尚未发送的条目，networkidle 之后出现的条目也包括在内
+                timeline.flush(page)
+                metrics['timeline'] = timeline.summary(page)
+                timeline.discard(page)
+                metrics['profiles'] = by_profile
+                # 汇总使用第一个网络配置的冷启动 p50
+                first = by_profile[profiles[0].name]
+                metrics['totalLoadTime'] = first['cold']['totalLoad'].get('p50', 0) / 1000
                 
                 performance_metrics.append(metrics)
                 
-                print(f"  📊 加载时间: {load_time:.2f}秒")
-                print(f"  📊 DOM加载: {metrics['domContentLoaded']:.2f}ms")
-                print(f"  📊 首次绘制: {metrics['firstPaint']:.2f}ms")
+                for profile_name, sampled in by_profile.items():
+                    print(f"  🌐 网络配置: {profile_name}")
+                    for mode, label in (('cold', '冷启动'), ('warm', '热启动')):
+                        total = sampled[mode]['totalLoad']
+                        dcl = sampled[mode]['domContentLoaded']
+                        fcp = sampled[mode]['firstContentfulPaint']
+                        print(f"    📊 {label} 加载: p50 {total.get('p50', 0):.0f}ms, "
+                              f"p95 {total.get('p95', 0):.0f}ms, σ {total.get('stddev', 0):.0f}ms"
+                              f" (剔除 {total['rejected']} 个离群值)")
+                        print(f"    📊 {label} DOM加载 p50: {dcl.get('p50', 0):.0f}ms, "
+                              f"FCP p50: {fcp.get('p50', 0):.0f}ms")
                 print(f"  📊 网络请求: {metrics['networkRequests']}个")
+                print(f"  📊 长任务: {metrics['timeline']['longTasks']}个 "
+                      f"({metrics['timeline']['longTaskMs']}ms), "
+                      f"布局偏移: {metrics['timeline']['layoutShift']}")
+                for step in metrics['cdp'] or []:
+                    print(f"  🧮 {step['step']}: 布局 {step['LayoutCount']} 次, "
+                          f"样式重算 {step['RecalcStyleDurationMs']}ms, "
+                          f"脚本 {step['ScriptDurationMs']}ms, 任务 {step['TaskDurationMs']}ms")
                 
                 if metrics['memoryInfo']:
                     memory_mb = metrics['memoryInfo']['usedJSHeapSize'] / 1024 / 1024
@@ -311,8 +422,12 @@ def performance_monitoring_example():
             # 保存性能报告
             performance_report = {
                 'timestamp': datetime.now().isoformat(),
+                'samples': samples,
+                'warmup': warmup,
+                'profiles': [profile.name for profile in profiles],
                 'metrics': performance_metrics,
                 'summary': {
+                    # 各站点冷启动 p50 的平均值（秒）
                     'average_load_time': sum(m['totalLoadTime'] for m in performance_metrics) / len(performance_metrics),
                     'fastest_site': min(performance_metrics, key=lambda x: x['totalLoadTime'])['url'],
                     'slowest_site': max(performance_metrics, key=lambda x: x['totalLoadTime'])['url']
@@ -323,7 +438,56 @@ def performance_monitoring_example():
                 json.dump(performance_report, f, indent=2)
             
             print(f"\n✅ 性能报告已保存到 performance_report.json")
-            print(f"📈 平均加载时间: {performance_report['summary']['average_load_time']:.2f}秒")
+            print(f"📈 平均加载时间 (冷启动 p50): {performance_report['summary']['average_load_time']:.2f}秒")
+            
+            # 追加到历史库，报告文件只保留本次摘要
+            if history_path:
+                history = PerfHistory(history_path)
+                try:
+                    run_id = history.record_run(history_samples, browser_version=browser.version,
+                                                label='performance_monitoring_example')
+                    regressions = [f for f in history.compare(run_id) if f['regression']]
+                finally:
+                    history.close()
+                print(f"🗄️ 已记录到 {history_path} (run {run_id}), 回归 {len(regressions)} 项")
+                for finding in regressions:
+                    print(f"  ❌ {finding['url']} {finding['metric']}: "
+                          f"{finding['baseline_median']} → {finding['current_median']}ms")
+            if blocker is not None:
+                print(f"⚡ 快速模式: {blocker.summary()}")
+            
+        finally:
+            browser.close()
+
+def web_vitals_example(thresholds=None):
+    """Core Web Vitals 示例：LCP、CLS、INP、TTFB 并按阈值判定"""
+    
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=False)
+        
+        try:
+            print("开始 Core Web Vitals 测量...")
+            
+            # 表单页会执行脚本化交互以测量 INP，其他页面不测 INP
+            test_urls = [
+                'https://example.com',
+                'https://httpbin.org/forms/post'
+            ]
+            
+            records = measure_vitals(browser, test_urls, thresholds=thresholds)
+            
+            for record in records:
+                status = '✅' if record['passed'] else '❌'
+                if 'error' in record:
+                    print(f"{status} {record['url']}: {record['error']}")
+                    continue
+                print(f"{status} {record['url']}")
+                print(f"  LCP: {record['lcp']}ms, CLS: {record['cls']}, "
+                      f"INP: {record['inp']}ms, TTFB: {record['ttfb']}ms")
+            
+            with open('web_vitals.json', 'w', encoding='utf-8') as f:
+                json.dump(records, f, indent=2, ensure_ascii=False)
+            print("✅ Web Vitals 结果已保存到 web_vitals.json")
             
         finally:
             browser.close()
@@ -458,6 +622,11 @@ def main():
     print("2. 移动端设备模拟")
     mobile_simulation_example()
     
+    # 设备矩阵
+    print("\n" + "="*60)
+    print("2b. 设备矩阵并发测试")
+    device_matrix_example()
+    
     # Cookie和存储管理
     print("\n" + "="*60)
     print("3. Cookie和本地存储管理")
@@ -473,14 +642,21 @@ def main():
     print("5. 地理位置和权限管理")
     geolocation_and_permissions_example()
     
+    # Core Web Vitals
+    print("\n" + "="*60)
+    print("6. Core Web Vitals")
+    web_vitals_example()
+    
     print("\n" + "="*60)
     print("✅ 所有高级技巧演示完成！")
     print("\n生成的文件:")
     print("- network_log.json: 网络请求日志")
     print("- mobile_screenshot_device_*.png: 移动设备截图")
+    print("- device_screenshots/, device_matrix.json: 设备矩阵截图和结果")
     print("- browser_state.json: 浏览器状态")
     print("- performance_report.json: 性能报告")
     print("- geolocation_test.png: 地理位置测试截图")
+    print("- web_vitals.json: Core Web Vitals 结果")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""
+异步浏览器池
+少量长期存活的浏览器按引擎复用，每个任务拿到独立的 BrowserContext
+"""
+
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from statistics import mean
+from urllib.parse import urlsplit
+
+# 清空一个源的存储；sessionStorage 随页面关闭丢弃，这里一并清理当前页
+CLEAR_STORAGE_JS = '''async () => {
+    localStorage.clear();
+    sessionStorage.clear();
+    if (window.indexedDB && indexedDB.databases) {
+        for (const db of await indexedDB.databases()) indexedDB.deleteDatabase(db.name);
+    }
+    if (navigator.serviceWorker) {
+        for (const registration of await navigator.serviceWorker.getRegistrations()) {
+            await registration.unregister();
+        }
+    }
+    if (window.caches) {
+        for (const key of await caches.keys()) await caches.delete(key);
+    }
+}'''
+
+
+class PoolStats:
+    """分别记录启动、上下文创建和导航耗时（秒）"""
+
+    def __init__(self):
+        self.samples = {'launch': [], 'context': [], 'navigation': []}
+
+    def record(self, kind, seconds):
+        self.samples[kind].append(seconds)
+
+    def summary(self):
+        return {
+            kind: {
+                'count': len(values),
+                'total': round(sum(values), 3),
+                'avg': round(mean(values), 3) if values else 0,
+                'max': round(max(values), 3) if values else 0,
+            }
+            for kind, values in self.samples.items()
+        }
+
+
+class BrowserPool:
+    """按引擎维护若干浏览器，轮流分配给任务
+
+    用法:
+        async with async_playwright() as p:
+            async with BrowserPool(p, engines=['chromium']) as pool:
+                async with pool.context('chromium') as context:
+                    page = await context.new_page()
+    """
+
+    def __init__(self, playwright, engines=('chromium',), browsers_per_engine=2,
+                 launch_options=None, context_options=None, recycle_contexts=False,
+                 blocker=None, observer=None):
+        self.playwright = playwright
+        self.engines = list(engines)
+        self.browsers_per_engine = browsers_per_engine
+        self.launch_options = launch_options or {'headless': True}
+        self.context_options = context_options or {}
+        # 回收模式下，用完的上下文清理后放回空闲队列，交给下一个任务（清理范围见 release）
+        self.recycle_contexts = recycle_contexts
+        # 可选的 ResourceBlocker，挂到每个新建的上下文上
+        self.blocker = blocker
+        # 可选的 PerfTimeline，页面运行期间持续接收性能条目
+        self.observer = observer
+        self.stats = PoolStats()
+        self._browsers = {}
+        self._cycles = {}
+        self._idle = {}
+        # 每个上下文访问过的源，回收时逐个清空存储
+        self._origins = {}
+
+    async def start(self):
+        """启动所有浏览器"""
+        for engine in self.engines:
+            launcher = getattr(self.playwright, engine)
+            browsers = []
+            for _ in range(self.browsers_per_engine):
+                start_time = time.perf_counter()
+                browsers.append(await launcher.launch(**self.launch_options))
+                self.stats.record('launch', time.perf_counter() - start_time)
+            self._browsers[engine] = browsers
+            self._cycles[engine] = itertools.cycle(browsers)
+            self._idle[engine] = asyncio.Queue()
+        return self
+
+    async def close(self):
+        """关闭所有上下文和浏览器"""
+        for engine, browsers in self._browsers.items():
+            await asyncio.gather(*[browser.close() for browser in browsers],
+                                 return_exceptions=True)
+        self._browsers.clear()
+        self._cycles.clear()
+        self._idle.clear()
+        self._origins.clear()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def browser(self, engine='chromium'):
+        """按轮询顺序返回该引擎的下一个浏览器"""
+        if engine not in self._cycles:
+            raise KeyError(f"浏览器池未启动引擎: {engine}")
+        return next(self._cycles[engine])
+
+    async def acquire(self, engine='chromium', **context_options):
+        """获取一个上下文：优先复用空闲上下文，否则新建"""
+        idle = self._idle.get(engine)
+        if self.recycle_contexts and not context_options and idle and not idle.empty():
+            return idle.get_nowait()
+
+        options = {**self.context_options, **context_options}
+        start_time = time.perf_counter()
+        context = await self.browser(engine).new_context(**options)
+        if self.blocker is not None:
+            await self.blocker.attach(context)
+        if self.observer is not None:
+            await self.observer.attach(context)
+        if self.recycle_contexts:
+            self._track_origins(context)
+        self.stats.record('context', time.perf_counter() - start_time)
+        return context
+
+    def _track_origins(self, context):
+        origins = self._origins[context] = set()
+
+        def on_navigated(frame):
+            parts = urlsplit(frame.url)
+            if parts.scheme in ('http', 'https'):
+                origins.add(f"{parts.scheme}://{parts.netloc}")
+
+        context.on('page', lambda page: page.on('framenavigated', on_navigated))
+
+    async def _clear_storage(self, context):
+        """清空访问过的源以及 storage_state 中记录的源的存储"""
+        origins = set(self._origins.get(context, ()))
+        state = await context.storage_state()
+        origins.update(origin['origin'] for origin in state.get('origins', []))
+        if not origins:
+            return
+        page = await context.new_page()
+        try:
+            for origin in sorted(origins):
+                # 用空白页承载清理脚本，不访问真实服务
+                await page.route(f"{origin}/", lambda route: route.fulfill(
+                    status=200, content_type='text/html', body='<html></html>'))
+                await page.goto(f"{origin}/")
+                await page.evaluate(CLEAR_STORAGE_JS)
+        finally:
+            await page.close()
+            if self.observer is not None:
+                self.observer.discard(page)
+        self._origins[context].clear()
+
+    async def release(self, context, engine='chromium', reusable=True):
+        """归还上下文：回收模式下清理后放回队列，否则直接关闭
+
+        回收时重置：页面（含 sessionStorage）、cookies、权限，以及访问过的源的
+        localStorage、IndexedDB、service worker 和 Cache Storage。
+        不重置：任务自己添加的路由、init 脚本、expose_binding、额外请求头、地理位置等上下文设置，
+        做过这些修改的任务必须以 reusable=False 归还
+        """
+        if self.recycle_contexts and reusable and engine in self._idle:
+            try:
+                for page in context.pages:
+                    await page.close()
+                await self._clear_storage(context)
+                await context.clear_cookies()
+                await context.clear_permissions()
+                self._idle[engine].put_nowait(context)
+                return
+            except Exception:
+                pass
+        self._origins.pop(context, None)
+        try:
+            await context.close()
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def context(self, engine='chromium', reusable=True, **context_options):
+        """以 async with 形式获取并自动归还上下文
+
+        任务修改了路由、init 脚本等上下文设置时传 reusable=False，归还时直接关闭
+        """
+        context = await self.acquire(engine, **context_options)
+        try:
+            yield context
+        finally:
+            await self.release(context, engine, reusable=reusable and not context_options)
+
+    async def goto(self, page, url, **kwargs):
+        """导航并记录导航耗时，返回 (response, 耗时秒数)"""
+        start_time = time.perf_counter()
+        try:
+            response = await page.goto(url, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            self.stats.record('navigation', elapsed)
+        return response, elapsed
+
+
+async def check_url(pool, url, engine='chromium', timeout=10000):
+    """在池中的独立上下文里访问URL，返回结果字典"""
+
+    async with pool.context(engine) as context:
+        page = await context.new_page()
+
+        try:
+            _, load_time = await pool.goto(page, url, timeout=timeout)
+            title = await page.title()
+
+            result = {
+                'url': url,
+                'title': title,
+                'load_time': round(load_time, 2),
+                'browser': engine,
+                'status': 'success'
+            }
+            if pool.observer is not None:
+                await pool.observer.flush(page)
+                result['timeline'] = pool.observer.summary(page)
+                pool.observer.discard(page)
+            return result
+
+        except Exception as e:
+            return {
+                'url': url,
+                'title': 'Error',
+                'load_time': 0,
+                'browser': engine,
+                'status': f'error: {str(e)}'
+            }
@@ -0,0 +1,92 @@
+"""
+CDP 运行时指标采集（仅 Chromium）
+通过 context.new_cdp_session 在每个操作前后调用 Performance.getMetrics，
+记录 JS 堆、布局次数、样式重算、脚本和任务耗时的增量
+"""
+
+import time
+from contextlib import contextmanager
+
+# 增量统计的指标；*Duration 在 CDP 中以秒为单位，输出时换算成毫秒
+TRACKED_METRICS = (
+    'JSHeapUsedSize',
+    'LayoutCount',
+    'LayoutDuration',
+    'RecalcStyleCount',
+    'RecalcStyleDuration',
+    'ScriptDuration',
+    'TaskDuration',
+)
+
+
+class CDPMetricsCollector:
+    """按步骤记录 CDP 性能指标增量（同步 API）
+
+    用法:
+        collector = CDPMetricsCollector(page)
+        with collector.step('navigate'):
+            page.goto(url)
+        print(collector.steps)
+    """
+
+    def __init__(self, page, metrics=TRACKED_METRICS):
+        self.page = page
+        self.metrics = metrics
+        self.session = page.context.new_cdp_session(page)
+        self.session.send('Performance.enable', {'timeDomain': 'timeTicks'})
+        self.steps = []
+
+    @classmethod
+    def create(cls, page):
+        """非 Chromium 浏览器不支持 CDP，返回 None"""
+        try:
+            return cls(page)
+        except Exception:
+            return None
+
+    def snapshot(self):
+        result = self.session.send('Performance.getMetrics')
+        return {item['name']: item['value'] for item in result['metrics']}
+
+    def _delta(self, before, after):
+        delta = {}
+        for name in self.metrics:
+            value = after.get(name, 0) - before.get(name, 0)
+            if name.endswith('Duration'):
+                delta[f"{name}Ms"] = round(value * 1000, 2)
+            else:
+                delta[name] = value
+        return delta
+
+    @contextmanager
+    def step(self, name):
+        """记录 with 块内操作引起的指标变化"""
+        before = self.snapshot()
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            after = self.snapshot()
+            self.steps.append({
+                'step': name,
+                'wallMs': round(elapsed * 1000, 2),
+                **self._delta(before, after),
+            })
+
+    def measure(self, name, action, *args, **kwargs):
+        """执行 action 并记录一个步骤，返回 action 的结果"""
+        with self.step(name):
+            return action(*args, **kwargs)
+
+    def take_steps(self):
+        """取出已记录的步骤并清空，便于按 URL 分组"""
+        steps, self.steps = self.steps, []
+        return steps
+
+    def close(self):
+        try:
+            self.session.send('Performance.disable')
+            self.session.detach()
+        except Exception:
+            pass
@@ -0,0 +1,230 @@
+"""
+设备矩阵并发测试
+设备 × URL × 浏览器引擎的每个组合在共享浏览器上的独立上下文中并发运行，
+截图和视口数据汇总到一张结果表，总耗时接近最慢的组合而不是所有组合之和
+
+运行方式: python device_matrix.py https://example.com --device "iPhone 12" --device "Pixel 5"
+         python device_matrix.py https://example.com --all-mobile --concurrency 10
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import re
+import time
+
+from playwright.async_api import async_playwright
+
+from browser_pool import BrowserPool
+from screenshot_sink import ScreenshotSink
+from visual_diff import VisualBaseline
+
+VIEWPORT_JS = '''() => ({
+    width: window.innerWidth,
+    height: window.innerHeight,
+    devicePixelRatio: window.devicePixelRatio,
+    userAgent: navigator.userAgent
+})'''
+
+
+def select_devices(devices, names=None, limit=None):
+    """从 playwright.devices 中选出设备配置
+
+    names 为空时选择所有竖屏移动设备
+    """
+    if names:
+        unknown = [name for name in names if name not in devices]
+        if unknown:
+            raise KeyError(f"未知设备: {', '.join(unknown)}")
+        selected = {name: devices[name] for name in names}
+    else:
+        selected = {
+            name: device for name, device in devices.items()
+            if device.get('is_mobile') and 'landscape' not in name
+        }
+    if limit:
+        selected = dict(itertools.islice(selected.items(), limit))
+    return selected
+
+
+def _slug(text):
+    return re.sub(r'[^0-9A-Za-z]+', '_', text).strip('_').lower()
+
+
+def _context_options(device):
+    # default_browser_type 是设备描述的一部分，不是上下文参数
+    return {key: value for key, value in device.items() if key != 'default_browser_type'}
+
+
+async def _run_cell(pool, semaphore, device_name, device, url, url_index, engine,
+                    sink, wait_until, timeout):
+    """运行矩阵中的一个组合，返回一行结果"""
+    row = {
+        'device': device_name,
+        'engine': engine,
+        'url': url,
+        'is_mobile': device.get('is_mobile', False),
+        'has_touch': device.get('has_touch', False),
+    }
+    async with semaphore:
+        start_time = time.perf_counter()
+        context = None
+        try:
+            context = await pool.acquire(engine, **_context_options(device))
+            page = await context.new_page()
+            _, load_time = await pool.goto(page, url, wait_until=wait_until, timeout=timeout)
+            viewport = await page.evaluate(VIEWPORT_JS)
+            row.update(viewport)
+            row['load_time'] = round(load_time, 3)
+
+            if sink is not None:
+                # 写盘在后台完成，运行结束后再取实际路径（重复画面指向同一文件）
+                row['screenshot_name'] = f"{_slug(device_name)}_{engine}_{url_index + 1}"
+                row['screenshot'] = await sink.capture(page, f"{row['screenshot_name']}.png")
+            row['status'] = 'success'
+        except Exception as e:
+            # 部分引擎不支持某些设备参数（如 Firefox 不支持 is_mobile），记录后继续
+            row['status'] = f'error: {e}'
+        finally:
+            if context is not None:
+                await pool.release(context, engine, reusable=False)
+            row['elapsed'] = round(time.perf_counter() - start_time, 3)
+    return row
+
+
+async def run_device_matrix(urls, devices=None, engines=('chromium',), concurrency=8,
+                            browsers_per_engine=1, screenshot_dir='device_screenshots',
+                            wait_until='load', timeout=30000, launch_options=None, device_limit=None,
+                            image_format='png', quality=None, baseline_dir=None, diff_dir='visual_diffs'):
+    """并发运行设备矩阵
+
+    devices 可以是 {设备名: 设备配置}，也可以是设备名列表（为空时使用所有竖屏移动设备）；
+    screenshot_dir 为 None 时不截图；指定 baseline_dir 时截图与基线做视觉回归比对；返回 {'rows': [...], 'wall': 墙钟秒数, 'cell_total': 各组合耗时之和, ...}
+    """
+    sink = None
+    if screenshot_dir:
+        sink = ScreenshotSink(output_dir=screenshot_dir, image_format=image_format, quality=quality)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    start_time = time.perf_counter()
+    async with async_playwright() as p:
+        if not isinstance(devices, dict):
+            devices = select_devices(p.devices, devices, device_limit)
+        async with BrowserPool(p, engines=engines, browsers_per_engine=browsers_per_engine,
+                               launch_options=launch_options) as pool:
+            tasks = [
+                _run_cell(pool, semaphore, device_name, device, url, url_index, engine,
+                          sink, wait_until, timeout)
+                for (device_name, device), (url_index, url), engine
+                in itertools.product(devices.items(), enumerate(urls), engines)
+            ]
+            rows = await asyncio.gather(*tasks)
+    wall = time.perf_counter() - start_time
+
+    screenshots = None
+    if sink is not None:
+        sink.close()
+        screenshots = sink.summary()
+        for row in rows:
+            if 'screenshot' in row:
+                future = row['screenshot']
+                row['screenshot'] = future.result() if future.exception() is None else None
+
+    visual = None
+    if baseline_dir and sink is not None:
+        visual = _check_visual(rows, baseline_dir, diff_dir)
+
+    return {
+        'devices': len(devices),
+        'urls': len(urls),
+        'engines': list(engines),
+        'concurrency': concurrency,
+        'wall': round(wall, 3),
+        # 串行运行时的大致耗时，与 wall 对比即为并发收益
+        'cell_total': round(sum(row['elapsed'] for row in rows), 3),
+        'slowest_cell': round(max((row['elapsed'] for row in rows), default=0), 3),
+        'failures': sum(1 for row in rows if row['status'] != 'success'),
+        'pool_stats': pool.stats.summary(),
+        'screenshots': screenshots,
+        'visual': visual,
+        'rows': rows,
+    }
+
+
+def _check_visual(rows, baseline_dir, diff_dir):
+    """逐行与基线比对截图，结果写入行中，返回比对统计"""
+    checker = VisualBaseline(baseline_dir, diff_dir=diff_dir)
+    shots = [row for row in rows if row.get('screenshot')]
+    results = checker.check_many((row['screenshot_name'], row['screenshot']) for row in shots)
+    for row in shots:
+        result = results[row['screenshot_name']]
+        if result.new_baseline:
+            row['visual'] = 'new'
+        elif result.missing_baseline:
+            row['visual'] = 'missing'
+        else:
+            row['visual'] = 'match' if result.match else 'mismatch'
+        if result.diff_path:
+            row['visual_diff'] = result.diff_path
+    return checker.summary()
+
+
+def print_matrix(report):
+    """以表格形式打印结果"""
+    print(f"{'设备':<28} {'引擎':<9} {'视口':>10} {'DPR':>5} {'加载(秒)':>9}  URL")
+    for row in report['rows']:
+        if row['status'] == 'success':
+            viewport = f"{row['width']}x{row['height']}"
+            visual = {'match': '', 'new': '  🆕', 'mismatch': '  ❌ 视觉差异',
+                      'missing': '  ❓ 缺少基线'}.get(row.get('visual'), '')
+            print(f"{row['device']:<28} {row['engine']:<9} {viewport:>10} "
+                  f"{row['devicePixelRatio']:>5} {row['load_time']:>9.3f}  {row['url']}{visual}")
+        else:
+            print(f"{row['device']:<28} {row['engine']:<9} ❌ {row['status'][:60]}")
+    print(f"\n{report['devices']} 个设备 × {report['urls']} 个URL × {len(report['engines'])} 个引擎, "
+          f"失败 {report['failures']} 个")
+    print(f"墙钟耗时 {report['wall']}秒, 最慢组合 {report['slowest_cell']}秒, "
+          f"各组合合计 {report['cell_total']}秒")
+    if report['screenshots']:
+        stats = report['screenshots']
+        print(f"截图 {stats['captured']} 张, 写入 {stats['written']} 张, 重复 {stats['duplicates']} 张, "
+              f"后台编码写盘 {stats['background_seconds']}秒")
+    if report['visual']:
+        stats = report['visual']
+        print(f"视觉回归: 比对 {stats['checked']} 张, 不一致 {stats['failed']} 张, "
+              f"缺少基线 {stats['missing_baselines']} 张, 新基线 {stats['new_baselines']} 张, "
+              f"耗时 {stats['compare_seconds']}秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="设备矩阵并发测试")
+    parser.add_argument('urls', nargs='+')
+    parser.add_argument('--device', action='append', help="设备名称，可重复指定，见 playwright.devices")
+    parser.add_argument('--all-mobile', action='store_true', help="使用所有竖屏移动设备")
+    parser.add_argument('--limit', type=int, help="最多使用的设备数")
+    parser.add_argument('--engine', action='append', choices=['chromium', 'firefox', 'webkit'])
+    parser.add_argument('--concurrency', type=int, default=8, help="同时运行的组合数上限")
+    parser.add_argument('--screenshot-dir', default='device_screenshots')
+    parser.add_argument('--format', default='png', choices=['png', 'jpeg', 'webp'], help="截图格式")
+    parser.add_argument('--quality', type=int, help="JPEG/WebP 质量 (0-100)")
+    parser.add_argument('--baseline-dir', help="视觉回归基线目录，不指定时不比对；UPDATE_BASELINES=1 时生成基线")
+    parser.add_argument('--output', default='device_matrix.json')
+    args = parser.parse_args()
+
+    # 未指定设备时默认取前 4 个移动设备
+    limit = args.limit or (None if args.device or args.all_mobile else 4)
+    report = asyncio.run(run_device_matrix(args.urls, args.device, engines=args.engine or ['chromium'],
+                                           concurrency=args.concurrency, device_limit=limit,
+                                           screenshot_dir=args.screenshot_dir,
+                                           image_format=args.format, quality=args.quality,
+                                           baseline_dir=args.baseline_dir))
+    print_matrix(report)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+按历史耗时调度 xdist 测试
+记录每个测试的耗时到本地文件，下次运行时把工作单元按预计耗时从长到短分给当前负载最小的 worker
+（LPT 调度），某个 worker 的计划提前做完时接手剩余最长的单元；
+共享昂贵 fixture（类或模块作用域）的测试打上同一个 xdist_group 留在同一 worker 上，
+运行结束后报告各 worker 的空闲时间
+
+运行方式: python -m pytest 04_pytest_integration.py -n 4 --dist loadgroup -p duration_scheduler
+         （不加 --dist loadgroup 时只记录耗时和空闲统计，分发仍由 xdist 默认调度完成）
+         python -m pytest 04_pytest_integration.py -n 4 --dist loadgroup -p duration_scheduler \\
+             --shared-fixture reusable_pages --shared-fixture browser_context
+"""
+
+import json
+import statistics
+from collections import defaultdict
+
+import pytest
+
+try:
+    from xdist.scheduler import LoadGroupScheduling
+except ImportError:  # pytest-xdist 是可选依赖，单进程运行时只记录耗时
+    LoadGroupScheduling = None
+
+DEFAULT_DURATION_FILE = '.test_durations.json'
+DEFAULT_SHARED_FIXTURES = ('reusable_pages',)
+
+# 新耗时的权重，平滑偶发的网络抖动
+SMOOTHING = 0.5
+
+
+def base_nodeid(nodeid):
+    """去掉 loadgroup 模式下 xdist 追加的 "@组名" 后缀"""
+    if nodeid.rfind('@') > nodeid.rfind(']'):
+        return nodeid.rsplit('@', 1)[0]
+    return nodeid
+
+
+def load_durations(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_durations(path, durations, measured):
+    """把本次耗时合并进历史记录"""
+    merged = dict(durations)
+    for nodeid, seconds in measured.items():
+        previous = merged.get(nodeid)
+        merged[nodeid] = seconds if previous is None else previous + SMOOTHING * (seconds - previous)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({nodeid: round(seconds, 4) for nodeid, seconds in sorted(merged.items())}, f, indent=2)
+
+
+def estimate(item, durations, default):
+    """历史耗时；没有记录的 slow 测试按已知最长耗时估计"""
+    seconds = durations.get(item.nodeid)
+    if seconds is not None:
+        return seconds
+    if item.get_closest_marker('slow') and durations:
+        return max(durations.values())
+    return default
+
+
+def shared_group(item, fixture_names):
+    """测试使用的第一个类/模块作用域共享 fixture 决定分组，没有则返回 None"""
+    fixturedefs = item._fixtureinfo.name2fixturedefs
+    for name in fixture_names:
+        if name not in item.fixturenames or name not in fixturedefs:
+            continue
+        scope = fixturedefs[name][-1].scope
+        if scope == 'class' and item.cls is not None:
+            return f"{name}:{item.parent.nodeid}"
+        if scope in ('module', 'package'):
+            return f"{name}:{item.module.__name__}"
+    return None
+
+
+def order_items(items, durations, fixture_names=DEFAULT_SHARED_FIXTURES):
+    """按组总耗时从长到短排列测试，组内保持收集顺序；返回 {组名: 预计耗时}"""
+    default = statistics.median(durations.values()) if durations else 1.0
+    groups = {}
+    estimates = {}
+    for item in items:
+        if item.get_closest_marker('xdist_group') is None:
+            group = shared_group(item, fixture_names)
+            if group is not None:
+                item.add_marker(pytest.mark.xdist_group(group))
+        else:
+            group = None
+        key = group or item.nodeid
+        groups.setdefault(key, []).append(item)
+        estimates[item.nodeid] = estimate(item, durations, default)
+
+    totals = {key: sum(estimates[item.nodeid] for item in members) for key, members in groups.items()}
+    ordered = sorted(groups, key=lambda key: -totals[key])
+    items[:] = [item for key in ordered for item in groups[key]]
+    return {key: totals[key] for key in ordered}
+
+
+def plan_units(estimates, workers):
+    """LPT：单元按预计耗时从长到短依次分给预计负载最小的 worker，返回每个 worker 的单元列表"""
+    loads = [0.0] * workers
+    plans = [[] for _ in range(workers)]
+    for unit in sorted(estimates, key=lambda unit: -estimates[unit]):
+        index = loads.index(min(loads))
+        plans[index].append(unit)
+        loads[index] += estimates[unit]
+    return plans
+
+
+if LoadGroupScheduling is not None:
+
+    class DurationGroupScheduling(LoadGroupScheduling):
+        """按 LPT 计划分发 xdist_group 工作单元
+
+        xdist 的 worker 需要知道下一个测试才会开始当前测试，所以仍沿用父类“待运行不多于 2 个就补充”的节奏，
+        只是补充的单元取自该 worker 的计划而不是全局队列的队首；计划用完时接手剩余单元中最长的一个，
+        抵消耗时估计的误差
+        """
+
+        def __init__(self, config, log=None):
+            super().__init__(config, log)
+            self.durations = load_durations(config.getoption('duration_file'))
+            self.estimates = {}
+            self.plans = {}
+
+        def _estimate(self, nodeids, default):
+            return sum(self.durations.get(base_nodeid(nodeid), default) for nodeid in nodeids)
+
+        def schedule(self):
+            if self.collection is None and self.collection_is_completed:
+                default = statistics.median(self.durations.values()) if self.durations else 1.0
+                units = {}
+                for nodeid in next(iter(self.registered_collections.values())):
+                    units.setdefault(self._split_scope(nodeid), []).append(nodeid)
+                self.estimates = {unit: self._estimate(nodeids, default) for unit, nodeids in units.items()}
+                workers = min(len(self.nodes), len(units)) or 1
+                # 多余的 worker 会被父类关闭，计划只分给前 workers 个
+                self.plans = dict(zip(self.nodes, plan_units(self.estimates, workers)))
+            super().schedule()
+
+        def _next_unit(self, node):
+            plan = self.plans.get(node, [])
+            while plan:
+                unit = plan.pop(0)
+                if unit in self.workqueue:
+                    return unit
+            # 计划已用完（或 worker 崩溃后单元被放回队列）：接手剩余最长的单元
+            return max(self.workqueue, key=lambda unit: self.estimates.get(unit, 0.0))
+
+        def _assign_work_unit(self, node):
+            unit = self._next_unit(node)
+            self.workqueue.move_to_end(unit, last=False)
+            super()._assign_work_unit(node)
+
+
+def _is_worker(config):
+    return hasattr(config, 'workerinput')
+
+
+class DurationScheduler:
+    """记录耗时并统计 worker 空闲时间（在 xdist 主进程或单进程运行中）"""
+
+    def __init__(self, config):
+        self.config = config
+        self.path = config.getoption('duration_file')
+        self.durations = load_durations(self.path)
+        self.measured = defaultdict(float)
+        self.busy = defaultdict(float)
+        # 第一个测试开始到最后一个测试结束，不含 worker 启动和收集
+        self.first_start = None
+        self.last_stop = None
+
+    def pytest_runtest_logreport(self, report):
+        node = getattr(report, 'node', None)
+        worker = node.gateway.id if node is not None else 'main'
+        self.measured[base_nodeid(report.nodeid)] += report.duration
+        self.busy[worker] += report.duration
+        self.first_start = report.start if self.first_start is None else min(self.first_start, report.start)
+        self.last_stop = report.stop if self.last_stop is None else max(self.last_stop, report.stop)
+
+    @property
+    def wall(self):
+        return self.last_stop - self.first_start if self.busy else 0.0
+
+    def pytest_sessionfinish(self, session):
+        if self.measured:
+            save_durations(self.path, self.durations, self.measured)
+        report_path = self.config.getoption('idle_report')
+        if report_path:
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(self.summary(), f, indent=2)
+
+    def summary(self):
+        workers = {}
+        for worker, busy in sorted(self.busy.items()):
+            idle = max(self.wall - busy, 0.0)
+            workers[worker] = {
+                'busy_seconds': round(busy, 3),
+                'idle_seconds': round(idle, 3),
+                'idle_ratio': round(idle / self.wall, 3) if self.wall else 0,
+            }
+        total_idle = sum(row['idle_seconds'] for row in workers.values())
+        return {
+            'wall_seconds': round(self.wall, 3),
+            'idle_seconds': round(total_idle, 3),
+            'idle_ratio': round(total_idle / (self.wall * len(workers)), 3) if workers and self.wall else 0,
+            'workers': workers,
+        }
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.busy:
+            return
+        summary = self.summary()
+        terminalreporter.section("worker 空闲统计")
+        terminalreporter.write_line(f"{'worker':>8} {'忙碌(秒)':>10} {'空闲(秒)':>10} {'空闲比例':>8}")
+        for worker, row in summary['workers'].items():
+            terminalreporter.write_line(f"{worker:>8} {row['busy_seconds']:>10} {row['idle_seconds']:>10} "
+                                        f"{row['idle_ratio']:>8.1%}")
+        terminalreporter.write_line(f"总耗时 {summary['wall_seconds']}秒, worker 合计空闲 "
+                                    f"{summary['idle_seconds']}秒 ({summary['idle_ratio']:.1%})，"
+                                    f"耗时记录: {self.path}")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('duration_scheduler', '按历史耗时调度')
+    group.addoption('--duration-file', default=DEFAULT_DURATION_FILE,
+                    help=f"测试耗时记录文件，默认 {DEFAULT_DURATION_FILE}")
+    group.addoption('--shared-fixture', action='append', default=None,
+                    help=f"共享该 fixture 的测试分到同一 worker，可重复，默认 {', '.join(DEFAULT_SHARED_FIXTURES)}")
+    group.addoption('--idle-report', default=None,
+                    help="把 worker 空闲统计写入该 JSON 文件")
+
+
+def pytest_configure(config):
+    if _is_worker(config):
+        return
+    config.pluginmanager.register(DurationScheduler(config), 'duration_scheduler_stats')
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_make_scheduler(config, log):
+    # 只接管 loadgroup，其他分发模式交给 xdist
+    if getattr(config.option, 'dist', 'no') != 'loadgroup' or LoadGroupScheduling is None:
+        return None
+    return DurationGroupScheduling(config, log)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_modifyitems(config, items):
+    # 只在 worker 中排序：xdist 主进程不收集测试，单进程运行时保持原顺序
+    if not _is_worker(config):
+        return
+    durations = load_durations(config.getoption('duration_file'))
+    order_items(items, durations, config.getoption('shared_fixture') or DEFAULT_SHARED_FIXTURES)
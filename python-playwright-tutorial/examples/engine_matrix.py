@@ -0,0 +1,144 @@
+"""
+跨浏览器引擎 URL 测试
+每个引擎在整个运行期间只启动一次浏览器，所有引擎并行处理同一份 URL 列表，
+并排输出各引擎的吞吐量（页/秒）和失败情况
+
+运行方式: python engine_matrix.py urls.txt --workers 4
+         python engine_matrix.py urls.txt --engine chromium --engine webkit
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from playwright.async_api import async_playwright
+
+from browser_pool import BrowserPool, check_url
+from perf_sampler import percentile
+from url_scheduler import schedule_urls
+
+ENGINES = ('chromium', 'firefox', 'webkit')
+
+
+async def _run_engine(pool, engine, urls, workers, per_host, timeout):
+    """在一个引擎上跑完整个 URL 列表，返回该引擎的汇总"""
+    results = []
+    start_time = time.perf_counter()
+    handler = lambda url: check_url(pool, url, engine, timeout)
+    async for result in schedule_urls(urls, handler, workers=workers, per_host=per_host):
+        results.append(result)
+    elapsed = time.perf_counter() - start_time
+
+    load_times = [r['load_time'] for r in results if r['status'] == 'success']
+    failures = [r for r in results if r['status'] != 'success']
+    return {
+        'engine': engine,
+        'pages': len(results),
+        'succeeded': len(load_times),
+        'failed': len(failures),
+        'elapsed': round(elapsed, 3),
+        'pages_per_sec': round(len(results) / elapsed, 2) if elapsed else 0,
+        'load_p50': round(percentile(load_times, 50), 3),
+        'load_p95': round(percentile(load_times, 95), 3),
+        'failures': [{'url': r['url'], 'status': r['status']} for r in failures],
+        'results': results,
+    }
+
+
+async def run_engine_matrix(urls, engines=ENGINES, workers=4, per_host=2, browsers_per_engine=1,
+                            timeout=10000, launch_options=None, blocker=None):
+    """所有引擎并行测试同一份 URL 列表
+
+    workers 和 per_host 按引擎分别计算；返回按引擎汇总的报告和逐 URL 对照表。
+    urls 可以是生成器，入口处展开并去重，各引擎使用同一份列表
+    """
+    urls = list(urls)
+    unique_urls = list(dict.fromkeys(urls))
+    engines = list(engines)
+    start_time = time.perf_counter()
+    async with async_playwright() as p:
+        async with BrowserPool(p, engines=engines, browsers_per_engine=browsers_per_engine,
+                               launch_options=launch_options, blocker=blocker) as pool:
+            summaries = await asyncio.gather(*[
+                _run_engine(pool, engine, unique_urls, workers, per_host, timeout) for engine in engines
+            ])
+    wall = time.perf_counter() - start_time
+
+    # 逐 URL 对照：同一页面在哪些引擎上失败
+    by_url = {url: {} for url in unique_urls}
+    for summary in summaries:
+        for result in summary['results']:
+            by_url[result['url']][summary['engine']] = (
+                result['load_time'] if result['status'] == 'success' else result['status']
+            )
+
+    return {
+        'urls': len(unique_urls),
+        'duplicates': len(urls) - len(unique_urls),
+        'engines': engines,
+        'workers_per_engine': workers,
+        'wall': round(wall, 3),
+        'pages_per_sec': round(len(unique_urls) * len(engines) / wall, 2) if wall else 0,
+        'pool_stats': pool.stats.summary(),
+        'summary': {s['engine']: {k: v for k, v in s.items() if k != 'results'} for s in summaries},
+        'by_url': by_url,
+    }
+
+
+def print_engine_matrix(report):
+    """各引擎指标并排打印"""
+    engines = report['engines']
+    rows = [
+        ('页面数', 'pages'),
+        ('成功', 'succeeded'),
+        ('失败', 'failed'),
+        ('耗时(秒)', 'elapsed'),
+        ('吞吐(页/秒)', 'pages_per_sec'),
+        ('加载 p50(秒)', 'load_p50'),
+        ('加载 p95(秒)', 'load_p95'),
+    ]
+    print(f"{'':<14}" + ''.join(f"{engine:>12}" for engine in engines))
+    for label, key in rows:
+        print(f"{label:<14}" + ''.join(f"{report['summary'][engine][key]:>12}" for engine in engines))
+    print(f"\n总计 {report['urls']} 个URL × {len(engines)} 个引擎, "
+          f"墙钟 {report['wall']}秒, 合计 {report['pages_per_sec']} 页/秒")
+    if report['duplicates']:
+        print(f"（已跳过 {report['duplicates']} 个重复URL）")
+
+    # 只在部分引擎上失败的 URL 最值得关注
+    partial = {
+        url: cells for url, cells in report['by_url'].items()
+        if 0 < sum(isinstance(v, str) for v in cells.values()) < len(cells)
+    }
+    if partial:
+        print("\n仅在部分引擎上失败的URL:")
+        for url, cells in partial.items():
+            failed = [engine for engine, value in cells.items() if isinstance(value, str)]
+            print(f"  {url}: {', '.join(failed)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="跨浏览器引擎 URL 测试")
+    parser.add_argument('url_file', help="URL 列表文件，每行一个")
+    parser.add_argument('--engine', action='append', choices=ENGINES, help="可重复指定，默认全部引擎")
+    parser.add_argument('--workers', type=int, default=4, help="每个引擎的并发数")
+    parser.add_argument('--per-host', type=int, default=2, help="每个引擎内同一主机的并发上限")
+    parser.add_argument('--browsers', type=int, default=1, help="每个引擎启动的浏览器数")
+    parser.add_argument('--output', default='engine_matrix.json')
+    args = parser.parse_args()
+
+    with open(args.url_file, encoding='utf-8') as f:
+        urls = [line.strip() for line in f if line.strip()]
+
+    report = asyncio.run(run_engine_matrix(urls, args.engine or ENGINES, workers=args.workers,
+                                           per_host=args.per_host, browsers_per_engine=args.browsers))
+    print_engine_matrix(report)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+HAR 录制与回放
+首次运行时用 route_from_har(update=True) 把每个测试的流量录制为 HAR，之后的运行从 HAR 回放。
+回放不逐个上下文重新解析 HAR，而是会话开始时建立一次内存索引，
+按 (方法, URL, 请求体哈希) 查找，并统计命中、未命中和过期条目。同步和异步 API 通用
+
+运行方式: PLAYWRIGHT_HAR=auto pytest 04_pytest_integration.py   # 没有 HAR 时录制，有则回放
+         PLAYWRIGHT_HAR=record pytest 04_pytest_integration.py  # 强制重新录制
+"""
+
+import base64
+import glob
+import hashlib
+import inspect
+import json
+import os
+import re
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+HAR_ENV = 'PLAYWRIGHT_HAR'
+MAX_AGE_ENV = 'PLAYWRIGHT_HAR_MAX_AGE'
+
+# 录制时的 base_url，回放时据此把录制的 URL 换算成路径键
+META_FILE = 'har_meta.json'
+
+# off: 访问真实服务；record: 重新录制；replay: 只回放；auto: 有 HAR 时回放，否则录制
+MODES = ('off', 'record', 'replay', 'auto')
+
+# 回放时由 fulfill 根据 body 重新生成的响应头
+_SKIP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+
+class HarIndex:
+    """HAR 目录的内存索引
+
+    用法:
+        har = HarIndex.from_env(base_url=server.url)
+        har.attach(context, 'test_name')       # 异步 API 下需 await
+        ...
+        print(har.summary())
+
+    base_url 下的请求按路径建索引，本地服务换端口后录制的 HAR 仍可命中
+    """
+
+    def __init__(self, har_dir='.har', mode='auto', base_url=None, max_age=7 * 24 * 3600):
+        if mode not in MODES:
+            raise ValueError(f"未知的 HAR 模式: {mode}，可选: {', '.join(MODES)}")
+        self.har_dir = har_dir
+        self.base_url = base_url
+        # 超过 max_age 秒的录制视为过期，改走真实网络
+        self.max_age = max_age
+        if mode == 'auto':
+            mode = 'replay' if glob.glob(os.path.join(har_dir, '*.har')) else 'record'
+        self.mode = mode
+        self._entries = None
+        self._meta_written = False
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.missed_keys = []
+
+    @classmethod
+    def from_env(cls, default_mode='off', **kwargs):
+        """读取 PLAYWRIGHT_HAR 和 PLAYWRIGHT_HAR_MAX_AGE"""
+        mode = os.environ.get(HAR_ENV, default_mode)
+        if MAX_AGE_ENV in os.environ:
+            kwargs['max_age'] = float(os.environ[MAX_AGE_ENV])
+        return cls(mode=mode, **kwargs)
+
+    @property
+    def enabled(self):
+        return self.mode != 'off'
+
+    def path_for(self, name):
+        return os.path.join(self.har_dir, re.sub(r'[^\w.-]+', '_', name).strip('_') + '.har')
+
+    def _url_key(self, url, base_url=None):
+        base_url = base_url or self.base_url
+        if base_url:
+            base = urlsplit(base_url)
+            parts = urlsplit(url)
+            if (parts.scheme, parts.netloc) == (base.scheme, base.netloc):
+                return parts.path + (f"?{parts.query}" if parts.query else '')
+        return url.split('#')[0]
+
+    def key(self, method, url, body, base_url=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        digest = hashlib.sha1(body or b'').hexdigest()[:16]
+        return method.upper(), self._url_key(url, base_url), digest
+
+    def _write_meta(self):
+        os.makedirs(self.har_dir, exist_ok=True)
+        with open(os.path.join(self.har_dir, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'base_url': self.base_url}, f)
+
+    def _recorded_base_url(self):
+        try:
+            with open(os.path.join(self.har_dir, META_FILE), encoding='utf-8') as f:
+                return json.load(f).get('base_url')
+        except (OSError, ValueError):
+            return None
+
+    def _load(self):
+        """解析目录下全部 HAR，同一键以最新的录制为准"""
+        # 录制时本地服务可能在另一个端口，按录制时的 base_url 计算路径键
+        recorded_base = self._recorded_base_url()
+        entries = {}
+        for path in sorted(glob.glob(os.path.join(self.har_dir, '*.har'))):
+            with open(path, encoding='utf-8') as f:
+                har = json.load(f)
+            for entry in har['log']['entries']:
+                request = entry['request']
+                post_data = (request.get('postData') or {}).get('text')
+                key = self.key(request['method'], request['url'], post_data, recorded_base)
+                recorded = datetime.fromisoformat(entry['startedDateTime'].replace('Z', '+00:00'))
+                if key in entries and entries[key]['recorded'] >= recorded.timestamp():
+                    continue
+                entries[key] = {
+                    'response': entry['response'],
+                    'recorded': recorded.timestamp(),
+                    'source': os.path.basename(path),
+                    'hits': 0,
+                }
+        return entries
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def lookup(self, method, url, body):
+        """返回可回放的条目；未命中或已过期时返回 None，并记录状态"""
+        key = self.key(method, url, body)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            if len(self.missed_keys) < 100:
+                self.missed_keys.append(key)
+            return None
+        if self.max_age and time.time() - entry['recorded'] > self.max_age:
+            entry['stale'] = True
+            self.stale += 1
+            return None
+        entry['hits'] += 1
+        self.hits += 1
+        return entry
+
+    @staticmethod
+    def fulfill_options(entry):
+        response = entry['response']
+        content = response.get('content', {})
+        text = content.get('text', '')
+        body = base64.b64decode(text) if content.get('encoding') == 'base64' else text.encode('utf-8')
+        headers = {h['name']: h['value'] for h in response.get('headers', [])
+                   if h['name'].lower() not in _SKIP_HEADERS}
+        return {'status': response['status'], 'headers': headers, 'body': body}
+
+    def _replay_handler(self, is_async):
+        if is_async:
+            async def handler(route):
+                request = route.request
+                entry = self.lookup(request.method, request.url, request.post_data_buffer)
+                if entry is None:
+                    return await route.fallback()
+                await route.fulfill(**self.fulfill_options(entry))
+        else:
+            def handler(route):
+                request = route.request
+                entry = self.lookup(request.method, request.url, request.post_data_buffer)
+                if entry is None:
+                    return route.fallback()
+                route.fulfill(**self.fulfill_options(entry))
+        return handler
+
+    def attach(self, context, name):
+        """为上下文挂上录制或回放；录制的 HAR 在上下文关闭时写出"""
+        if self.mode == 'record':
+            if not self._meta_written:
+                self._write_meta()
+                self._meta_written = True
+            return context.route_from_har(self.path_for(name), update=True, update_content='embed')
+        if self.mode == 'replay':
+            is_async = inspect.iscoroutinefunction(context.route)
+            return context.route('**/*', self._replay_handler(is_async))
+        return None
+
+    def summary(self):
+        summary = {'mode': self.mode}
+        if self.mode == 'replay':
+            entries = self.entries.values()
+            summary.update({
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'unused_entries': sum(1 for entry in entries if not entry['hits'] and not entry.get('stale')),
+                'stale_entries': sum(1 for entry in entries if entry.get('stale')),
+                'missed': [' '.join(key[:2]) for key in self.missed_keys[:10]],
+            })
+        return summary
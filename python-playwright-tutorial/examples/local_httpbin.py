@@ -0,0 +1,290 @@
+"""
+本地 httpbin 替身
+进程内 HTTP 服务器，提供测试套件用到的 httpbin 端点，运行结果不受网络延迟影响
+
+支持的端点: /, /html, /json, /forms/post, /post, /status/<code>, /headers,
+           /cookies, /cookies/set, /delay/<n>
+运行方式: python local_httpbin.py --port 8080 --delay-scale 0.1
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, quote, unquote, urlsplit
+
+MAX_DELAY = 10
+
+INDEX_HTML = """<!DOCTYPE html>
+<html>
+<head><title>httpbin.org (local)</title></head>
+<body>
+    <h1>httpbin.org</h1>
+    <p>A simple HTTP Request &amp; Response Service (local stand-in).</p>
+    <ul>
+        <li><a href="/html">/html</a></li>
+        <li><a href="/json">/json</a></li>
+        <li><a href="/forms/post">/forms/post</a></li>
+        <li><a href="/headers">/headers</a></li>
+        <li><a href="/cookies">/cookies</a></li>
+        <li><a href="/delay/1">/delay/1</a></li>
+    </ul>
+</body>
+</html>"""
+
+HTML_PAGE = """<!DOCTYPE html>
+<html>
+<head><title>httpbin.org - html</title></head>
+<body>
+    <h1>Herman Melville - Moby-Dick</h1>
+    <div>
+        <p>Availing himself of the mild, summer-cool weather that now reigned in these latitudes,
+        and in preparation for the peculiarly active pursuits shortly to be anticipated,
+        Perth, the begrimed, blistered old blacksmith, had not removed his portable forge.</p>
+        <p>Served by httpbin</p>
+    </div>
+</body>
+</html>"""
+
+FORM_PAGE = """<!DOCTYPE html>
+<html>
+<head><title>httpbin.org - forms</title></head>
+<body>
+<form method="post" action="/post">
+    <p><label>Customer name: <input name="custname" required></label></p>
+    <p><label>Telephone: <input type="tel" name="custtel"></label></p>
+    <p><label>E-mail address: <input type="email" name="custemail"></label></p>
+    <fieldset>
+        <legend> Pizza Size </legend>
+        <p><label> <input type="radio" name="size" value="small"> Small </label></p>
+        <p><label> <input type="radio" name="size" value="medium"> Medium </label></p>
+        <p><label> <input type="radio" name="size" value="large"> Large </label></p>
+    </fieldset>
+    <fieldset>
+        <legend> Pizza Toppings </legend>
+        <p><label> <input type="checkbox" name="topping" value="bacon"> Bacon </label></p>
+        <p><label> <input type="checkbox" name="topping" value="cheese"> Extra Cheese </label></p>
+        <p><label> <input type="checkbox" name="topping" value="onion"> Onion </label></p>
+    </fieldset>
+    <p><label>Delivery instructions: <textarea name="comments"></textarea></label></p>
+    <p><input type="submit" value="Submit order"></p>
+</form>
+</body>
+</html>"""
+
+SLIDESHOW = {
+    "slideshow": {
+        "author": "Yours Truly",
+        "date": "date of publication",
+        "slides": [
+            {"title": "Wake up to WonderWidgets!", "type": "all"},
+            {"items": ["Why <em>WonderWidgets</em> are great",
+                       "Who <em>buys</em> WonderWidgets"],
+             "title": "Overview", "type": "all"}
+        ],
+        "title": "Sample Slide Show"
+    }
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "local-httpbin/1.0"
+
+    def log_message(self, format, *args):
+        # 默认日志会刷屏，关闭
+        pass
+
+    def _send(self, status, body=b'', content_type='text/html; charset=utf-8', headers=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or []):
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self._throttle(len(body))
+            self.wfile.write(body)
+
+    def _send_json(self, data, status=200, headers=None):
+        body = json.dumps(data, indent=2, ensure_ascii=False) + '\n'
+        self._send(status, body, 'application/json', headers)
+
+    def _throttle(self, nbytes, upload=False):
+        # 模拟弱网：每个请求在自己的线程里等待，并发请求互不阻塞
+        profile = self.server.network_profile
+        if profile is not None and profile.throttles_network:
+            time.sleep(profile.transfer_delay(nbytes, upload))
+
+    def _count_request(self):
+        # ThreadingHTTPServer 每个请求一个线程，计数需加锁
+        with self.server.request_lock:
+            self.server.request_count += 1
+
+    def _cookies(self):
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        # /cookies/set 写入时做了 URL 编码，返回时还原
+        return {name: unquote(morsel.value) for name, morsel in cookie.items()}
+
+    def _url(self):
+        return f"http://{self.headers.get('Host', '')}{self.path}"
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        self._count_request()
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip('/') or '/'
+        segments = [unquote(s) for s in path.strip('/').split('/')]
+
+        if path == '/':
+            return self._send(200, INDEX_HTML)
+        if path == '/html':
+            return self._send(200, HTML_PAGE)
+        if path == '/json':
+            return self._send_json(SLIDESHOW)
+        if path == '/forms/post':
+            return self._send(200, FORM_PAGE)
+        if path == '/headers':
+            return self._send_json({'headers': dict(self.headers.items())})
+        if path == '/cookies':
+            return self._send_json({'cookies': self._cookies()})
+        if segments[0] == 'cookies' and len(segments) >= 2 and segments[1] == 'set':
+            # /cookies/set?name=value 或 /cookies/set/<name>/<value>
+            pairs = parse_qsl(parts.query)
+            if len(segments) == 4:
+                pairs.append((segments[2], segments[3]))
+            headers = [('Set-Cookie', f"{name}={quote(value)}; Path=/") for name, value in pairs]
+            headers.append(('Location', '/cookies'))
+            return self._send(302, '', headers=headers)
+        if segments[0] == 'status' and len(segments) == 2 and segments[1].isdigit():
+            return self._send(int(segments[1]), '')
+        if segments[0] == 'delay' and len(segments) == 2:
+            try:
+                seconds = min(float(segments[1]), MAX_DELAY)
+            except ValueError:
+                return self._send(400, 'invalid delay')
+            time.sleep(seconds * self.server.delay_scale)
+            return self._send_json({
+                'args': dict(parse_qsl(parts.query)),
+                'headers': dict(self.headers.items()),
+                'url': self._url(),
+            })
+
+        self._send(404, '<h1>404 Not Found</h1>')
+
+    def do_POST(self):
+        self._count_request()
+        parts = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        self._throttle(length, upload=True)
+        body = self.rfile.read(length).decode('utf-8', errors='replace')
+
+        if parts.path == '/post':
+            form = {}
+            if self.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded'):
+                for name, value in parse_qsl(body, keep_blank_values=True):
+                    if name in form:
+                        form[name] = form[name] if isinstance(form[name], list) else [form[name]]
+                        form[name].append(value)
+                    else:
+                        form[name] = value
+            return self._send_json({
+                'args': dict(parse_qsl(parts.query)),
+                'data': '' if form else body,
+                'form': form,
+                'headers': dict(self.headers.items()),
+                'url': self._url(),
+            })
+
+        if parts.path.startswith('/status/'):
+            return self.do_GET()
+
+        self._send(405, 'method not allowed')
+
+
+class LocalHttpbin:
+    """在后台线程中运行的本地 httpbin
+
+    用法:
+        with LocalHttpbin(delay_scale=0.1) as server:
+            page.goto(f"{server.url}/html")
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, delay_scale=1.0):
+        # port=0 时由系统分配空闲端口
+        self.host = host
+        self.port = port
+        self.delay_scale = delay_scale
+        self.network_profile = None
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def request_count(self):
+        return self._server.request_count if self._server else 0
+
+    def set_network_profile(self, profile):
+        """按 network_profiles.NetworkProfile 对响应限速，None 表示不限速"""
+        self.network_profile = profile
+        if self._server:
+            self._server.network_profile = profile
+
+    def set_delay_scale(self, scale):
+        """运行中调整 /delay 的缩放比例，0 表示不等待"""
+        self.delay_scale = scale
+        if self._server:
+            self._server.delay_scale = scale
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.delay_scale = self.delay_scale
+        self._server.network_profile = self.network_profile
+        self._server.request_count = 0
+        self._server.request_lock = threading.Lock()
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 httpbin 替身")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--delay-scale', type=float, default=1.0, help="/delay 等待时间的缩放比例")
+    args = parser.parse_args()
+
+    server = LocalHttpbin(args.host, args.port, args.delay_scale).start()
+    print(f"本地 httpbin 已启动: {server.url} (按 Ctrl+C 停止)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+网络和 CPU 限速配置（仅 Chromium）
+通过 CDP 的 Network.emulateNetworkConditions 和 Emulation.setCPUThrottlingRate 模拟弱网和低端设备。
+CDP 限速不作用于经 route.fulfill 返回的响应，路由到本地服务的场景改由服务端按 transfer_delay 限速
+"""
+
+from dataclasses import dataclass, replace
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class NetworkProfile:
+    name: str
+    # 吞吐量单位 kbit/s，None 表示不限速
+    download_kbps: Optional[float] = None
+    upload_kbps: Optional[float] = None
+    latency_ms: float = 0
+    cpu_slowdown: float = 1
+
+    @property
+    def throttles_network(self):
+        return self.download_kbps is not None or self.upload_kbps is not None or self.latency_ms > 0
+
+    def cpu_only(self):
+        """去掉网络限速、只保留 CPU 降速的副本，网络部分由服务端模拟时使用"""
+        return replace(self, download_kbps=None, upload_kbps=None, latency_ms=0)
+
+    def transfer_delay(self, nbytes, upload=False):
+        """按延迟和吞吐量估算传输 nbytes 字节需要的秒数"""
+        kbps = self.upload_kbps if upload else self.download_kbps
+        seconds = 0.0 if upload else self.latency_ms / 1000
+        if kbps:
+            seconds += nbytes * 8 / (kbps * 1000)
+        return seconds
+
+    def network_conditions(self):
+        # CDP 的吞吐量单位是 字节/秒，-1 表示不限速
+        to_bytes = lambda kbps: kbps * 1000 / 8 if kbps is not None else -1
+        return {
+            'offline': False,
+            'latency': self.latency_ms,
+            'downloadThroughput': to_bytes(self.download_kbps),
+            'uploadThroughput': to_bytes(self.upload_kbps),
+        }
+
+
+# 参数参考 Chrome DevTools 的预设
+PROFILES = {
+    'none': NetworkProfile('none'),
+    'slow-3g': NetworkProfile('slow-3g', download_kbps=400, upload_kbps=400, latency_ms=2000),
+    '3g': NetworkProfile('3g', download_kbps=1440, upload_kbps=675, latency_ms=562.5),
+    '4g': NetworkProfile('4g', download_kbps=9000, upload_kbps=1500, latency_ms=85),
+    'slow-cpu-4x': NetworkProfile('slow-cpu-4x', cpu_slowdown=4),
+    '3g-slow-cpu-4x': NetworkProfile('3g-slow-cpu-4x', download_kbps=1440, upload_kbps=675,
+                                     latency_ms=562.5, cpu_slowdown=4),
+}
+
+
+def get_profiles(names):
+    """把名称列表转换为配置列表；names 为空时返回不限速配置"""
+    if not names:
+        return [PROFILES['none']]
+    unknown = [name for name in names if name not in PROFILES]
+    if unknown:
+        raise KeyError(f"未知的网络配置: {', '.join(unknown)}，可选: {', '.join(PROFILES)}")
+    return [PROFILES[name] for name in names]
+
+
+def apply_profile(page, profile):
+    """对页面应用限速，返回 CDP 会话（需保持引用）；不限速或非 Chromium 时返回 None（同步 API）"""
+    if profile is None or (not profile.throttles_network and profile.cpu_slowdown == 1):
+        return None
+    try:
+        session = page.context.new_cdp_session(page)
+    except Exception:
+        return None
+    if profile.throttles_network:
+        session.send('Network.enable')
+        session.send('Network.emulateNetworkConditions', profile.network_conditions())
+    if profile.cpu_slowdown != 1:
+        session.send('Emulation.setCPUThrottlingRate', {'rate': profile.cpu_slowdown})
+    return session
+
+
+async def apply_profile_async(page, profile):
+    """apply_profile 的异步 API 版本"""
+    if profile is None or (not profile.throttles_network and profile.cpu_slowdown == 1):
+        return None
+    try:
+        session = await page.context.new_cdp_session(page)
+    except Exception:
+        return None
+    if profile.throttles_network:
+        await session.send('Network.enable')
+        await session.send('Network.emulateNetworkConditions', profile.network_conditions())
+    if profile.cpu_slowdown != 1:
+        await session.send('Emulation.setCPUThrottlingRate', {'rate': profile.cpu_slowdown})
+    return session
@@ -0,0 +1,134 @@
+"""
+低开销网络记录器
+有界环形缓冲区、可选的请求头捕获、URL/资源类型过滤、采样，以及按域名和状态码的实时计数
+同步和异步 API 通用，可挂到 Page 或整个 BrowserContext 上
+"""
+
+import random
+import re
+import time
+from collections import Counter, deque
+from fnmatch import fnmatch
+from urllib.parse import urlsplit
+
+
+class NetworkRecorder:
+    """记录网络事件
+
+    用法:
+        recorder = NetworkRecorder(max_entries=500, resource_types={'document', 'xhr', 'fetch'})
+        recorder.attach(page)        # 或 recorder.attach(context)
+        page.goto(url)
+        print(recorder.summary())
+    """
+
+    def __init__(self, max_entries=1000, capture_headers=False, url_patterns=None,
+                 resource_types=None, sample_rate=1.0):
+        # 超出容量时自动丢弃最早的记录
+        self.buffer = deque(maxlen=max_entries)
+        self.capture_headers = capture_headers
+        # 字符串按通配符匹配，也可以传入编译好的正则
+        self.url_patterns = list(url_patterns or [])
+        self.resource_types = set(resource_types) if resource_types else None
+        self.sample_rate = sample_rate
+
+        self.total_requests = 0
+        self.total_responses = 0
+        self.total_failed = 0
+        self.by_domain = Counter()
+        self.by_status = Counter()
+        self.by_resource_type = Counter()
+
+        self._start = time.monotonic()
+        self._targets = []
+
+    def attach(self, target):
+        """挂到 Page 或 BrowserContext 上"""
+        target.on('request', self._on_request)
+        target.on('response', self._on_response)
+        target.on('requestfailed', self._on_request_failed)
+        self._targets.append(target)
+        return self
+
+    def detach(self):
+        """移除所有监听器"""
+        for target in self._targets:
+            target.remove_listener('request', self._on_request)
+            target.remove_listener('response', self._on_response)
+            target.remove_listener('requestfailed', self._on_request_failed)
+        self._targets.clear()
+
+    def _matches(self, request):
+        if self.resource_types is not None and request.resource_type not in self.resource_types:
+            return False
+        if self.url_patterns:
+            url = request.url
+            return any(
+                pattern.search(url) if isinstance(pattern, re.Pattern) else fnmatch(url, pattern)
+                for pattern in self.url_patterns
+            )
+        return True
+
+    def _sampled(self):
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def _elapsed(self):
+        return round(time.monotonic() - self._start, 4)
+
+    def _on_request(self, request):
+        if not self._matches(request):
+            return
+        self.total_requests += 1
+        self.by_domain[urlsplit(request.url).netloc] += 1
+        self.by_resource_type[request.resource_type] += 1
+        if self._sampled():
+            headers = dict(request.headers) if self.capture_headers else None
+            self.buffer.append(('request', self._elapsed(), request.method, request.url,
+                                request.resource_type, headers))
+
+    def _on_response(self, response):
+        request = response.request
+        if not self._matches(request):
+            return
+        self.total_responses += 1
+        self.by_status[response.status] += 1
+        if self._sampled():
+            headers = dict(response.headers) if self.capture_headers else None
+            self.buffer.append(('response', self._elapsed(), response.status, response.url,
+                                request.resource_type, headers))
+
+    def _on_request_failed(self, request):
+        if not self._matches(request):
+            return
+        self.total_failed += 1
+        if self._sampled():
+            self.buffer.append(('requestfailed', self._elapsed(), request.failure, request.url,
+                                request.resource_type, None))
+
+    def entries(self, kind=None):
+        """以字典形式返回缓冲区中的记录，kind 可选 request/response/requestfailed"""
+        keys = {'request': 'method', 'response': 'status', 'requestfailed': 'failure'}
+        result = []
+        for event, elapsed, detail, url, resource_type, headers in self.buffer:
+            if kind is not None and event != kind:
+                continue
+            entry = {'event': event, 'time': elapsed, keys[event]: detail,
+                     'url': url, 'resource_type': resource_type}
+            if headers is not None:
+                entry['headers'] = headers
+            result.append(entry)
+        return result
+
+    def summary(self):
+        return {
+            'total_requests': self.total_requests,
+            'total_responses': self.total_responses,
+            'failed_requests': self.total_failed,
+            'by_domain': dict(self.by_domain.most_common()),
+            'by_status': {str(status): count for status, count in sorted(self.by_status.items())},
+            'by_resource_type': dict(self.by_resource_type.most_common()),
+            'buffered_entries': len(self.buffer),
+        }
+
+    def to_dict(self):
+        return {'summary': self.summary(), 'entries': self.entries()}
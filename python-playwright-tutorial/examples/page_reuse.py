@@ -0,0 +1,92 @@
+"""
+可复用的已加载页面
+参数化测试的每个用例都访问同一页面时，只导航一次；用例之间重置表单、焦点和滚动位置，
+DOM 被修改时重新应用加载时的 DOM 快照，只有页面跳转或无法安全还原时才重新导航（同步 API）
+"""
+
+from collections import Counter
+
+# 加载完成后在页面中保存 body 快照
+SNAPSHOT_JS = '''() => {
+    window.__pwPageSnapshot = document.body ? document.body.innerHTML : '';
+}'''
+
+# 返回 'reset'（表单重置即可）、'snapshot'（重新应用了 DOM 快照）或 'navigate'（需要重新导航）
+RESTORE_JS = '''() => {
+    const snapshot = window.__pwPageSnapshot;
+    if (snapshot === undefined || !document.body) return 'navigate';
+    for (const form of document.forms) form.reset();
+    if (document.activeElement && document.activeElement.blur) document.activeElement.blur();
+    window.getSelection && window.getSelection().removeAllRanges();
+    window.scrollTo(0, 0);
+    if (document.body.innerHTML === snapshot) return 'reset';
+    // 有脚本的页面重新设置 innerHTML 会丢失事件监听，只能重新导航
+    if (document.scripts.length) return 'navigate';
+    document.body.innerHTML = snapshot;
+    return 'snapshot';
+}'''
+
+
+class ReusablePage:
+    """按 URL 缓存已加载的页面
+
+    用法:
+        pages = ReusablePage(context)
+        page = pages.get('https://httpbin.org/forms/post')   # 首次导航，之后还原后复用
+        print(pages.summary())
+
+    注意：测试在页面上注册的事件监听和路由不会被清除
+    """
+
+    def __init__(self, context, timeout=None, wait_until='load', stats=None):
+        self.context = context
+        self.timeout = timeout
+        self.wait_until = wait_until
+        # 可传入会话级 Counter，汇总多个实例的统计
+        self.stats = stats if stats is not None else Counter()
+        self._pages = {}
+        # 最近一次 get 返回的页面，供失败截图等钩子使用
+        self.current = None
+
+    def _load(self, url, page=None):
+        if page is None:
+            page = self.context.new_page()
+            if self.timeout is not None:
+                page.set_default_timeout(self.timeout)
+        page.goto(url, wait_until=self.wait_until)
+        page.evaluate(SNAPSHOT_JS)
+        self._pages[url] = page
+        self.stats['navigations'] += 1
+        return page
+
+    def get(self, url):
+        """返回处于初始状态的页面"""
+        page = self._pages.get(url)
+        if page is None or page.is_closed():
+            page = self._load(url)
+        else:
+            state = 'navigate' if page.url != url else page.evaluate(RESTORE_JS)
+            if state == 'navigate':
+                self.stats['fallback_navigations'] += 1
+                page = self._load(url, page)
+            else:
+                self.stats['navigations_saved'] += 1
+                if state == 'snapshot':
+                    self.stats['snapshot_restores'] += 1
+        self.current = page
+        return page
+
+    def close(self):
+        for page in self._pages.values():
+            if not page.is_closed():
+                page.close()
+        self._pages.clear()
+        self.current = None
+
+    def summary(self):
+        return {
+            'navigations': self.stats['navigations'],
+            'navigations_saved': self.stats['navigations_saved'],
+            'snapshot_restores': self.stats['snapshot_restores'],
+            'fallback_navigations': self.stats['fallback_navigations'],
+        }
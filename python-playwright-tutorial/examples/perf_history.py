@@ -0,0 +1,228 @@
+"""
+性能历史记录与回归检测
+每次运行的原始样本追加到本地 SQLite，附带提交、主机和浏览器版本；
+compare 命令用 Mann-Whitney U 检验把最新一次运行与滚动基线逐 URL、逐指标比较，
+发现显著回归时以非零状态退出，可作为性能门禁
+
+运行方式: python perf_history.py compare --db perf_history.db --baseline 10 --alpha 0.05
+         python perf_history.py runs --db perf_history.db
+"""
+
+import argparse
+import math
+import socket
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+from statistics import median
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    git_commit TEXT,
+    host TEXT,
+    browser_version TEXT,
+    label TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    url TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_samples_key ON samples (url, metric, run_id);
+'''
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def mann_whitney_greater(x, y):
+    """单侧 Mann-Whitney U 检验：x 是否倾向于大于 y
+
+    使用带结校正和连续性校正的正态近似，返回 (U, p 值)
+    """
+    n1, n2 = len(x), len(y)
+    if not n1 or not n2:
+        return 0.0, 1.0
+
+    combined = sorted([(value, 0) for value in x] + [(value, 1) for value in y])
+    n = n1 + n2
+    rank_sum_x = 0.0
+    tie_term = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        # 并列值取平均秩
+        average_rank = (i + j) / 2 + 1
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        rank_sum_x += average_rank * sum(1 for k in range(i, j + 1) if combined[k][1] == 0)
+        i = j + 1
+
+    u = rank_sum_x - n1 * (n1 + 1) / 2
+    mean_u = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0
+    z = (u - mean_u - 0.5) / math.sqrt(variance)
+    return u, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+class PerfHistory:
+    """SQLite 性能历史
+
+    用法:
+        history = PerfHistory('perf_history.db')
+        history.record_run([(url, 'cold.totalLoad', 812.4), ...], browser_version=browser.version)
+        regressions = history.compare(baseline_runs=10)
+    """
+
+    def __init__(self, path='perf_history.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def record_run(self, samples, git_commit_id=None, host=None, browser_version=None, label=None):
+        """追加一次运行；samples 为 (url, metric, value) 的可迭代对象，返回 run id"""
+        with self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO runs (timestamp, git_commit, host, browser_version, label) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (datetime.now().isoformat(), git_commit_id or git_commit(),
+                 host or socket.gethostname(), browser_version, label)
+            )
+            run_id = cursor.lastrowid
+            self.conn.executemany(
+                'INSERT INTO samples (run_id, url, metric, value) VALUES (?, ?, ?, ?)',
+                ((run_id, url, metric, float(value)) for url, metric, value in samples
+                 if value is not None)
+            )
+        return run_id
+
+    def runs(self, limit=20):
+        return self.conn.execute(
+            'SELECT r.id, r.timestamp, r.git_commit, r.host, r.browser_version, r.label, '
+            'COUNT(s.run_id) FROM runs r LEFT JOIN samples s ON s.run_id = r.id '
+            'GROUP BY r.id ORDER BY r.id DESC LIMIT ?', (limit,)
+        ).fetchall()
+
+    def _values(self, run_ids, url, metric):
+        placeholders = ','.join('?' * len(run_ids))
+        rows = self.conn.execute(
+            f'SELECT value FROM samples WHERE url = ? AND metric = ? AND run_id IN ({placeholders})',
+            (url, metric, *run_ids)
+        )
+        return [row[0] for row in rows]
+
+    def compare(self, run_id=None, baseline_runs=10, alpha=0.05, min_change=0.05, same_environment=True):
+        """把 run_id（默认最新一次）与之前 baseline_runs 次运行比较
+
+        只有 p < alpha 且中位数上升超过 min_change（相对值）时才算回归；
+        所有指标均按 "越小越好" 处理。same_environment 时只与 host、browser_version、label
+        都相同的运行比较，避免笔记本与 CI、Chromium 与 WebKit 的结果混在一起
+        """
+        if run_id is None:
+            row = self.conn.execute('SELECT MAX(id) FROM runs').fetchone()
+            run_id = row[0]
+        if run_id is None:
+            return []
+
+        query = 'SELECT id FROM runs WHERE id < ?'
+        params = [run_id]
+        if same_environment:
+            # IS 对 NULL 也按相等比较
+            query += (' AND host IS (SELECT host FROM runs WHERE id = ?)'
+                      ' AND browser_version IS (SELECT browser_version FROM runs WHERE id = ?)'
+                      ' AND label IS (SELECT label FROM runs WHERE id = ?)')
+            params += [run_id] * 3
+        baseline_ids = [row[0] for row in self.conn.execute(
+            query + ' ORDER BY id DESC LIMIT ?', (*params, baseline_runs)
+        )]
+        if not baseline_ids:
+            return []
+
+        keys = self.conn.execute(
+            'SELECT DISTINCT url, metric FROM samples WHERE run_id = ? ORDER BY url, metric', (run_id,)
+        ).fetchall()
+
+        findings = []
+        for url, metric in keys:
+            current = self._values([run_id], url, metric)
+            baseline = self._values(baseline_ids, url, metric)
+            if not current or not baseline:
+                continue
+            _, p_value = mann_whitney_greater(current, baseline)
+            base_median = median(baseline)
+            current_median = median(current)
+            change = (current_median - base_median) / base_median if base_median else 0.0
+            findings.append({
+                'url': url,
+                'metric': metric,
+                'baseline_median': round(base_median, 2),
+                'current_median': round(current_median, 2),
+                'change': round(change, 4),
+                'p_value': round(p_value, 5),
+                'regression': p_value < alpha and change > min_change,
+            })
+        return findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="性能历史记录与回归检测")
+    parser.add_argument('--db', default='perf_history.db')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    compare_parser = subparsers.add_parser('compare', help="检测最新一次运行的回归")
+    compare_parser.add_argument('--run', type=int, help="要检查的 run id，默认最新")
+    compare_parser.add_argument('--baseline', type=int, default=10, help="基线包含的历史运行数")
+    compare_parser.add_argument('--alpha', type=float, default=0.05, help="显著性水平")
+    compare_parser.add_argument('--min-change', type=float, default=0.05, help="最小相对变化")
+    compare_parser.add_argument('--any-environment', action='store_true',
+                                help="基线包含其他主机、浏览器版本和标签的运行")
+
+    runs_parser = subparsers.add_parser('runs', help="列出最近的运行")
+    runs_parser.add_argument('--limit', type=int, default=20)
+
+    args = parser.parse_args()
+    history = PerfHistory(args.db)
+
+    try:
+        if args.command == 'runs':
+            for run in history.runs(args.limit):
+                print(' | '.join(str(value) for value in run))
+            return 0
+
+        findings = history.compare(args.run, args.baseline, args.alpha, args.min_change,
+                                   same_environment=not args.any_environment)
+        regressions = [f for f in findings if f['regression']]
+        if not findings:
+            print("没有可比较的历史数据")
+            return 0
+
+        for finding in findings:
+            flag = '❌ 回归' if finding['regression'] else '✅'
+            print(f"{flag} {finding['url']} {finding['metric']}: "
+                  f"{finding['baseline_median']} → {finding['current_median']} "
+                  f"({finding['change']:+.1%}, p={finding['p_value']})")
+
+        print(f"\n共比较 {len(findings)} 项, 发现 {len(regressions)} 项回归")
+        return 1 if regressions else 0
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+页面内性能条目流式采集
+通过 init script 注册 PerformanceObserver，在页面运行期间把条目分批经 expose_binding 推送到 Python，
+networkidle 之后才出现的资源、长任务和布局偏移也不会丢失。同步和异步 API 通用
+"""
+
+import inspect
+import json
+from collections import Counter, deque
+
+DEFAULT_ENTRY_TYPES = ('resource', 'longtask', 'paint', 'largest-contentful-paint', 'layout-shift')
+
+BINDING_NAME = '__pwPerfBatch'
+
+_INIT_SCRIPT = '''(() => {
+    const binding = %(binding)s;
+    const entryTypes = %(entry_types)s;
+    const batchSize = %(batch_size)d;
+    const flushInterval = %(flush_interval)d;
+    if (window[binding + 'Installed']) return;
+    window[binding + 'Installed'] = true;
+
+    let queue = [];
+    const serialize = entry => {
+        const item = {
+            type: entry.entryType,
+            name: entry.name,
+            startTime: entry.startTime,
+            duration: entry.duration
+        };
+        switch (entry.entryType) {
+            case 'resource':
+                item.initiatorType = entry.initiatorType;
+                item.transferSize = entry.transferSize;
+                item.responseEnd = entry.responseEnd;
+                break;
+            case 'largest-contentful-paint':
+                item.renderTime = entry.renderTime;
+                item.loadTime = entry.loadTime;
+                item.size = entry.size;
+                item.url = entry.url;
+                break;
+            case 'layout-shift':
+                item.value = entry.value;
+                item.hadRecentInput = entry.hadRecentInput;
+                break;
+            case 'event':
+            case 'first-input':
+                item.interactionId = entry.interactionId || 0;
+                item.processingStart = entry.processingStart;
+                item.processingEnd = entry.processingEnd;
+                break;
+        }
+        return item;
+    };
+
+    const flush = async () => {
+        if (!queue.length || typeof window[binding] !== 'function') return;
+        const batch = queue;
+        queue = [];
+        try { await window[binding](batch); } catch (e) { /* 页面关闭时忽略 */ }
+    };
+    window[binding + 'Flush'] = flush;
+
+    for (const type of entryTypes) {
+        try {
+            const options = {type, buffered: true};
+            if (type === 'event') options.durationThreshold = 16;
+            new PerformanceObserver(list => {
+                for (const entry of list.getEntries()) queue.push(serialize(entry));
+                if (queue.length >= batchSize) flush();
+            }).observe(options);
+        } catch (e) {
+            // 浏览器不支持该条目类型
+        }
+    }
+
+    setInterval(flush, flushInterval);
+    addEventListener('pagehide', flush);
+    addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'hidden') flush();
+    });
+})();'''
+
+
+class PerfTimeline:
+    """按页面保存推送来的性能条目
+
+    用法:
+        timeline = PerfTimeline()
+        timeline.attach(context)          # 异步 API 下需 await
+        page.goto(url)
+        timeline.flush(page)              # 异步 API 下需 await
+        print(timeline.summary(page))
+    """
+
+    def __init__(self, entry_types=DEFAULT_ENTRY_TYPES, batch_size=50, flush_interval=250,
+                 max_entries_per_page=5000, binding_name=BINDING_NAME):
+        self.entry_types = list(entry_types)
+        self.binding_name = binding_name
+        self.max_entries_per_page = max_entries_per_page
+        self.script = _INIT_SCRIPT % {
+            'binding': json.dumps(binding_name),
+            'entry_types': json.dumps(self.entry_types),
+            'batch_size': batch_size,
+            'flush_interval': flush_interval,
+        }
+        self._timelines = {}
+        self.batches = 0
+
+    def attach(self, target):
+        """挂到 BrowserContext 或 Page 上，异步 API 下返回需要 await 的协程"""
+        result = target.expose_binding(self.binding_name, self._on_batch)
+        if inspect.isawaitable(result):
+            async def finish():
+                await result
+                await target.add_init_script(self.script)
+            return finish()
+        target.add_init_script(self.script)
+        return None
+
+    def _on_batch(self, source, batch):
+        page = source['page']
+        entries = self._timelines.get(page)
+        if entries is None:
+            entries = self._timelines[page] = deque(maxlen=self.max_entries_per_page)
+        entries.extend(batch)
+        self.batches += 1
+
+    def flush(self, page):
+        """让页面立即推送缓冲中的条目，异步 API 下需 await"""
+        return page.evaluate(f"() => window['{self.binding_name}Flush'] && window['{self.binding_name}Flush']()")
+
+    def entries(self, page, entry_type=None):
+        entries = self._timelines.get(page, ())
+        if entry_type is None:
+            return list(entries)
+        return [entry for entry in entries if entry['type'] == entry_type]
+
+    def discard(self, page):
+        """页面用完后释放其时间线"""
+        self._timelines.pop(page, None)
+
+    def summary(self, page):
+        entries = self.entries(page)
+        resources = [e for e in entries if e['type'] == 'resource']
+        long_tasks = [e for e in entries if e['type'] == 'longtask']
+        lcp = [e for e in entries if e['type'] == 'largest-contentful-paint']
+        paints = {e['name']: e['startTime'] for e in entries if e['type'] == 'paint'}
+        return {
+            'entries': len(entries),
+            'by_type': dict(Counter(e['type'] for e in entries)),
+            'resources': len(resources),
+            'transferBytes': sum(e.get('transferSize') or 0 for e in resources),
+            'lastResourceEnd': round(max((e.get('responseEnd') or 0 for e in resources), default=0), 2),
+            'longTasks': len(long_tasks),
+            'longTaskMs': round(sum(e['duration'] for e in long_tasks), 2),
+            'firstContentfulPaint': round(paints.get('first-contentful-paint', 0), 2),
+            'largestContentfulPaint': round(max((e['startTime'] for e in lcp), default=0), 2),
+            'layoutShift': round(sum(e.get('value', 0) for e in entries
+                                     if e['type'] == 'layout-shift' and not e.get('hadRecentInput')), 4),
+        }
@@ -0,0 +1,165 @@
+"""
+多次采样性能统计
+每个 URL 冷启动（全新上下文）和热启动（复用缓存）各加载 N 次，
+用单调高精度时钟计时，输出 min、p50、p95、p99 和标准差，可剔除离群值
+"""
+
+import math
+import time
+from statistics import mean, pstdev
+
+# 相对导航开始时间的各项耗时（毫秒）
+NAVIGATION_TIMING_JS = '''() => {
+    const navigation = performance.getEntriesByType('navigation')[0];
+    const paint = name => performance.getEntriesByName(name)[0]?.startTime || 0;
+    return {
+        domContentLoaded: navigation ? navigation.domContentLoadedEventEnd - navigation.startTime : 0,
+        loadEvent: navigation ? navigation.loadEventEnd - navigation.startTime : 0,
+        firstPaint: paint('first-paint'),
+        firstContentfulPaint: paint('first-contentful-paint')
+    };
+}'''
+
+METRICS = ('totalLoad', 'domContentLoaded', 'firstPaint', 'firstContentfulPaint')
+
+
+def percentile(values, p):
+    """线性插值百分位数，p 取 0–100"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def reject_outliers(values, k=1.5):
+    """Tukey 栅栏：剔除四分位距 k 倍以外的值，返回 (保留值, 剔除个数)"""
+    if len(values) < 4:
+        return list(values), 0
+    q1 = percentile(values, 25)
+    q3 = percentile(values, 75)
+    fence = k * (q3 - q1)
+    kept = [v for v in values if q1 - fence <= v <= q3 + fence]
+    return kept, len(values) - len(kept)
+
+
+def summarize(values, outlier_k=1.5):
+    """统计一组样本；outlier_k 为 None 时不剔除离群值"""
+    rejected = 0
+    if outlier_k is not None:
+        values, rejected = reject_outliers(values, outlier_k)
+    if not values:
+        return {'n': 0, 'rejected': rejected}
+    return {
+        'n': len(values),
+        'rejected': rejected,
+        'min': round(min(values), 2),
+        'p50': round(percentile(values, 50), 2),
+        'p95': round(percentile(values, 95), 2),
+        'p99': round(percentile(values, 99), 2),
+        'mean': round(mean(values), 2),
+        'stddev': round(pstdev(values), 2),
+    }
+
+
+class PerfSampler:
+    """对 URL 重复采样加载性能（同步 API）
+
+    用法:
+        sampler = PerfSampler(browser, samples=10, warmup=2)
+        result = sampler.sample('https://example.com')
+        print(result['cold']['totalLoad']['p95'])
+    """
+
+    def __init__(self, browser, samples=5, warmup=1, outlier_k=1.5, wait_until='load',
+                 context_options=None, on_context=None, on_page=None):
+        self.browser = browser
+        self.samples = samples
+        self.warmup = warmup
+        self.outlier_k = outlier_k
+        self.wait_until = wait_until
+        self.context_options = context_options or {}
+        # 每个新建上下文的额外设置，如挂载 ResourceBlocker
+        self.on_context = on_context
+        # 每个新建页面在导航前的设置，如应用网络限速配置
+        self.on_page = on_page
+
+    def _new_context(self):
+        context = self.browser.new_context(**self.context_options)
+        if self.on_context is not None:
+            self.on_context(context)
+        return context
+
+    def _new_page(self, context):
+        page = context.new_page()
+        if self.on_page is not None:
+            self.on_page(page)
+        return page
+
+    def _load(self, page, url):
+        """加载一次，返回各项耗时（毫秒）"""
+        start_time = time.perf_counter()
+        page.goto(url, wait_until=self.wait_until)
+        total_load = (time.perf_counter() - start_time) * 1000
+        timing = page.evaluate(NAVIGATION_TIMING_JS)
+        timing['totalLoad'] = total_load
+        return timing
+
+    def sample_cold(self, url):
+        """每次都用全新上下文加载，没有缓存和连接复用"""
+        runs = []
+        for i in range(self.warmup + self.samples):
+            context = self._new_context()
+            try:
+                timing = self._load(self._new_page(context), url)
+            finally:
+                context.close()
+            if i >= self.warmup:
+                runs.append(timing)
+        return runs
+
+    def sample_warm(self, url):
+        """在同一上下文中重复加载，预热后 HTTP 缓存和连接都已就绪"""
+        runs = []
+        context = self._new_context()
+        try:
+            page = self._new_page(context)
+            for _ in range(max(self.warmup, 1)):
+                self._load(page, url)
+            for _ in range(self.samples):
+                runs.append(self._load(page, url))
+        finally:
+            context.close()
+        return runs
+
+    def _summarize_runs(self, runs):
+        return {
+            metric: summarize([run[metric] for run in runs], self.outlier_k)
+            for metric in METRICS
+        }
+
+    def sample(self, url):
+        """返回冷、热两种模式下各项指标的统计（毫秒），raw 中保留原始样本"""
+        cold_runs = self.sample_cold(url)
+        warm_runs = self.sample_warm(url)
+        return {
+            'url': url,
+            'samples': self.samples,
+            'warmup': self.warmup,
+            'cold': self._summarize_runs(cold_runs),
+            'warm': self._summarize_runs(warm_runs),
+            'raw': {'cold': cold_runs, 'warm': warm_runs},
+        }
+
+
+def flatten_samples(result, prefix=None):
+    """把 sample() 的原始样本展开为 (url, '[前缀.]模式.指标', 值)，供 PerfHistory 记录"""
+    for mode, runs in result['raw'].items():
+        key = f"{prefix}.{mode}" if prefix else mode
+        for run in runs:
+            for metric in METRICS:
+                yield result['url'], f"{key}.{metric}", run[metric]
@@ -0,0 +1,50 @@
+"""
+运行配置
+集中管理浏览器启动参数（headless、slow_mo）、上下文参数（视口、UA）和 trace 模式，
+通过 PLAYWRIGHT_PROFILE 环境变量选择
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+PROFILE_ENV = 'PLAYWRIGHT_PROFILE'
+
+
+@dataclass
+class RunProfile:
+    name: str
+    headless: bool = True
+    slow_mo: int = 0
+    viewport: dict = field(default_factory=lambda: {'width': 1280, 'height': 720})
+    user_agent: Optional[str] = 'Playwright Test Bot'
+    timeout: int = 30000
+    # trace 模式，见 trace_capture.MODES
+    trace: str = 'retain-on-failure'
+
+    def launch_options(self):
+        return {'headless': self.headless, 'slow_mo': self.slow_mo}
+
+    def context_options(self):
+        options = {'viewport': self.viewport}
+        if self.user_agent:
+            options['user_agent'] = self.user_agent
+        return options
+
+
+PROFILES = {
+    # 本地调试：可见窗口并放慢操作，便于观察
+    'debug': RunProfile('debug', headless=False, slow_mo=500, trace='on'),
+    # 持续集成和并行运行
+    'ci': RunProfile('ci'),
+    # 基准测试：小视口，减少绘制开销
+    'bench': RunProfile('bench', viewport={'width': 800, 'height': 600}, timeout=15000, trace='off'),
+}
+
+
+def get_profile(name=None):
+    """按名称返回运行配置，未指定时读取 PLAYWRIGHT_PROFILE，默认 ci"""
+    name = name or os.environ.get(PROFILE_ENV, 'ci')
+    if name not in PROFILES:
+        raise KeyError(f"未知的运行配置: {name}，可选: {', '.join(PROFILES)}")
+    return PROFILES[name]
@@ -0,0 +1,455 @@
+"""
+示例场景基准测试
+导入 01–05 中的场景函数，以无头、无 slow_mo、无 sleep 的方式对本地 httpbin 重复运行，
+按启动、导航、交互、清理四个阶段统计耗时，结果输出为 JSON，便于在不同提交之间比较
+
+运行方式: python scenario_benchmark.py --repeat 5 --output bench.json
+         python scenario_benchmark.py --scenario 05:cookie_and_storage_example
+         python scenario_benchmark.py --network-profile none --network-profile 3g
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import inspect
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from statistics import mean, median, pstdev
+from urllib.parse import urlsplit, urlunsplit
+
+from playwright.async_api import async_playwright
+from playwright.sync_api import sync_playwright
+
+from local_httpbin import LocalHttpbin
+from network_profiles import apply_profile, apply_profile_async, get_profiles
+from run_profiles import get_profile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+MODULE_FILES = {
+    '01': '01_basic_example.py',
+    '02': '02_form_handling.py',
+    '03': '03_async_example.py',
+    '05': '05_advanced_techniques.py',
+}
+
+# 可在本地 httpbin 上运行的场景；依赖真实第三方站点的场景（搜索、GitHub 登录）
+# 和多进程分片示例不在默认列表中。04 是 pytest 套件，由 suite_scaling.py 测量
+DEFAULT_SCENARIOS = [
+    '01:basic_example',
+    '02:form_handling_example',
+    '03:basic_async_example',
+    '03:concurrent_url_testing',
+    '03:form_automation_async',
+    '03:page_interaction_async',
+    '03:network_monitoring_async',
+    '05:network_interception_example',
+    '05:mobile_simulation_example',
+    '05:cookie_and_storage_example',
+    '05:performance_monitoring_example',
+    '05:geolocation_and_permissions_example',
+    '05:web_vitals_example',
+]
+
+PHASES = ('launch', 'navigation', 'interaction', 'teardown')
+
+NAVIGATION_METHODS = {'goto', 'reload', 'go_back', 'go_forward', 'wait_for_load_state', 'wait_for_url'}
+
+
+class PhaseTimer:
+    """累计各阶段耗时；并发场景中各阶段会重叠，交互时间取墙钟时间的剩余部分"""
+
+    def __init__(self):
+        self.totals = dict.fromkeys(PHASES, 0.0)
+
+    def add(self, phase, seconds):
+        self.totals[phase] += seconds
+
+
+def _timed(timer, phase, func, after=None):
+    """包装同步或异步方法：计时，并可对返回值做后处理（如包装成代理）
+
+    after(value) 返回 (新值, 待 await 的对象或 None)
+    """
+
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        result = func(*args, **kwargs)
+
+        if inspect.isawaitable(result):
+            async def finish():
+                try:
+                    value = await result
+                    if after is not None:
+                        value, pending = after(value)
+                        if pending is not None:
+                            await pending
+                    return value
+                finally:
+                    timer.add(phase, time.perf_counter() - start_time)
+            return finish()
+
+        try:
+            if after is not None:
+                result, _ = after(result)
+            return result
+        finally:
+            timer.add(phase, time.perf_counter() - start_time)
+
+    return wrapper
+
+
+class _Proxy:
+    """把未覆盖的属性原样转发给被包装对象"""
+
+    def __init__(self, target, timer, local_url, network_profile=None):
+        self._target = target
+        self._timer = timer
+        self._local_url = local_url
+        self._network_profile = network_profile
+
+    def _proxy_args(self):
+        return self._timer, self._local_url, self._network_profile
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+    # 以被包装对象判等，示例中以页面为键的字典（如 PerfTimeline）用代理也能查到
+    def __eq__(self, other):
+        return self._target == getattr(other, '_target', other)
+
+    def __hash__(self):
+        return hash(self._target)
+
+
+def _local_route_handler(local_url, is_async):
+    """把所有外部 http(s) 请求转发到本地 httpbin，保持路径和查询参数"""
+
+    local_netloc = urlsplit(local_url).netloc
+
+    def target_url(route):
+        url = urlsplit(route.request.url)
+        if url.scheme not in ('http', 'https') or url.netloc == local_netloc:
+            return None
+        return urlunsplit(('http', local_netloc, url.path or '/', url.query, ''))
+
+    if is_async:
+        async def handler(route):
+            target = target_url(route)
+            if target is None:
+                return await route.fallback()
+            response = await route.fetch(url=target, max_redirects=0)
+            await route.fulfill(response=response)
+    else:
+        def handler(route):
+            target = target_url(route)
+            if target is None:
+                return route.fallback()
+            response = route.fetch(url=target, max_redirects=0)
+            route.fulfill(response=response)
+
+    return handler
+
+
+def _install_local_route(target, local_url):
+    is_async = inspect.iscoroutinefunction(target.route)
+    return target.route('**/*', _local_route_handler(local_url, is_async))
+
+
+def _apply_network_profile(proxy, profile):
+    """新页面导航前应用 CPU 降速；CDP 会话保存在页面代理上，随页面存活
+
+    请求都经路由由 route.fulfill 返回，CDP 网络限速对其无效，网络部分由本地 httpbin 模拟
+    """
+    if profile is None:
+        return None
+    page = proxy._target
+    if inspect.iscoroutinefunction(page.goto):
+        async def apply():
+            proxy._cdp_session = await apply_profile_async(page, profile.cpu_only())
+        return apply()
+    proxy._cdp_session = apply_profile(page, profile.cpu_only())
+    return None
+
+
+def _all_pending(*pending):
+    """合并多个待 await 的对象，同步 API 下都是 None"""
+    pending = [item for item in pending if item is not None]
+    if not pending:
+        return None
+
+    async def finish():
+        for item in pending:
+            await item
+    return finish()
+
+
+class _PageProxy(_Proxy):
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name in NAVIGATION_METHODS:
+            return _timed(self._timer, 'navigation', attr)
+        if name == 'close':
+            return _timed(self._timer, 'teardown', attr)
+        return attr
+
+
+class _ContextProxy(_Proxy):
+    def _wrap_page(self, page):
+        proxy = _PageProxy(page, *self._proxy_args())
+        return proxy, _apply_network_profile(proxy, self._network_profile)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name == 'new_page':
+            return _timed(self._timer, 'interaction', attr, after=self._wrap_page)
+        if name == 'close':
+            return _timed(self._timer, 'teardown', attr)
+        return attr
+
+
+class _BrowserProxy(_Proxy):
+    def _wrap_context(self, context):
+        return (_ContextProxy(context, *self._proxy_args()),
+                _install_local_route(context, self._local_url))
+
+    def _wrap_page(self, page):
+        # browser.new_page() 使用隐式上下文，路由装在页面上
+        proxy = _PageProxy(page, *self._proxy_args())
+        return proxy, _all_pending(_install_local_route(page, self._local_url),
+                                   _apply_network_profile(proxy, self._network_profile))
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name == 'new_context':
+            return _timed(self._timer, 'interaction', attr, after=self._wrap_context)
+        if name == 'new_page':
+            return _timed(self._timer, 'interaction', attr, after=self._wrap_page)
+        if name == 'close':
+            return _timed(self._timer, 'teardown', attr)
+        return attr
+
+
+class _BrowserTypeProxy(_Proxy):
+    def __init__(self, target, timer, local_url, launch_options, network_profile=None):
+        super().__init__(target, timer, local_url, network_profile)
+        self._launch_options = launch_options
+
+    def _wrap_browser(self, browser):
+        return _BrowserProxy(browser, *self._proxy_args()), None
+
+    def launch(self, **kwargs):
+        # 强制使用基准配置的 headless 和 slow_mo
+        options = {**kwargs, **self._launch_options}
+        return _timed(self._timer, 'launch', self._target.launch, after=self._wrap_browser)(**options)
+
+
+class _PlaywrightProxy(_Proxy):
+    def __init__(self, target, timer, local_url, launch_options, network_profile=None):
+        super().__init__(target, timer, local_url, network_profile)
+        self._launch_options = launch_options
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name in ('chromium', 'firefox', 'webkit'):
+            return _BrowserTypeProxy(attr, self._timer, self._local_url, self._launch_options,
+                                     self._network_profile)
+        return attr
+
+
+class _ManagerProxy:
+    """替代 sync_playwright() / async_playwright() 返回的上下文管理器"""
+
+    def __init__(self, factory, timer, local_url, launch_options, network_profile=None):
+        self._manager = factory()
+        self._args = (timer, local_url, launch_options, network_profile)
+
+    def __enter__(self):
+        return _PlaywrightProxy(self._manager.__enter__(), *self._args)
+
+    def __exit__(self, *exc_info):
+        return self._manager.__exit__(*exc_info)
+
+    async def __aenter__(self):
+        return _PlaywrightProxy(await self._manager.__aenter__(), *self._args)
+
+    async def __aexit__(self, *exc_info):
+        return await self._manager.__aexit__(*exc_info)
+
+
+class _NoSleepTime:
+    """替换示例模块中的 time 模块：sleep 不等待，其余函数照常"""
+
+    def sleep(self, seconds):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+def load_module(key):
+    path = os.path.join(HERE, MODULE_FILES[key])
+    spec = importlib.util.spec_from_file_location(f"example_{key}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _describe(values):
+    return {
+        'min': round(min(values), 4),
+        'mean': round(mean(values), 4),
+        'median': round(median(values), 4),
+        'max': round(max(values), 4),
+        'stdev': round(pstdev(values), 4),
+    }
+
+
+def _check_web_vitals():
+    """web_vitals_example 写出的记录中，成功的页面必须采集到 LCP 和 TTFB"""
+    with open('web_vitals.json', encoding='utf-8') as f:
+        records = json.load(f)
+    empty = [record['url'] for record in records
+             if 'error' not in record and (record.get('lcp') is None or record.get('ttfb') is None)]
+    if empty:
+        raise AssertionError(f"未采集到 Web Vitals: {', '.join(empty)}")
+
+
+# 场景运行后的结果检查，失败计入 errors，避免耗时正常但结果为空的运行被当作有效数据
+SCENARIO_CHECKS = {
+    '05:web_vitals_example': _check_web_vitals,
+}
+
+
+def run_scenario(module, func_name, local_url, launch_options, repeat, network_profile=None, check=None):
+    """重复运行一个场景，返回各阶段耗时统计；network_profile 会应用到场景创建的每个页面
+
+    check 为可选的无参函数，在每次成功运行后调用，抛出异常即记为出错
+    """
+
+    func = getattr(module, func_name)
+    runs = []
+    errors = []
+
+    for _ in range(repeat):
+        timer = PhaseTimer()
+        module.sync_playwright = lambda: _ManagerProxy(sync_playwright, timer, local_url,
+                                                       launch_options, network_profile)
+        module.async_playwright = lambda: _ManagerProxy(async_playwright, timer, local_url,
+                                                        launch_options, network_profile)
+
+        start_time = time.perf_counter()
+        try:
+            # 示例会大量打印，基准运行时丢弃输出
+            with contextlib.redirect_stdout(io.StringIO()):
+                if inspect.iscoroutinefunction(func):
+                    asyncio.run(func())
+                else:
+                    func()
+            if check is not None:
+                check()
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+        wall = time.perf_counter() - start_time
+
+        phases = dict(timer.totals)
+        phases['interaction'] = max(0.0, wall - phases['launch'] - phases['navigation'] - phases['teardown'])
+        runs.append({'wall': wall, **phases})
+
+    return {
+        'runs': len(runs),
+        'errors': errors,
+        'wall': _describe([run['wall'] for run in runs]),
+        **{phase: _describe([run[phase] for run in runs]) for phase in PHASES},
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(scenarios=None, repeat=3, profile='bench', delay_scale=0.0, network_profiles=None):
+    """运行所有场景，返回可直接写入 JSON 的报告
+
+    指定多个网络配置时每个场景在各配置下分别运行，结果键为 "场景@配置"；
+    延迟和吞吐量由本地 httpbin 按配置限速（路由返回的响应不受 CDP 限速影响）
+    """
+
+    profile = get_profile(profile)
+    network_profiles = get_profiles(network_profiles)
+    launch_options = profile.launch_options()
+    modules = {}
+    results = {}
+    original_cwd = os.getcwd()
+
+    with LocalHttpbin(delay_scale=delay_scale) as server, tempfile.TemporaryDirectory() as workdir:
+        # 示例会写截图和临时文件，放到临时目录中
+        os.chdir(workdir)
+        try:
+            for scenario in scenarios or DEFAULT_SCENARIOS:
+                key, func_name = scenario.split(':')
+                if key not in modules:
+                    modules[key] = load_module(key)
+                    modules[key].time = _NoSleepTime()
+                    # 02 的表单示例依赖 __main__ 中定义的 abs_path
+                    modules[key].abs_path = workdir
+                for network_profile in network_profiles:
+                    # 网络限速在服务端模拟，CPU 降速仍通过 CDP 应用到每个页面
+                    server.set_network_profile(network_profile)
+                    name = scenario if network_profile.name == 'none' else f"{scenario}@{network_profile.name}"
+                    results[name] = run_scenario(modules[key], func_name, server.url,
+                                                 launch_options, repeat, network_profile,
+                                                 SCENARIO_CHECKS.get(scenario))
+        finally:
+            os.chdir(original_cwd)
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'profile': profile.name,
+        'network_profiles': [network_profile.name for network_profile in network_profiles],
+        'repeat': repeat,
+        'scenarios': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="示例场景基准测试")
+    parser.add_argument('--repeat', type=int, default=3, help="每个场景重复次数")
+    parser.add_argument('--scenario', action='append', help="只运行指定场景，如 05:cookie_and_storage_example")
+    parser.add_argument('--profile', default='bench', help="运行配置名称，见 run_profiles.py")
+    parser.add_argument('--delay-scale', type=float, default=0.0, help="本地 /delay 的等待缩放比例")
+    parser.add_argument('--network-profile', action='append',
+                        help="网络配置名称，可重复指定，见 network_profiles.py")
+    parser.add_argument('--output', default='benchmark.json')
+    args = parser.parse_args()
+
+    report = run_benchmark(args.scenario, args.repeat, args.profile, args.delay_scale,
+                           args.network_profile)
+
+    print(f"{'场景':<45} {'墙钟':>8} {'启动':>8} {'导航':>8} {'交互':>8} {'清理':>8}")
+    for name, result in report['scenarios'].items():
+        medians = [result[key]['median'] for key in ('wall', *PHASES)]
+        flag = f"  ({len(result['errors'])} 次出错)" if result['errors'] else ''
+        print(f"{name:<45} " + ' '.join(f"{value:>8.3f}" for value in medians) + flag)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"结果已保存到 {args.output}（中位数，单位秒）")
+
+
+if __name__ == "__main__":
+    main()
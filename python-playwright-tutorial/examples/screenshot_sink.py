@@ -0,0 +1,242 @@
+"""
+异步截图管道
+截图只在主流程中抓取到内存，哈希去重、转码和写盘交给后台线程，
+支持 PNG / JPEG / WebP（WebP 需要 Pillow）、质量参数和裁剪区域。同步和异步 API 通用
+"""
+
+import hashlib
+import inspect
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow 是可选依赖，只有 WebP 需要
+    Image = None
+
+EXTENSIONS = {'png': '.png', 'jpeg': '.jpg', 'webp': '.webp'}
+
+
+class ScreenshotSink:
+    """截图后台写入器
+
+    用法:
+        with ScreenshotSink(output_dir='screenshots', image_format='jpeg', quality=70) as sink:
+            sink.capture(page, 'home.png', clip={'x': 0, 'y': 0, 'width': 800, 'height': 600})
+            # 异步 API 下: await sink.capture(page, 'home.png')
+        print(sink.summary())
+    """
+
+    def __init__(self, output_dir=None, image_format='png', quality=None, dedupe=True, max_workers=2):
+        if image_format not in EXTENSIONS:
+            raise ValueError(f"不支持的图片格式: {image_format}，可选: {', '.join(EXTENSIONS)}")
+        if image_format == 'webp' and Image is None:
+            raise ImportError("WebP 格式需要安装 Pillow: pip install Pillow")
+        self.output_dir = output_dir
+        self.image_format = image_format
+        self.quality = quality
+        # 内容完全相同的帧只编码一次，写入按内容哈希命名的私有文件，各路径硬链接（不支持时复制）到它；
+        # 私有文件不会被覆盖，之后改写某个截图路径不影响内容相同的其他文件
+        self.dedupe = dedupe
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='screenshot')
+        self._lock = threading.Lock()
+        # 私有文件目录，首次写入时在 output_dir 下创建（同一设备才能硬链接），close 时删除
+        self._store_dir = None
+        # 内容哈希 -> (私有文件路径, 写完时置位的 Event)
+        self._written = {}
+        # 截图路径 -> 最近一次提交的序号；同一路径的多次写入只保留最后提交的内容
+        self._sequence = 0
+        self._latest = {}
+        # 未完成的写入，完成后自动移除
+        self._futures = set()
+        self.captured = 0
+        self.written = 0
+        self.duplicates = 0
+        self.bytes_written = 0
+        self.capture_seconds = 0.0
+        self.background_seconds = 0.0
+
+    def _resolve_path(self, path):
+        root, _ = os.path.splitext(path)
+        path = root + EXTENSIONS[self.image_format]
+        if self.output_dir and not os.path.isabs(path):
+            path = os.path.join(self.output_dir, path)
+        return path
+
+    def _screenshot_options(self, clip, full_page, options):
+        options = dict(options)
+        if clip is not None:
+            options['clip'] = clip
+        if full_page:
+            options['full_page'] = True
+        if self.image_format == 'jpeg':
+            # JPEG 由浏览器直接编码，比先出 PNG 再转码更快
+            options['type'] = 'jpeg'
+            options['quality'] = self.quality or 80
+        else:
+            # WebP 先取无损 PNG，在后台线程转码
+            options['type'] = 'png'
+        return options
+
+    def capture(self, target, path, clip=None, full_page=False, **options):
+        """截取 Page 或 Locator，返回 Future（结果为写入的文件路径，重复帧同样会生成该文件）
+
+        异步 API 下返回需要 await 的协程，await 的结果同样是 Future
+        """
+        path = self._resolve_path(path)
+        start_time = time.perf_counter()
+        result = target.screenshot(**self._screenshot_options(clip, full_page, options))
+        if inspect.isawaitable(result):
+            async def finish():
+                return self._submit(await result, path, start_time)
+            return finish()
+        return self._submit(result, path, start_time)
+
+    def _submit(self, data, path, start_time):
+        with self._lock:
+            self.captured += 1
+            self.capture_seconds += time.perf_counter() - start_time
+            self._sequence += 1
+            sequence = self._latest[path] = self._sequence
+        future = self._executor.submit(self._write, data, path, sequence)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _encode(self, data):
+        if self.image_format != 'webp':
+            return data
+        buffer = io.BytesIO()
+        Image.open(io.BytesIO(data)).save(buffer, 'WEBP', quality=self.quality or 80)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _prepare_dir(path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _publish(self, source, path, sequence, link):
+        """把 source 放到 path 上：link 为真时硬链接（不支持时复制），否则重命名
+
+        在锁内完成，且只有 path 最近一次提交的写入生效，后台线程乱序完成时不会被旧内容覆盖；
+        先删除再链接，不改动与之硬链接的其他文件
+        """
+        with self._lock:
+            if self._latest.get(path) != sequence:
+                if not link:
+                    os.remove(source)
+                return
+            del self._latest[path]
+            if os.path.lexists(path):
+                os.remove(path)
+            if not link:
+                os.replace(source, path)
+                return
+            try:
+                os.link(source, path)
+            except OSError:
+                shutil.copyfile(source, path)
+
+    def _store_path(self, digest):
+        if self._store_dir is None:
+            directory = self.output_dir or '.'
+            os.makedirs(directory, exist_ok=True)
+            self._store_dir = tempfile.mkdtemp(prefix='.screenshot-dedupe-', dir=directory)
+        return os.path.join(self._store_dir, digest)
+
+    def _write(self, data, path, sequence):
+        """后台线程：去重、转码、写盘"""
+        start_time = time.perf_counter()
+        self._prepare_dir(path)
+        if not self.dedupe:
+            encoded = self._encode(data)
+            temporary = f"{path}.{sequence}.tmp"
+            with open(temporary, 'wb') as f:
+                f.write(encoded)
+            self._publish(temporary, path, sequence, link=False)
+            with self._lock:
+                self.written += 1
+                self.bytes_written += len(encoded)
+                self.background_seconds += time.perf_counter() - start_time
+            return path
+
+        digest = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            entry = self._written.get(digest)
+            first = entry is None
+            if first:
+                entry = (self._store_path(digest), threading.Event())
+                self._written[digest] = entry
+        stored, done = entry
+
+        if first:
+            try:
+                encoded = self._encode(data)
+                with open(stored, 'wb') as f:
+                    f.write(encoded)
+            except Exception:
+                with self._lock:
+                    # 写入失败时不再作为去重的来源
+                    self._written.pop(digest, None)
+                raise
+            finally:
+                done.set()
+        else:
+            # 第一份先提交，执行器按提交顺序启动，这里不会等待一个尚未开始的写入
+            done.wait()
+            if not os.path.exists(stored):
+                # 第一份写入失败，自己重新写
+                return self._write(data, path, sequence)
+
+        self._publish(stored, path, sequence, link=True)
+        with self._lock:
+            if first:
+                self.written += 1
+                self.bytes_written += len(encoded)
+            else:
+                self.duplicates += 1
+            self.background_seconds += time.perf_counter() - start_time
+        return path
+
+    def flush(self):
+        """等待已提交的截图全部写完"""
+        with self._lock:
+            pending = list(self._futures)
+        wait(pending)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self._store_dir is not None:
+            # 截图路径是硬链接或副本，删除私有文件不影响它们
+            shutil.rmtree(self._store_dir, ignore_errors=True)
+            self._store_dir = None
+            self._written.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def summary(self):
+        return {
+            'format': self.image_format,
+            'captured': self.captured,
+            'written': self.written,
+            'duplicates': self.duplicates,
+            'bytes_written': self.bytes_written,
+            # 主流程只等待抓取；编码、去重和写盘在后台线程完成，与主流程并行
+            'capture_seconds': round(self.capture_seconds, 3),
+            'background_seconds': round(self.background_seconds, 3),
+        }
@@ -0,0 +1,75 @@
+"""
+会话状态缓存
+基于 context.storage_state() 按站点和角色缓存 Cookie 与 localStorage，
+登录或 Cookie 设置只在缓存缺失、过期或失效时执行
+"""
+
+import json
+import os
+import re
+import time
+
+
+class SessionCache:
+    """按 (站点, 角色) 缓存浏览器存储状态
+
+    用法:
+        cache = SessionCache(ttl=3600)
+        context = cache.new_context(browser, 'example.com', 'admin',
+                                    login=do_login, validate=is_logged_in)
+    """
+
+    def __init__(self, cache_dir='.auth', ttl=3600):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        # 本次运行中缓存命中/未命中次数
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, site, role):
+        safe_name = re.sub(r'[^\w.-]', '_', f"{site}__{role}")
+        return os.path.join(self.cache_dir, f"{safe_name}.json")
+
+    def is_fresh(self, site, role):
+        """缓存文件存在且未超过 TTL"""
+        path = self.path(site, role)
+        return os.path.exists(path) and time.time() - os.path.getmtime(path) < self.ttl
+
+    def save(self, context, site, role):
+        """保存存储状态；先写临时文件再替换，并行 worker 不会读到写了一半的文件"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(site, role)
+        state = context.storage_state()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+        return state
+
+    def invalidate(self, site, role):
+        path = self.path(site, role)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def new_context(self, browser, site, role, login, validate=None, **context_options):
+        """返回已带有会话状态的新上下文
+
+        login(context): 执行登录或 Cookie 设置，仅在缓存不可用时调用
+        validate(context) -> bool: 检查会话是否仍然有效，可选
+        """
+
+        if self.is_fresh(site, role):
+            context = browser.new_context(storage_state=self.path(site, role), **context_options)
+            if validate is None or validate(context):
+                self.hits += 1
+                return context
+            # 会话已失效（如服务端过期），丢弃缓存重新登录
+            context.close()
+            self.invalidate(site, role)
+
+        self.misses += 1
+        context = browser.new_context(**context_options)
+        login(context)
+        if validate is None or validate(context):
+            self.save(context, site, role)
+        return context
@@ -0,0 +1,148 @@
+"""
+多进程分片 URL 测试
+把 URL 列表切分到进程池，每个进程一个事件循环和一个浏览器池，最后合并成一份报告
+
+运行方式: python sharded_runner.py urls.txt --shards 4 --workers 4
+         python sharded_runner.py urls.txt --scaling 1 2 4 8
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from playwright.async_api import async_playwright
+
+from browser_pool import BrowserPool, check_url
+from url_scheduler import schedule_urls
+
+
+def shard_urls(urls, shards):
+    """按轮询方式把 URL 分到 shards 个分片，慢主机不会集中在同一分片"""
+    buckets = [[] for _ in range(shards)]
+    for i, url in enumerate(urls):
+        buckets[i % shards].append(url)
+    return [bucket for bucket in buckets if bucket]
+
+
+async def _run_shard_async(urls, engine, workers, per_host, browsers):
+    results = []
+    async with async_playwright() as p:
+        async with BrowserPool(p, engines=[engine], browsers_per_engine=browsers) as pool:
+            handler = lambda url: check_url(pool, url, engine)
+            async for result in schedule_urls(urls, handler, workers=workers, per_host=per_host):
+                results.append(result)
+    return {'results': results, 'pool_stats': pool.stats.summary()}
+
+
+def _run_shard(shard_index, urls, engine, workers, per_host, browsers):
+    """子进程入口：独立的事件循环和浏览器池"""
+    start_time = time.perf_counter()
+    shard = asyncio.run(_run_shard_async(urls, engine, workers, per_host, browsers))
+    shard['shard'] = shard_index
+    shard['elapsed'] = round(time.perf_counter() - start_time, 3)
+    return shard
+
+
+def run_sharded(urls, shards=4, workers=4, per_host=2, engine='chromium', browsers_per_shard=1):
+    """在 shards 个进程中测试 URL，返回合并后的报告
+
+    workers 和 per_host 是每个分片内部的并发上限
+    """
+
+    urls = list(urls)
+    buckets = shard_urls(urls, shards)
+    start_time = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=len(buckets) or 1) as executor:
+        futures = [
+            executor.submit(_run_shard, i, bucket, engine, workers, per_host, browsers_per_shard)
+            for i, bucket in enumerate(buckets)
+        ]
+        shard_reports = [future.result() for future in futures]
+
+    total_time = time.perf_counter() - start_time
+    results = [result for shard in shard_reports for result in shard['results']]
+    success = sum(1 for result in results if result.get('status') == 'success')
+
+    return {
+        'shards': len(buckets),
+        'workers_per_shard': workers,
+        'engine': engine,
+        'total_urls': len(results),
+        'success': success,
+        'errors': len(results) - success,
+        'total_time': round(total_time, 3),
+        'pages_per_second': round(len(results) / total_time, 2) if total_time else 0,
+        'shard_summary': [
+            {
+                'shard': shard['shard'],
+                'urls': len(shard['results']),
+                'elapsed': shard['elapsed'],
+                'pool_stats': shard['pool_stats'],
+            }
+            for shard in shard_reports
+        ],
+        'results': results,
+    }
+
+
+def scaling_benchmark(urls, shard_counts=(1, 2, 4, 8), **kwargs):
+    """依次用不同分片数运行同一批 URL，返回吞吐量和加速比；未包含 1 时补测单分片，加速比以其实测耗时为基准"""
+
+    urls = list(urls)
+    shard_counts = sorted(set(shard_counts) | {1})
+    rows = []
+    for shards in shard_counts:
+        report = run_sharded(urls, shards=shards, **kwargs)
+        rows.append({
+            'shards': shards,
+            'total_time': report['total_time'],
+            'pages_per_second': report['pages_per_second'],
+            'errors': report['errors'],
+        })
+
+    baseline = rows[0]['total_time']
+    for row in rows:
+        # speedup = t1 / tN
+        row['speedup'] = round(baseline / row['total_time'], 2) if row['total_time'] else 0
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程分片 URL 测试")
+    parser.add_argument('url_file', help="URL 列表文件，每行一个")
+    parser.add_argument('--shards', type=int, default=4, help="进程分片数")
+    parser.add_argument('--workers', type=int, default=4, help="每个分片的并发数")
+    parser.add_argument('--per-host', type=int, default=2, help="每个分片内同一主机的并发上限")
+    parser.add_argument('--engine', default='chromium', choices=['chromium', 'firefox', 'webkit'])
+    parser.add_argument('--scaling', type=int, nargs='*', help="分片数扩展测试，如 1 2 4 8")
+    parser.add_argument('--output', default='sharded_report.json', help="合并报告输出路径")
+    args = parser.parse_args()
+
+    with open(args.url_file, encoding='utf-8') as f:
+        urls = [line.strip() for line in f if line.strip()]
+
+    options = {'workers': args.workers, 'per_host': args.per_host, 'engine': args.engine}
+
+    if args.scaling:
+        print(f"扩展测试: {len(urls)} 个URL, 分片数 {args.scaling}")
+        rows = scaling_benchmark(urls, shard_counts=args.scaling, **options)
+        print(f"{'分片':>6} {'耗时(秒)':>10} {'页/秒':>8} {'加速比':>8} {'错误':>6}")
+        for row in rows:
+            print(f"{row['shards']:>6} {row['total_time']:>10} {row['pages_per_second']:>8} "
+                  f"{row['speedup']:>8} {row['errors']:>6}")
+        report = {'scaling': rows}
+    else:
+        report = run_sharded(urls, shards=args.shards, **options)
+        print(f"完成 {report['total_urls']} 个URL: 成功 {report['success']}, 失败 {report['errors']}")
+        print(f"总耗时 {report['total_time']}秒, 吞吐量 {report['pages_per_second']} 页/秒")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"报告已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+测试套件并行扩展基准
+用不同的 pytest-xdist worker 数运行 04_pytest_integration.py，记录耗时、加速比、并行效率和 worker 空闲比例
+
+运行方式: python suite_scaling.py --workers 1 2 4 8 --output suite_scaling.json
+         python suite_scaling.py --workers 1 2 4 8 --balanced   # 按历史耗时调度，见 duration_scheduler.py
+两次运行的空闲比例对比即是耗时调度的效果；单 worker 那一轮同时写入耗时记录
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SUITE = os.path.join(HERE, '04_pytest_integration.py')
+
+
+def run_suite(workers, profile='ci', extra_args=()):
+    """以指定 worker 数运行测试套件，返回 (耗时秒数, 退出码, worker 空闲比例)"""
+    env = {**os.environ, 'PLAYWRIGHT_PROFILE': profile}
+    with tempfile.TemporaryDirectory() as tmp:
+        idle_report = os.path.join(tmp, 'idle.json')
+        # duration_scheduler 统计空闲时间；是否按耗时调度由 extra_args 中的 --dist loadgroup 决定
+        command = [sys.executable, '-m', 'pytest', SUITE, '-q', '-p', 'no:cacheprovider',
+                   '-n', str(workers), '-p', 'duration_scheduler', '--idle-report', idle_report,
+                   *extra_args]
+        start_time = time.perf_counter()
+        completed = subprocess.run(command, cwd=HERE, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start_time
+        try:
+            with open(idle_report, encoding='utf-8') as f:
+                idle_ratio = json.load(f)['idle_ratio']
+        except (OSError, ValueError, KeyError):
+            idle_ratio = None
+    return elapsed, completed.returncode, idle_ratio
+
+
+def measure_scaling(worker_counts=(1, 2, 4, 8), repeat=1, profile='ci', extra_args=()):
+    """依次以各 worker 数运行套件；未包含 1 时补测单 worker，加速比以其实测耗时为基准"""
+    worker_counts = sorted(set(worker_counts) | {1})
+    rows = []
+    for workers in worker_counts:
+        timings = []
+        exit_codes = []
+        idle_ratios = []
+        for _ in range(repeat):
+            elapsed, exit_code, idle_ratio = run_suite(workers, profile, extra_args)
+            timings.append(elapsed)
+            exit_codes.append(exit_code)
+            idle_ratios.append(idle_ratio)
+        rows.append({
+            'workers': workers,
+            'best_time': round(min(timings), 3),
+            'timings': [round(t, 3) for t in timings],
+            'exit_codes': exit_codes,
+            # 最快一次的空闲比例
+            'idle_ratio': idle_ratios[timings.index(min(timings))],
+        })
+
+    baseline = rows[0]['best_time']
+    for row in rows:
+        # speedup = t1 / tN，efficiency = speedup / N
+        row['speedup'] = round(baseline / row['best_time'], 2) if row['best_time'] else 0
+        row['efficiency'] = round(row['speedup'] / row['workers'], 2)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测试套件并行扩展基准")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=1, help="每个 worker 数重复次数，取最快一次")
+    parser.add_argument('--profile', default='ci', help="运行配置名称，见 run_profiles.py")
+    parser.add_argument('--output', default='suite_scaling.json')
+    parser.add_argument('--balanced', action='store_true', help="以 --dist loadgroup 运行，由 duration_scheduler 按历史耗时调度")
+    parser.add_argument('pytest_args', nargs='*', help="额外传给 pytest 的参数，放在 -- 之后")
+    args = parser.parse_args()
+
+    extra_args = list(args.pytest_args)
+    if args.balanced:
+        extra_args += ['--dist', 'loadgroup']
+    rows = measure_scaling(args.workers, args.repeat, args.profile, extra_args)
+
+    print(f"{'workers':>8} {'耗时(秒)':>10} {'加速比':>8} {'效率':>6} {'空闲比例':>8}")
+    for row in rows:
+        idle = f"{row['idle_ratio']:.1%}" if row['idle_ratio'] is not None else '-'
+        print(f"{row['workers']:>8} {row['best_time']:>10} {row['speedup']:>8} {row['efficiency']:>6} {idle:>8}")
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'profile': args.profile,
+        'balanced': args.balanced,
+        'cpu_count': os.cpu_count(),
+        'results': rows,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+辅助模块的离线测试
+不启动浏览器，覆盖视觉比对、截图去重、耗时调度、性能回归门禁和用户数据读取中的纯逻辑
+运行方式: pytest test_helpers.py -v
+"""
+
+import io
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from duration_scheduler import base_nodeid, plan_units, save_durations, load_durations
+from perf_history import PerfHistory, mann_whitney_greater
+from screenshot_sink import ScreenshotSink
+from user_data import InvalidRow, UserDataSource
+from visual_diff import VisualBaseline, compare_images
+
+
+def _png(array):
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def _image(height=128, width=128):
+    # 固定内容的渐变图，避免纯色图让抗锯齿判断失去意义
+    rows = np.linspace(0, 255, height, dtype=np.uint8)[:, None, None]
+    return np.broadcast_to(rows, (height, width, 3)).copy()
+
+
+class FakeTarget:
+    """只实现 screenshot 的 Page 替身"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def screenshot(self, **options):
+        return self.data
+
+
+class TestVisualDiff:
+    """视觉回归比对"""
+
+    def test_identical_bytes_match(self):
+        data = _png(_image())
+        result = compare_images(data, data)
+        assert result.match and result.diff_pixels == 0
+
+    def test_diff_reports_tile(self):
+        baseline = _image()
+        actual = baseline.copy()
+        actual[70:80, 10:20] = (255, 0, 0)
+        result = compare_images(actual, baseline, anti_aliasing=False, tile_size=64)
+        assert not result.match
+        assert result.diff_pixels == 100
+        assert result.diff_tiles == [(1, 0)]
+
+    def test_masked_region_is_ignored(self):
+        baseline = _image()
+        actual = baseline.copy()
+        actual[70:80, 10:20] = (255, 0, 0)
+        mask = {'x': 0, 'y': 64, 'width': 64, 'height': 64}
+        assert compare_images(actual, baseline, anti_aliasing=False, masks=[mask]).match
+
+    def test_allowed_diff_pixels(self):
+        baseline = _image()
+        actual = baseline.copy()
+        actual[0:5, 0:5] = (255, 0, 0)
+        assert compare_images(actual, baseline, anti_aliasing=False, max_diff_pixels=25).match
+        assert not compare_images(actual, baseline, anti_aliasing=False, max_diff_pixels=24).match
+
+    def test_size_mismatch(self):
+        result = compare_images(_image(128, 128), _image(64, 128))
+        assert not result.match and result.size_mismatch
+
+    def test_missing_baseline_fails_and_saves_actual(self, tmp_path):
+        visual = VisualBaseline(tmp_path / 'baselines', diff_dir=tmp_path / 'diffs', update=False)
+        result = visual.check('home', _png(_image()))
+        assert not result.match and result.missing_baseline
+        assert (tmp_path / 'diffs' / 'home.actual.png').exists()
+        assert visual.summary()['missing_baselines'] == 1
+
+    def test_update_then_check(self, tmp_path):
+        data = _png(_image())
+        created = VisualBaseline(tmp_path, update=True).check('home', data)
+        assert created.match and created.new_baseline
+
+        visual = VisualBaseline(tmp_path, diff_dir=tmp_path / 'diffs', update=False)
+        assert visual.check('home', data).match
+        changed = _image()
+        changed[0:10, 0:10] = (255, 0, 0)
+        result = visual.check('home', _png(changed), anti_aliasing=False)
+        assert not result.match
+        assert os.path.exists(result.diff_path)
+        assert visual.summary()['failed'] == 1
+
+
+class TestScreenshotSink:
+    """截图去重写盘"""
+
+    def test_concurrent_duplicates_create_every_file(self, tmp_path):
+        with ScreenshotSink(output_dir=tmp_path, max_workers=4) as sink:
+            futures = [sink.capture(FakeTarget(b'frame'), f"shot{i}.png") for i in range(20)]
+            paths = [future.result() for future in futures]
+        assert all(open(path, 'rb').read() == b'frame' for path in paths)
+        assert sink.written == 1 and sink.duplicates == 19
+        # 私有去重目录在 close 时删除
+        assert sorted(os.listdir(tmp_path)) == sorted(f"shot{i}.png" for i in range(20))
+
+    def test_overwrite_does_not_change_duplicates(self, tmp_path):
+        for attempt in range(50):
+            directory = tmp_path / str(attempt)
+            with ScreenshotSink(output_dir=directory) as sink:
+                sink.capture(FakeTarget(b'old'), 'a.png')
+                sink.capture(FakeTarget(b'old'), 'b.png')
+                sink.capture(FakeTarget(b'new'), 'a.png')
+            assert (directory / 'a.png').read_bytes() == b'new'
+            assert (directory / 'b.png').read_bytes() == b'old'
+
+    @pytest.mark.parametrize("dedupe", [True, False])
+    def test_last_write_wins(self, tmp_path, dedupe):
+        with ScreenshotSink(output_dir=tmp_path, dedupe=dedupe, max_workers=4) as sink:
+            for i in range(10):
+                sink.capture(FakeTarget(f"frame{i}".encode()), 'same.png')
+        assert (tmp_path / 'same.png').read_bytes() == b'frame9'
+        assert os.listdir(tmp_path) == ['same.png']
+
+
+class TestDurationScheduler:
+    """按耗时调度"""
+
+    def test_longest_units_start_first_on_separate_workers(self):
+        estimates = {'long': 1.0, 'mid': 0.6, 'mid2': 0.5, **{f"short{i}": 0.05 for i in range(6)}}
+        plans = plan_units(estimates, 2)
+        assert [plan[0] for plan in plans] == ['long', 'mid']
+        loads = [sum(estimates[unit] for unit in plan) for plan in plans]
+        # 最优分配两边各 1.2 秒
+        assert max(loads) == pytest.approx(1.2)
+
+    def test_plan_covers_every_unit_once(self):
+        estimates = {f"unit{i}": float(i % 7) for i in range(30)}
+        plans = plan_units(estimates, 4)
+        assert sorted(unit for plan in plans for unit in plan) == sorted(estimates)
+
+    def test_base_nodeid_strips_group_suffix(self):
+        assert base_nodeid('test_x.py::test_a@group') == 'test_x.py::test_a'
+        assert base_nodeid('test_x.py::test_a[user@example.com]') == 'test_x.py::test_a[user@example.com]'
+
+    def test_durations_are_smoothed(self, tmp_path):
+        path = tmp_path / 'durations.json'
+        save_durations(path, {'t': 2.0}, {'t': 4.0, 'new': 1.0})
+        assert load_durations(path) == {'t': 3.0, 'new': 1.0}
+
+
+class TestPerfHistory:
+    """Mann-Whitney 回归门禁"""
+
+    def test_mann_whitney_detects_shift(self):
+        _, p_value = mann_whitney_greater([150, 152, 149, 151, 153], [100, 101, 99, 102, 98, 100])
+        assert p_value < 0.01
+        _, p_value = mann_whitney_greater([100, 101, 99], [100, 101, 99])
+        assert p_value > 0.4
+
+    def _history(self, tmp_path, current, host='ci'):
+        history = PerfHistory(str(tmp_path / 'perf.db'))
+        for run in range(5):
+            history.record_run([('/', 'load', value) for value in (100 + run, 101, 99, 100)],
+                               git_commit_id='base', host='ci', browser_version='1', label='x')
+        history.record_run([('/', 'load', value) for value in current],
+                           git_commit_id='head', host=host, browser_version='1', label='x')
+        return history
+
+    def test_regression_fails_gate(self, tmp_path):
+        history = self._history(tmp_path, [150, 152, 149, 151])
+        (finding,) = history.compare()
+        assert finding['regression'] and finding['change'] > 0.4
+        history.close()
+
+    def test_unchanged_run_passes_gate(self, tmp_path):
+        history = self._history(tmp_path, [100, 101, 99, 100])
+        assert not any(finding['regression'] for finding in history.compare())
+        history.close()
+
+    def test_other_environment_is_not_a_baseline(self, tmp_path):
+        history = self._history(tmp_path, [150, 152, 149, 151], host='laptop')
+        assert history.compare() == []
+        assert history.compare(same_environment=False)[0]['regression']
+        history.close()
+
+
+class TestUserData:
+    """CSV / XLSX 用户数据"""
+
+    HEADER = ['username', 'email', 'password', 'expected_result']
+
+    def test_missing_columns_raise(self, tmp_path):
+        path = tmp_path / 'users.csv'
+        path.write_text('user,mail\na,b\n', encoding='utf-8')
+        with pytest.raises(InvalidRow, match='password'):
+            UserDataSource(str(path)).count()
+
+    def test_shards_split_rows(self, tmp_path):
+        path = tmp_path / 'users.csv'
+        rows = [','.join(self.HEADER)] + [f"user{i},user{i}@example.com,pw,success" for i in range(10)]
+        path.write_text('\n'.join(rows) + '\n', encoding='utf-8')
+        source = UserDataSource(str(path))
+        shards = [list(source.shard(index, 3)) for index in range(3)]
+        assert [len(users) for users in shards] == [4, 3, 3]
+        assert [user.username for users in shards for user in users] == [f"user{i}" for i in range(10)]
+
+    def test_xlsx_blank_rows_are_skipped(self, tmp_path):
+        openpyxl = pytest.importorskip('openpyxl')
+        workbook = openpyxl.Workbook()
+        worksheet = workbook.active
+        worksheet.append(self.HEADER)
+        worksheet.append(['alice', 'alice@example.com', 'pw', 'success'])
+        # 带格式的空单元格让只读模式报告尾部空行
+        worksheet['D20'].font = openpyxl.styles.Font(bold=True)
+        path = tmp_path / 'users.xlsx'
+        workbook.save(path)
+
+        source = UserDataSource(str(path))
+        assert [user.username for user in source] == ['alice']
+        assert source.invalid == 0
@@ -0,0 +1,114 @@
+"""
+按需保存的 Playwright trace
+每个上下文只启动一次 tracing，每个测试录制为一个 chunk；测试通过时丢弃 chunk，
+只有失败、重试或被抽样的测试才写出 trace zip。同步和异步 API 通用
+
+查看方式: playwright show-trace traces/<测试名>.zip
+"""
+
+import inspect
+import os
+import random
+import re
+import weakref
+
+TRACE_ENV = 'PLAYWRIGHT_TRACE'
+SAMPLE_ENV = 'PLAYWRIGHT_TRACE_SAMPLE'
+
+# off: 不录制；retain-on-failure: 只保存失败和重试；on: 全部保存
+MODES = ('off', 'retain-on-failure', 'on')
+
+
+def _chain(*steps):
+    """依次执行若干无参调用；异步 API 下第一个返回值可 await 时，整体返回协程"""
+    first = steps[0]()
+    if not inspect.isawaitable(first):
+        for step in steps[1:]:
+            step()
+        return None
+
+    async def finish():
+        await first
+        for step in steps[1:]:
+            await step()
+    return finish()
+
+
+class FailureTracer:
+    """失败时保存 trace
+
+    用法:
+        tracer = FailureTracer.from_env()
+        tracer.start(context, 'test_login')          # 异步 API 下需 await
+        ...
+        tracer.stop(context, 'test_login', failed=True)
+    """
+
+    def __init__(self, mode='retain-on-failure', sample_rate=0.0, output_dir='traces',
+                 screenshots=True, snapshots=True, sources=False):
+        if mode not in MODES:
+            raise ValueError(f"未知的 trace 模式: {mode}，可选: {', '.join(MODES)}")
+        self.mode = mode
+        # 通过的测试按此比例抽样保存，用于对比失败前后的行为
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.trace_options = {'screenshots': screenshots, 'snapshots': snapshots, 'sources': sources}
+        self._started = weakref.WeakSet()
+        self.recorded = 0
+        self.saved = 0
+        self.sampled = 0
+        self.discarded = 0
+
+    @classmethod
+    def from_env(cls, default_mode='retain-on-failure', **kwargs):
+        """读取 PLAYWRIGHT_TRACE 和 PLAYWRIGHT_TRACE_SAMPLE"""
+        mode = os.environ.get(TRACE_ENV, default_mode)
+        sample_rate = float(os.environ.get(SAMPLE_ENV, '0'))
+        return cls(mode=mode, sample_rate=sample_rate, **kwargs)
+
+    @property
+    def enabled(self):
+        return self.mode != 'off'
+
+    def path_for(self, name):
+        return os.path.join(self.output_dir, re.sub(r'[^\w.-]+', '_', name).strip('_') + '.zip')
+
+    def start(self, context, name):
+        """开始录制一个测试，同一上下文中的后续测试只开新 chunk"""
+        if not self.enabled:
+            return None
+        self.recorded += 1
+        steps = []
+        if context not in self._started:
+            self._started.add(context)
+            steps.append(lambda: context.tracing.start(**self.trace_options))
+        steps.append(lambda: context.tracing.start_chunk(title=name))
+        return _chain(*steps)
+
+    def should_keep(self, failed=False, retried=False):
+        if self.mode == 'on' or failed or retried:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def stop(self, context, name, failed=False, retried=False):
+        """结束当前 chunk：需要保留时写出 zip，否则丢弃（不产生文件写入）"""
+        if not self.enabled or context not in self._started:
+            return None
+        if self.should_keep(failed, retried):
+            path = self.path_for(name)
+            os.makedirs(self.output_dir, exist_ok=True)
+            self.saved += 1
+            if not (failed or retried or self.mode == 'on'):
+                self.sampled += 1
+            return context.tracing.stop_chunk(path=path)
+        self.discarded += 1
+        return context.tracing.stop_chunk()
+
+    def summary(self):
+        return {
+            'mode': self.mode,
+            'recorded': self.recorded,
+            'saved': self.saved,
+            'sampled': self.sampled,
+            'discarded': self.discarded,
+        }
@@ -0,0 +1,123 @@
+"""
+有界并发 URL 调度器
+从迭代器或异步生成器中取 URL，交给固定数量的 worker 处理，结果按完成顺序流式返回
+"""
+
+import asyncio
+import json
+from collections import deque
+from urllib.parse import urlsplit
+
+
+async def _aiter(urls):
+    """统一普通迭代器和异步迭代器"""
+    if hasattr(urls, '__aiter__'):
+        async for url in urls:
+            yield url
+    else:
+        for url in urls:
+            yield url
+
+
+async def schedule_urls(urls, handler, workers=4, per_host=2, queue_size=None):
+    """并发处理 URL，按完成顺序逐个产出结果
+
+    urls: 可迭代对象或异步迭代器，按需读取，不会一次性展开
+    handler: async def handler(url) -> dict
+    workers: 同时处理的 URL 上限
+    per_host: 同一主机同时处理的 URL 上限
+    queue_size: 预读但尚未开始的 URL 上限，默认 workers * 4
+
+    主机已达 per_host 上限时，它的 URL 留在该主机的等待队列里，空闲名额交给其他主机，
+    不会出现所有 worker 都在等同一主机的情况
+    """
+
+    source = _aiter(urls).__aiter__()
+    buffer_limit = queue_size or workers * 4
+    # 主机 -> 等待中的 URL；主机 -> 处理中的数量，两者清空后删除键，不随主机数增长
+    pending = {}
+    active = {}
+    running = {}
+    buffered = 0
+    next_url = None
+    exhausted = False
+    source_error = None
+
+    async def run(url):
+        try:
+            return await handler(url)
+        except Exception as e:
+            return {'url': url, 'status': f'error: {str(e)}'}
+
+    def dispatch():
+        """按主机轮流启动 URL，直到 worker 占满或没有可启动的主机"""
+        nonlocal buffered
+        started = True
+        while started and len(running) < workers:
+            started = False
+            for host in list(pending):
+                if len(running) >= workers:
+                    break
+                if active.get(host, 0) >= per_host:
+                    continue
+                queue = pending[host]
+                url = queue.popleft()
+                if not queue:
+                    del pending[host]
+                buffered -= 1
+                active[host] = active.get(host, 0) + 1
+                running[asyncio.ensure_future(run(url))] = host
+                started = True
+
+    try:
+        while True:
+            if not exhausted and next_url is None and buffered < buffer_limit:
+                next_url = asyncio.ensure_future(source.__anext__())
+            dispatch()
+            waiting = set(running)
+            if next_url is not None:
+                waiting.add(next_url)
+            if not waiting:
+                break
+
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is next_url:
+                    next_url = None
+                    try:
+                        url = task.result()
+                    except StopAsyncIteration:
+                        exhausted = True
+                    except Exception as e:
+                        # URL 来源本身出错时，处理完已读取的 URL 后向调用方抛出
+                        source_error = e
+                        exhausted = True
+                    else:
+                        pending.setdefault(urlsplit(url).netloc, deque()).append(url)
+                        buffered += 1
+                    continue
+
+                host = running.pop(task)
+                active[host] -= 1
+                if not active[host]:
+                    del active[host]
+                yield task.result()
+
+        if source_error is not None:
+            raise source_error
+    finally:
+        leftovers = [*running] + ([next_url] if next_url is not None else [])
+        for task in leftovers:
+            task.cancel()
+        await asyncio.gather(*leftovers, return_exceptions=True)
+        await source.aclose()
+
+
+async def stream_to_jsonl(results, path):
+    """把结果逐行写入 JSON Lines 文件，同时原样产出，内存占用不随结果数增长"""
+
+    with open(path, 'w', encoding='utf-8') as f:
+        async for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + '\n')
+            f.flush()
+            yield result
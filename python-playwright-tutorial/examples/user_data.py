@@ -0,0 +1,179 @@
+"""
+数据驱动测试的用户数据
+从 CSV 或 XLSX 文件逐行读取并校验为 UserData，不把整个文件读入内存；
+按行号区间分片给不同 worker，分片内按批次处理，收集时间和内存不随行数增长
+
+XLSX 需要 openpyxl（只读模式流式读取）；CSV 只用标准库
+"""
+
+import csv
+import os
+import re
+from dataclasses import dataclass
+from itertools import islice
+
+REQUIRED_COLUMNS = ('username', 'email', 'password', 'expected_result')
+EXPECTED_RESULTS = ('success', 'error')
+
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+# 测试数据类
+@dataclass
+class UserData:
+    username: str
+    email: str
+    password: str
+    expected_result: str
+
+
+class InvalidRow(ValueError):
+    """数据行不符合 UserData 的要求"""
+
+
+def _text(value):
+    # XLSX 单元格可能是数字或空值
+    return '' if value is None else str(value).strip()
+
+
+def validate_row(row):
+    """把 {列名: 值} 转换为 UserData，不合法时抛出 InvalidRow
+
+    expected_result 为 success 的行必须有用户名和格式正确的邮箱；
+    error 行用于反向测试，不校验字段内容
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in row]
+    if missing:
+        raise InvalidRow(f"缺少列: {', '.join(missing)}")
+    user = UserData(*(_text(row[column]) for column in REQUIRED_COLUMNS))
+    user.expected_result = user.expected_result.lower()
+    if user.expected_result not in EXPECTED_RESULTS:
+        raise InvalidRow(f"expected_result 必须是 {' 或 '.join(EXPECTED_RESULTS)}: {user.expected_result!r}")
+    if user.expected_result == 'success':
+        if not user.username:
+            raise InvalidRow("username 为空")
+        if not _EMAIL.match(user.email):
+            raise InvalidRow(f"邮箱格式不正确: {user.email!r}")
+    return user
+
+
+def check_header(header, path=''):
+    """表头缺少必需列时抛出 InvalidRow，避免整个文件的每一行都被当作无效行跳过"""
+    missing = [column for column in REQUIRED_COLUMNS if column not in (header or ())]
+    if missing:
+        raise InvalidRow(f"{path} 表头缺少列: {', '.join(missing)}，实际表头: {list(header or ())}")
+
+
+def _csv_rows(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        check_header(reader.fieldnames, path)
+        yield from reader
+
+
+def _xlsx_rows(path, sheet=None):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.active
+        rows = worksheet.iter_rows(values_only=True)
+        header = [_text(cell) for cell in next(rows, ())]
+        check_header(header, path)
+        for values in rows:
+            # 只读模式常把格式残留的尾部空行也报告出来，整行为空时跳过，与 CSV 一致
+            if all(value is None for value in values):
+                continue
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def shard_range(total, index, count):
+    """第 index 个分片（共 count 个）负责的行号区间 [start, stop)，各分片行数最多相差 1"""
+    if not 0 <= index < count:
+        raise ValueError(f"分片序号 {index} 超出范围 0..{count - 1}")
+    size, extra = divmod(total, count)
+    start = index * size + min(index, extra)
+    return start, start + size + (1 if index < extra else 0)
+
+
+class UserDataSource:
+    """CSV / XLSX 用户数据的惰性读取
+
+    用法:
+        source = UserDataSource('users.csv')
+        for batch in source.shard(0, 4).batches(500):
+            for user in batch:
+                ...
+        print(source.summary())
+
+    表头缺少必需列时在第一次读取（count 或迭代）时抛出 InvalidRow；
+    无效行跳过并记录行号，行号以数据行计（不含表头），分片区间包含无效行，保证各 worker 划分一致
+    """
+
+    def __init__(self, path, sheet=None, start=0, stop=None, max_errors=100):
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in ('.csv', '.xlsx', '.xlsm'):
+            raise ValueError(f"不支持的数据文件格式: {path}，可选: .csv、.xlsx")
+        self.path = path
+        self.sheet = sheet
+        self.start = start
+        self.stop = stop
+        self.max_errors = max_errors
+        self._total = None
+        self.read = 0
+        self.valid = 0
+        self.invalid = 0
+        self.errors = []
+
+    def _rows(self):
+        if self.path.lower().endswith('.csv'):
+            return _csv_rows(self.path)
+        return _xlsx_rows(self.path, self.sheet)
+
+    def count(self):
+        """文件中的数据行数（流式计数一次，之后缓存）"""
+        if self._total is None:
+            self._total = sum(1 for _ in self._rows())
+        return self._total
+
+    def shard(self, index, count):
+        """返回只读取第 index 个分片行号区间的数据源"""
+        start, stop = shard_range(self.count(), index, count)
+        source = UserDataSource(self.path, self.sheet, start, stop, self.max_errors)
+        source._total = self._total
+        return source
+
+    def __iter__(self):
+        rows = islice(self._rows(), self.start, self.stop)
+        for line, row in enumerate(rows, start=self.start):
+            self.read += 1
+            try:
+                user = validate_row(row)
+            except InvalidRow as e:
+                self.invalid += 1
+                if len(self.errors) < self.max_errors:
+                    self.errors.append((line, str(e)))
+                continue
+            self.valid += 1
+            yield user
+
+    def batches(self, size=500):
+        """按批次产出 UserData 列表，内存中最多保留一批"""
+        users = iter(self)
+        while True:
+            batch = list(islice(users, size))
+            if not batch:
+                return
+            yield batch
+
+    def summary(self):
+        return {
+            'path': self.path,
+            'rows': f"{self.start}..{self.stop if self.stop is not None else 'end'}",
+            'read': self.read,
+            'valid': self.valid,
+            'invalid': self.invalid,
+            'errors': self.errors[:10],
+        }
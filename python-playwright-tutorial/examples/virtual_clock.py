@@ -0,0 +1,101 @@
+"""
+虚拟时钟
+基于 Playwright 的 clock API，在上下文中安装可控时钟，由测试主动推进页面里的
+setTimeout / setInterval / Date，计时器驱动的界面不再需要真实等待。
+统计虚拟推进的时间和实际耗时，即节省的等待时间（同步 API）
+"""
+
+import re
+import time
+
+_DURATION = re.compile(r'^(?:(\d+):)?(\d+):(\d+)$')
+
+
+def to_ms(duration):
+    """把毫秒数或 "mm:ss" / "hh:mm:ss" 字符串转换为毫秒"""
+    if isinstance(duration, (int, float)):
+        return duration
+    match = _DURATION.match(duration)
+    if not match:
+        raise ValueError(f"无法解析的时长: {duration}")
+    hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return ((hours * 60 + minutes) * 60 + seconds) * 1000
+
+
+class ClockStats:
+    """汇总多个虚拟时钟：虚拟推进时间与实际耗时之差即为节省的等待"""
+
+    def __init__(self):
+        self.clocks = 0
+        self.virtual_ms = 0.0
+        self.wall_ms = 0.0
+
+    def record(self, virtual_ms, wall_ms):
+        self.virtual_ms += virtual_ms
+        self.wall_ms += wall_ms
+
+    def summary(self):
+        return {
+            'clocks': self.clocks,
+            'virtual_seconds': round(self.virtual_ms / 1000, 3),
+            'wall_seconds': round(self.wall_ms / 1000, 3),
+            'saved_seconds': round((self.virtual_ms - self.wall_ms) / 1000, 3),
+        }
+
+
+class VirtualClock:
+    """上下文级别的可控时钟
+
+    用法:
+        clock = VirtualClock(context).install()
+        page.goto(url)
+        clock.run_for(5000)                                # 页面计时器前进 5 秒
+        clock.run_until(page, "() => !!document.querySelector('#done')")
+    """
+
+    def __init__(self, context, stats=None):
+        self.context = context
+        self.stats = stats if stats is not None else ClockStats()
+        self.virtual_ms = 0.0
+
+    def install(self, start_time=None):
+        """安装时钟，需在页面加载前调用；start_time 为 datetime、时间戳或日期字符串"""
+        if start_time is None:
+            self.context.clock.install()
+        else:
+            self.context.clock.install(time=start_time)
+        self.stats.clocks += 1
+        return self
+
+    def _advance(self, method, duration):
+        start_time = time.perf_counter()
+        method(duration)
+        wall_ms = (time.perf_counter() - start_time) * 1000
+        virtual_ms = to_ms(duration)
+        self.virtual_ms += virtual_ms
+        self.stats.record(virtual_ms, wall_ms)
+
+    def run_for(self, duration):
+        """推进时间并依次触发期间到期的所有计时器"""
+        self._advance(self.context.clock.run_for, duration)
+
+    def fast_forward(self, duration):
+        """直接跳过一段时间，期间到期的计时器最多触发一次（类似休眠后唤醒）"""
+        self._advance(self.context.clock.fast_forward, duration)
+
+    def pause_at(self, when):
+        """让时间停在指定时刻，之后只随 run_for / fast_forward 前进"""
+        self.context.clock.pause_at(when)
+
+    def run_until(self, page, condition, step=100, timeout=60000):
+        """按 step 毫秒推进时钟直到页面条件成立，替代固定时长的 sleep
+
+        condition 为返回布尔值的 JS 函数字符串；返回推进的虚拟毫秒数，超时抛出 TimeoutError
+        """
+        advanced = 0
+        while not page.evaluate(condition):
+            if advanced >= timeout:
+                raise TimeoutError(f"虚拟时间推进 {timeout}ms 后条件仍不成立: {condition}")
+            self.run_for(step)
+            advanced += step
+        return advanced
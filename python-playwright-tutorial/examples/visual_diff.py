@@ -0,0 +1,366 @@
+"""
+视觉回归比对
+用 NumPy 把新截图与保存的基线逐块比较：字节完全相同时直接通过，否则按行带逐块比对，
+超过允许的差异像素数即提前结束；支持抗锯齿容差和遮罩区域，只在不一致时写出差异图
+
+运行方式: python visual_diff.py baseline.png actual.png --diff diff.png
+         python visual_diff.py visual_baselines/ device_screenshots/ --diff-dir visual_diffs
+"""
+
+import argparse
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+from PIL import Image
+
+# 抗锯齿检测时比较的 8 个相邻像素
+_NEIGHBOR_SHIFTS = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx]
+
+
+@dataclass
+class DiffResult:
+    match: bool
+    diff_pixels: int = 0
+    diff_ratio: float = 0.0
+    # 有差异的图块坐标 (行, 列)，提前结束时只包含已检查的部分
+    diff_tiles: List[tuple] = field(default_factory=list)
+    size_mismatch: bool = False
+    new_baseline: bool = False
+    # 基线不存在且未开启更新：实际截图保存在 diff_dir 中，结果为不一致
+    missing_baseline: bool = False
+    diff_path: Optional[str] = None
+    seconds: float = 0.0
+
+
+def load_image(source):
+    """把文件路径、PNG/JPEG 字节或数组转换为 RGB uint8 数组 (高, 宽, 3)"""
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with Image.open(source) as image:
+        return np.asarray(image.convert('RGB'))
+
+
+def _raw_bytes(source):
+    """文件路径或字节返回原始字节，数组返回 None"""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read()
+    return None
+
+
+def mask_array(shape, masks):
+    """把遮罩区域列表（与截图 clip 参数相同的 x/y/width/height 字典）转换为布尔数组"""
+    ignore = np.zeros(shape[:2], dtype=bool)
+    for region in masks or ():
+        x, y = int(region['x']), int(region['y'])
+        ignore[max(y, 0):max(y + int(region['height']), 0), max(x, 0):max(x + int(region['width']), 0)] = True
+    return ignore
+
+
+def _channel_delta(a, b):
+    """逐像素最大通道差 (0–255)，最后一维为颜色通道"""
+    delta = np.abs(a.astype(np.int16) - b.astype(np.int16))
+    return np.maximum(np.maximum(delta[..., 0], delta[..., 1]), delta[..., 2])
+
+
+def _pixel_diff(a, b, threshold):
+    """颜色差超过阈值（0–1）的像素为 True"""
+    return _channel_delta(a, b) > threshold * 255
+
+
+def _padded_band(image, rows):
+    """取 rows 行带并在四周各扩展 1 像素（取相邻行，图像边缘处复制边缘像素）"""
+    height = image.shape[0]
+    band = image[max(rows.start - 1, 0):rows.stop + 1]
+    return np.pad(band, ((int(rows.start == 0), int(rows.stop >= height)), (1, 1), (0, 0)), mode='edge')
+
+
+def _luma(pixels):
+    return pixels @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def _blended(pixels, neighbors):
+    """亮度严格介于相邻像素最暗和最亮之间的像素，即边缘上的混合色"""
+    luma = _luma(pixels)
+    neighbor_luma = _luma(neighbors)
+    return (luma > neighbor_luma.min(axis=0)) & (luma < neighbor_luma.max(axis=0))
+
+
+def _matches_neighbor(pixels, neighbors, threshold):
+    """像素是否与另一张图中某个相邻像素颜色一致"""
+    return (_channel_delta(neighbors, pixels) <= threshold * 255).any(axis=0)
+
+
+def _remove_anti_aliased(band, actual, baseline, rows, threshold):
+    """把抗锯齿和一像素以内的边缘偏移从差异中去掉（原地修改 band）
+
+    像素在任一张图中是边缘混合色，且两边都能在对方邻域中找到相同颜色才算抗锯齿；
+    整块颜色变化（如文字内容改变）不满足混合色条件，仍算作差异。
+    只对差异像素取邻域，差异稀疏时开销很小
+    """
+    ys, xs = np.nonzero(band)
+    actual_pad = _padded_band(actual, rows)
+    baseline_pad = _padded_band(baseline, rows)
+    actual_pixels = actual_pad[ys + 1, xs + 1]
+    baseline_pixels = baseline_pad[ys + 1, xs + 1]
+    actual_neighbors = np.stack([actual_pad[ys + 1 + dy, xs + 1 + dx] for dy, dx in _NEIGHBOR_SHIFTS])
+    baseline_neighbors = np.stack([baseline_pad[ys + 1 + dy, xs + 1 + dx] for dy, dx in _NEIGHBOR_SHIFTS])
+
+    anti_aliased = ((_blended(actual_pixels, actual_neighbors) | _blended(baseline_pixels, baseline_neighbors))
+                    & _matches_neighbor(actual_pixels, baseline_neighbors, threshold)
+                    & _matches_neighbor(baseline_pixels, actual_neighbors, threshold))
+    band[ys[anti_aliased], xs[anti_aliased]] = False
+
+
+def diff_mask(actual, baseline, threshold=0.1, anti_aliasing=True, masks=None,
+              tile_size=64, max_diff_pixels=0, early_exit=True):
+    """按 tile_size 行的行带比较，返回 (差异布尔数组, 差异图块列表, 是否提前结束)"""
+    height, width = baseline.shape[:2]
+    ignore = mask_array(baseline.shape, masks) if masks else None
+    mismatch = np.zeros((height, width), dtype=bool)
+    tiles = []
+    total = 0
+
+    for top in range(0, height, tile_size):
+        rows = slice(top, min(top + tile_size, height))
+        # 整个行带完全相同时跳过，大部分页面的大部分区域都走这条路径
+        if np.array_equal(actual[rows], baseline[rows]):
+            continue
+
+        band = _pixel_diff(actual[rows], baseline[rows], threshold)
+        if ignore is not None:
+            band &= ~ignore[rows]
+        if anti_aliasing and band.any():
+            _remove_anti_aliased(band, actual, baseline, rows, threshold)
+        count = int(band.sum())
+        if not count:
+            continue
+
+        mismatch[rows] = band
+        # 行带内再按列切成图块，记录哪些图块有差异
+        columns = np.add.reduceat(band.any(axis=0), np.arange(0, width, tile_size))
+        tiles.extend((top // tile_size, int(column)) for column in np.flatnonzero(columns))
+        total += count
+        if early_exit and total > max_diff_pixels:
+            return mismatch, tiles, True
+
+    return mismatch, tiles, False
+
+
+def compare_images(actual, baseline, threshold=0.1, anti_aliasing=True, masks=None,
+                   tile_size=64, max_diff_pixels=0, max_diff_ratio=0.0, early_exit=True):
+    """比较两张截图，返回 DiffResult
+
+    threshold 为单像素颜色差容差（0–1）；允许的差异像素数取 max_diff_pixels 和
+    max_diff_ratio × 总像素中较大者
+    """
+    start_time = time.perf_counter()
+    raw_actual = _raw_bytes(actual)
+    raw_baseline = _raw_bytes(baseline)
+    # 编码后的字节完全相同时不解码，直接通过
+    if raw_actual is not None and raw_actual == raw_baseline:
+        return DiffResult(match=True, seconds=time.perf_counter() - start_time)
+    actual = load_image(actual if raw_actual is None else raw_actual)
+    baseline = load_image(baseline if raw_baseline is None else raw_baseline)
+
+    if actual.shape != baseline.shape:
+        return DiffResult(match=False, size_mismatch=True, seconds=time.perf_counter() - start_time)
+    if np.array_equal(actual, baseline):
+        return DiffResult(match=True, seconds=time.perf_counter() - start_time)
+
+    pixels = baseline.shape[0] * baseline.shape[1]
+    allowed = max(max_diff_pixels, int(max_diff_ratio * pixels))
+    mismatch, tiles, _ = diff_mask(actual, baseline, threshold, anti_aliasing, masks,
+                                   tile_size, allowed, early_exit)
+    diff_pixels = int(mismatch.sum())
+    return DiffResult(
+        match=diff_pixels <= allowed,
+        diff_pixels=diff_pixels,
+        diff_ratio=round(diff_pixels / pixels, 6),
+        diff_tiles=tiles,
+        seconds=time.perf_counter() - start_time,
+    )
+
+
+def write_diff_image(actual, baseline, path, threshold=0.1, anti_aliasing=True, masks=None):
+    """写出差异图：基线淡化为灰度背景，差异像素标红，遮罩区域标黄"""
+    actual = load_image(actual)
+    baseline = load_image(baseline)
+    mismatch, _, _ = diff_mask(actual, baseline, threshold, anti_aliasing, masks, early_exit=False)
+
+    gray = baseline.mean(axis=2, keepdims=True)
+    output = (255 - (255 - gray) * 0.3).repeat(3, axis=2).astype(np.uint8)
+    if masks:
+        output[mask_array(baseline.shape, masks)] = (255, 230, 120)
+    output[mismatch] = (255, 0, 0)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    Image.fromarray(output).save(path)
+    return path
+
+
+class VisualBaseline:
+    """基线目录管理
+
+    用法:
+        visual = VisualBaseline('visual_baselines', diff_dir='visual_diffs')
+        result = visual.check('home', page.screenshot())
+        assert result.match, result.diff_path
+
+    update=True（环境变量 UPDATE_BASELINES=1）时把当前截图保存为基线；
+    否则基线不存在视为不一致，实际截图保存到 diff_dir，避免缺少基线或名称拼错的检查总是通过
+    """
+
+    def __init__(self, baseline_dir='visual_baselines', diff_dir='visual_diffs', update=None,
+                 **compare_options):
+        self.baseline_dir = baseline_dir
+        self.diff_dir = diff_dir
+        if update is None:
+            update = os.environ.get('UPDATE_BASELINES', '').lower() in ('1', 'true', 'yes')
+        self.update = update
+        self.compare_options = compare_options
+        # check_many 在线程池中调用 check，计数需要加锁
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.failed = 0
+        self.created = 0
+        self.missing = 0
+        self.seconds = 0.0
+
+    def baseline_path(self, name):
+        return os.path.join(self.baseline_dir, f"{name}.png")
+
+    def _save_baseline(self, name, actual):
+        path = self.baseline_path(name)
+        os.makedirs(self.baseline_dir, exist_ok=True)
+        if isinstance(actual, (bytes, bytearray)) and actual[:8] == b'\x89PNG\r\n\x1a\n':
+            with open(path, 'wb') as f:
+                f.write(actual)
+        else:
+            Image.fromarray(load_image(actual)).save(path)
+
+    def _save_actual(self, name, actual):
+        # 保留实际截图，方便确认后替换基线
+        os.makedirs(self.diff_dir, exist_ok=True)
+        Image.fromarray(actual).save(os.path.join(self.diff_dir, f"{name}.actual.png"))
+
+    def check(self, name, actual, masks=None, **options):
+        """把截图（字节、路径或数组）与名为 name 的基线比较"""
+        options = {**self.compare_options, **options}
+        baseline_path = self.baseline_path(name)
+
+        if self.update:
+            self._save_baseline(name, actual)
+            with self._lock:
+                self.checked += 1
+                self.created += 1
+            return DiffResult(match=True, new_baseline=True)
+
+        if not os.path.exists(baseline_path):
+            with self._lock:
+                self.checked += 1
+                self.failed += 1
+                self.missing += 1
+            if self.diff_dir:
+                self._save_actual(name, load_image(actual))
+            return DiffResult(match=False, missing_baseline=True)
+
+        # 基线只读一次：字节相同时 compare_images 不解码，否则两张图各解码一次，差异图复用解码结果
+        raw_actual = _raw_bytes(actual)
+        with open(baseline_path, 'rb') as f:
+            raw_baseline = f.read()
+        if raw_actual is not None and raw_actual == raw_baseline:
+            result = DiffResult(match=True)
+        else:
+            actual = load_image(actual if raw_actual is None else raw_actual)
+            baseline = load_image(raw_baseline)
+            result = compare_images(actual, baseline, masks=masks, **options)
+        with self._lock:
+            self.checked += 1
+            self.seconds += result.seconds
+            self.failed += not result.match
+        if not result.match:
+            if self.diff_dir and not result.size_mismatch:
+                result.diff_path = write_diff_image(
+                    actual, baseline, os.path.join(self.diff_dir, f"{name}.diff.png"),
+                    options.get('threshold', 0.1), options.get('anti_aliasing', True), masks
+                )
+            if self.diff_dir:
+                self._save_actual(name, actual)
+        return result
+
+    def check_many(self, items, max_workers=4):
+        """并行比较 [(name, 截图), ...]，返回 {name: DiffResult}
+
+        解码和 NumPy 运算大部分时间释放 GIL，线程池即可利用多核
+        """
+        items = list(items)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(lambda item: self.check(*item), items)
+            return {name: result for (name, _), result in zip(items, results)}
+
+    def summary(self):
+        return {
+            'checked': self.checked,
+            'failed': self.failed,
+            'new_baselines': self.created,
+            'missing_baselines': self.missing,
+            'compare_seconds': round(self.seconds, 3),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="视觉回归比对")
+    parser.add_argument('baseline', help="基线图片或目录")
+    parser.add_argument('actual', help="新截图或目录（按文件名与基线对应）")
+    parser.add_argument('--threshold', type=float, default=0.1, help="单像素颜色差容差 (0-1)")
+    parser.add_argument('--max-diff-pixels', type=int, default=0)
+    parser.add_argument('--no-anti-aliasing', action='store_true', help="不忽略抗锯齿差异")
+    parser.add_argument('--diff', help="单张比较时的差异图输出路径")
+    parser.add_argument('--diff-dir', default='visual_diffs', help="目录比较时的差异图目录")
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    options = {'threshold': args.threshold, 'max_diff_pixels': args.max_diff_pixels,
+               'anti_aliasing': not args.no_anti_aliasing}
+
+    if not os.path.isdir(args.baseline):
+        result = compare_images(args.actual, args.baseline, **options)
+        if not result.match and args.diff and not result.size_mismatch:
+            write_diff_image(args.actual, args.baseline, args.diff, args.threshold, options['anti_aliasing'])
+        print(f"{'✅ 一致' if result.match else '❌ 不一致'}: 差异像素 {result.diff_pixels} "
+              f"({result.diff_ratio:.4%}), 耗时 {result.seconds * 1000:.1f}ms")
+        return 0 if result.match else 1
+
+    visual = VisualBaseline(args.baseline, diff_dir=args.diff_dir, update=False, **options)
+    names = sorted(os.path.splitext(name)[0] for name in os.listdir(args.actual) if name.endswith('.png'))
+    start_time = time.perf_counter()
+    results = visual.check_many(
+        ((name, os.path.join(args.actual, f"{name}.png")) for name in names), args.workers
+    )
+    for name, result in results.items():
+        if result.missing_baseline:
+            print(f"❓ {name}: 缺少基线（UPDATE_BASELINES=1 时生成）")
+        elif not result.match:
+            print(f"❌ {name}: 差异像素 {result.diff_pixels}, 差异图 {result.diff_path}")
+    summary = visual.summary()
+    print(f"\n比较 {summary['checked']} 张, 不一致 {summary['failed']} 张, "
+          f"缺少基线 {summary['missing_baselines']} 张, 耗时 {time.perf_counter() - start_time:.2f}秒")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Core Web Vitals 计算
+基于 PerfTimeline 推送的条目计算 LCP、CLS（会话窗口）、INP 和 TTFB，
+INP 通过执行表单示例中的脚本化交互（填写、点击、勾选）获得，结果按阈值判定是否通过
+
+运行方式: python web_vitals.py https://example.com https://httpbin.org/forms/post --output vitals.json
+"""
+
+import argparse
+import json
+from urllib.parse import urlsplit
+
+from playwright.sync_api import sync_playwright
+
+from perf_observer import DEFAULT_ENTRY_TYPES, PerfTimeline
+
+VITALS_ENTRY_TYPES = (*DEFAULT_ENTRY_TYPES, 'event', 'first-input')
+
+# "良好" 阈值，与 web.dev 公布的标准一致
+DEFAULT_THRESHOLDS = {
+    'lcp': 2500,   # 毫秒
+    'cls': 0.1,
+    'inp': 200,    # 毫秒
+    'ttfb': 800,   # 毫秒
+}
+
+TTFB_JS = '''() => {
+    const navigation = performance.getEntriesByType('navigation')[0];
+    if (!navigation) return null;
+    return Math.max(navigation.responseStart - (navigation.activationStart || 0), 0);
+}'''
+
+
+def compute_lcp(entries):
+    """最后一个 LCP 候选的时间"""
+    candidates = [e['startTime'] for e in entries if e['type'] == 'largest-contentful-paint']
+    return round(candidates[-1], 2) if candidates else None
+
+
+def compute_cls(entries, gap=1000, max_window=5000):
+    """会话窗口 CLS：间隔小于 1 秒、总长不超过 5 秒的偏移归为一个窗口，取最大窗口之和"""
+    shifts = sorted(
+        (e for e in entries if e['type'] == 'layout-shift' and not e.get('hadRecentInput')),
+        key=lambda e: e['startTime']
+    )
+    best = current = 0.0
+    window_start = previous = None
+    for shift in shifts:
+        start = shift['startTime']
+        if window_start is None or start - previous >= gap or start - window_start >= max_window:
+            window_start = start
+            current = 0.0
+        current += shift['value']
+        previous = start
+        best = max(best, current)
+    return round(best, 4)
+
+
+def compute_inp(entries, interacted=True):
+    """按 interactionId 取每次交互的最长事件耗时；每 50 次交互忽略一次最慢的，取其余最大值
+
+    未执行交互时返回 None；执行了交互但没有超过 16ms 的事件时返回 0
+    """
+    if not interacted:
+        return None
+    longest = {}
+    for entry in entries:
+        interaction_id = entry.get('interactionId')
+        if entry['type'] in ('event', 'first-input') and interaction_id:
+            longest[interaction_id] = max(longest.get(interaction_id, 0), entry['duration'])
+    if not longest:
+        return 0
+    durations = sorted(longest.values(), reverse=True)
+    index = min(len(durations) // 50, len(durations) - 1)
+    return round(durations[index], 2)
+
+
+def rate(vitals, thresholds=None):
+    """逐项判定是否达到阈值，未测量的指标不参与判定"""
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    ratings = {}
+    for metric, limit in thresholds.items():
+        value = vitals.get(metric)
+        if value is not None:
+            ratings[metric] = 'pass' if value <= limit else 'fail'
+    return ratings
+
+
+def httpbin_form_interactions(page):
+    """httpbin /forms/post 上的脚本化交互，与表单示例中的操作一致"""
+    page.click('input[name="custname"]')
+    page.keyboard.type('张三')
+    page.click('input[name="custemail"]')
+    page.keyboard.type('zhangsan@example.com')
+    page.click('input[value="medium"]')
+    page.check('input[value="cheese"]')
+    page.click('textarea[name="comments"]')
+    page.keyboard.type('INP test')
+
+
+def default_interactions(page):
+    """按 URL 选择交互脚本；没有对应脚本的页面不测 INP"""
+    if urlsplit(page.url).path.rstrip('/') == '/forms/post':
+        httpbin_form_interactions(page)
+        return True
+    return False
+
+
+def measure_page(context, url, timeline, interactions=default_interactions, thresholds=None):
+    """在给定上下文中测量一个页面，返回 vitals 记录"""
+    page = context.new_page()
+    try:
+        page.goto(url, wait_until='load')
+        ttfb = page.evaluate(TTFB_JS)
+        interacted = bool(interactions(page)) if interactions else False
+        timeline.flush(page)
+        entries = timeline.entries(page)
+        vitals = {
+            'lcp': compute_lcp(entries),
+            'cls': compute_cls(entries),
+            'inp': compute_inp(entries, interacted),
+            'ttfb': round(ttfb, 2) if ttfb is not None else None,
+        }
+    finally:
+        timeline.discard(page)
+        page.close()
+
+    ratings = rate(vitals, thresholds)
+    return {
+        'url': url,
+        **vitals,
+        'ratings': ratings,
+        'passed': all(r == 'pass' for r in ratings.values()),
+    }
+
+
+def measure_vitals(browser, urls, interactions=default_interactions, thresholds=None,
+                   context_options=None):
+    """批量测量，每个 URL 使用全新上下文（同步 API）"""
+    records = []
+    for url in urls:
+        context = browser.new_context(**(context_options or {}))
+        timeline = PerfTimeline(entry_types=VITALS_ENTRY_TYPES)
+        timeline.attach(context)
+        try:
+            records.append(measure_page(context, url, timeline, interactions, thresholds))
+        except Exception as e:
+            records.append({'url': url, 'error': str(e), 'passed': False})
+        finally:
+            context.close()
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Core Web Vitals 批量测量")
+    parser.add_argument('urls', nargs='+')
+    for metric, limit in DEFAULT_THRESHOLDS.items():
+        parser.add_argument(f'--{metric}', type=float, default=limit, help=f"{metric.upper()} 阈值")
+    parser.add_argument('--output', default='web_vitals.json')
+    args = parser.parse_args()
+
+    thresholds = {metric: getattr(args, metric) for metric in DEFAULT_THRESHOLDS}
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        records = measure_vitals(browser, args.urls, thresholds=thresholds)
+        browser.close()
+
+    for record in records:
+        status = '✅' if record['passed'] else '❌'
+        if 'error' in record:
+            print(f"{status} {record['url']}: {record['error']}")
+            continue
+        print(f"{status} {record['url']}: LCP {record['lcp']}ms, CLS {record['cls']}, "
+              f"INP {record['inp']}ms, TTFB {record['ttfb']}ms")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'thresholds': thresholds, 'pages': records}, f, indent=2, ensure_ascii=False)
+    print(f"结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()